@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Recipes'
+
+    def ready(self):
+        """
+        Connects signal handlers keeping derived data in line with the models
+        """
+        import Recipes.signals  # noqa: F401
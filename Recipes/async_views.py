@@ -0,0 +1,203 @@
+import asyncio
+
+from django.http import HttpResponse, Http404
+from django.shortcuts import render
+
+from Recipes.images import aget_lead_images
+from Recipes.models import Recipe, RecipeImage, RecipeIngredient, Ingredient, IngredientImage, IngredientRecipe
+from Recipes.page_cache import get_recipe_page
+from Recipes.pagination import get_cursors, apaginate_queryset
+from Recipes.scaling import SERVINGS_PARAMETER
+from Recipes.search import asearch_catalog, INGREDIENT
+from Recipes.slugs import get_cached_slug, remember_slug
+from Recipes.views import (RecipeDetailsView, IngredientDetailsView, RecipeCategoryView, SearchResultsView,
+                           INGREDIENT_RECIPES_ORDERING, CATEGORY_ENTRIES_ORDERING, get_category_entries,
+                           is_stale_page)
+
+# Native async variants of read only views, routed instead of the sync ones when ASYNC_VIEWS setting is on, which is
+# what Vegelastic_recipes.asgi does. They share rendering with the sync views and only replace database access with
+# the async ORM; templates are rendered from fully loaded data so that nothing queries the database from the event
+# loop, which is why the user is loaded up front.
+
+
+async def load_user(request):
+    """
+    Loads the user of a request with the async ORM and stores it on the request for templates and validators
+
+    @param request: current request
+    """
+    request.user = await request.auser()
+
+
+async def aload_recipe_details(recipe_slug):
+    """
+    Asynchronous variant of load_recipe_details fetching the recipe, its ingredients and its first picture
+    concurrently, all three selected by the slug, in the same RECIPE_DETAILS_QUERIES queries
+
+    @param recipe_slug: slug of the recipe from the url
+    @return: the recipe, its ingredients and its first picture or None if it has no pictures
+    @raise Http404: if no recipe has the slug
+    """
+    async def load_ingredients():
+        return [recipe_ingredient async for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe__slug=recipe_slug).select_related('ingredient').order_by('pk')]
+
+    try:
+        recipe, recipe_ingredients, recipe_image = await asyncio.gather(
+            Recipe.objects.aget(slug=recipe_slug),
+            load_ingredients(),
+            RecipeImage.objects.filter(recipe__slug=recipe_slug).order_by('pk').afirst(),
+        )
+    except Recipe.DoesNotExist:
+        raise Http404('No Recipe matches the given query.')
+    return recipe, recipe_ingredients, recipe_image
+
+
+class AsyncRecipeDetailsView(RecipeDetailsView):
+    """
+    Async variant of RecipeDetailsView
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Renders the recipe page for the multiplier from the url, see RecipeDetailsView.get
+        """
+        servings_redirect = self.get_servings_redirect(request)
+        if servings_redirect is not None:
+            return servings_redirect
+        await load_user(request)
+        servings_multiplier = int(request.GET.get(SERVINGS_PARAMETER, 1))
+        return await self.arender_recipe_page(request, HttpResponse(), kwargs['slug'], servings_multiplier,
+                                              conditional=True)
+
+    async def post(self, request, *args, **kwargs):
+        """
+        Redirects the legacy form to the url of a changed multiplier, see RecipeDetailsView.post
+        """
+        return self.redirect_to_servings(request, self.change_servings_multiplier(request))
+
+    async def arender_recipe_page(self, request, response, recipe_slug, servings_multiplier, conditional=False):
+        """
+        Asynchronous variant of RecipeDetailsView.render_recipe_page
+
+        @return: the response or a 304 response carrying its cookies
+        """
+        slug_entry = get_cached_slug(Recipe, recipe_slug)
+        not_modified = self.get_not_modified(request, response, slug_entry, servings_multiplier, conditional)
+        if not_modified is not None:
+            return not_modified
+
+        context = {}
+        recipe_page = get_recipe_page(recipe_slug, servings_multiplier)
+        resolved = slug_entry is None
+        if resolved and recipe_page is not None:
+            row = await Recipe.objects.filter(slug=recipe_slug).values_list('pk', 'updated_on').afirst()
+            if row is None:
+                raise Http404('No Recipe matches the given query.')
+            slug_entry = remember_slug(Recipe, recipe_slug, *row)
+        if recipe_page is None or is_stale_page(recipe_page, slug_entry):
+            recipe_page, context = self.build_recipe_page(recipe_slug, servings_multiplier,
+                                                          *await aload_recipe_details(recipe_slug))
+            if slug_entry is None:
+                slug_entry = remember_slug(Recipe, recipe_slug, recipe_page['recipe'].pk,
+                                           recipe_page['recipe'].updated_on)
+
+        if resolved:
+            not_modified = self.get_not_modified(request, response, slug_entry, servings_multiplier, conditional)
+            if not_modified is not None:
+                return not_modified
+
+        return self.write_recipe_page(request, response, recipe_page, servings_multiplier, context, slug_entry,
+                                      conditional)
+
+
+class AsyncIngredientDetailsView(IngredientDetailsView):
+    """
+    Async variant of IngredientDetailsView
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Renders the ingredient page, see IngredientDetailsView.get; once the slug is cached the ingredient, its
+        picture and the page of its recipes are fetched concurrently
+        """
+        await load_user(request)
+        ingredient_slug = kwargs['slug']
+        ingredient = None
+        slug_entry = get_cached_slug(Ingredient, ingredient_slug)
+        if slug_entry is None:
+            ingredient = await Ingredient.objects.filter(slug=ingredient_slug).afirst()
+            if ingredient is None:
+                raise Http404('No Ingredient matches the given query.')
+            slug_entry = remember_slug(Ingredient, ingredient_slug, ingredient.pk, ingredient.updated_on)
+        not_modified = self.get_not_modified(request, slug_entry)
+        if not_modified is not None:
+            return not_modified
+
+        after, before = get_cursors(request)
+        loads = [
+            aget_lead_images(IngredientImage, 'ingredient', [slug_entry.pk]),
+            apaginate_queryset(IngredientRecipe.objects.filter(ingredient_id=slug_entry.pk),
+                               INGREDIENT_RECIPES_ORDERING, after, before),
+        ]
+        if ingredient is None:
+            loads.append(Ingredient.objects.filter(pk=slug_entry.pk).afirst())
+        ingredient_images, ingredient_recipes, *loaded = await asyncio.gather(*loads)
+        if ingredient is None:
+            ingredient = loaded[0]
+            if ingredient is None:
+                raise Http404('No Ingredient matches the given query.')
+        return self.render_ingredient_page(request, slug_entry, ingredient, ingredient_images.get(ingredient.pk),
+                                           ingredient_recipes)
+
+
+class AsyncRecipeCategoryView(RecipeCategoryView):
+    """
+    Async variant of RecipeCategoryView
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Renders a page of recipes in a category, see RecipeCategoryView.get
+        """
+        await load_user(request)
+        category_key = kwargs['pk']
+        after, before = get_cursors(request)
+        category_entries = await apaginate_queryset(get_category_entries(category_key), CATEGORY_ENTRIES_ORDERING,
+                                                    after, before)
+        return self.render_category_page(request, category_key, category_entries)
+
+
+class AsyncSearchResultsView(SearchResultsView):
+    """
+    Async variant of SearchResultsView
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Renders a page of results for the phrase from the q query parameter, see SearchResultsView.get
+        """
+        await load_user(request)
+        searched = request.GET.get('q')
+        if not searched:
+            return render(request, template_name='Recipes/search-results.html', context={})
+        after, before = get_cursors(request)
+        return await self.arender_results(request, searched, after, before)
+
+    async def post(self, request, *args, **kwargs):
+        """
+        Renders the first page of results for the phrase from the search form, see SearchResultsView.post
+        """
+        await load_user(request)
+        return await self.arender_results(request, request.POST.get('searched'))
+
+    async def arender_results(self, request, searched, after=None, before=None):
+        """
+        Asynchronous variant of SearchResultsView.render_results
+
+        @return: rendered page
+        """
+        found = await asearch_catalog(searched, after, before)
+        ingredient_images = await aget_lead_images(IngredientImage, 'ingredient',
+                                                   [obj.pk for kind, obj in found if kind == INGREDIENT])
+        return self.render_found(request, searched, found, ingredient_images)
@@ -0,0 +1,224 @@
+import threading
+from bisect import bisect_left, insort
+from itertools import chain
+
+from Recipes.models import Recipe, Ingredient
+from Recipes.process_index import ProcessIndex
+from Recipes.search import fold_diacritics, TOKEN_PATTERN, RECIPE, INGREDIENT
+
+DEFAULT_SUGGESTIONS = 10
+
+MAX_SUGGESTIONS = 20
+
+INGREDIENT_NAME_FIELDS = ('name', 'name_one', 'name_two', 'name_five', 'name_half')
+
+
+def prefix_keys(texts):
+    """
+    Builds keys under which a name is found: its folded words joined with single spaces, starting from every word,
+    so that typing the beginning of any word of the name finds it
+
+    @param texts: names and other forms of a name
+    @return: set of keys
+    """
+    keys = set()
+    for text in texts:
+        words = TOKEN_PATTERN.findall(fold_diacritics(text or ''))
+        for position in range(len(words)):
+            keys.add(' '.join(words[position:]))
+    return keys
+
+
+def normalize_query(query):
+    """
+    Folds a typed query the way keys are folded, keeping a trailing space which ends the last word
+
+    @param query: typed text
+    @return: key prefix to look up
+    """
+    words = TOKEN_PATTERN.findall(fold_diacritics(query or ''))
+    prefix = ' '.join(words)
+    if prefix and query[-1:].isspace():
+        prefix += ' '
+    return prefix
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, kind, primary key) entries answering which recipes and ingredients have a word starting
+    with a typed prefix by bisecting to the first matching entry and walking forward; documents are replaced one by
+    one when they change, without rebuilding the array
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._document_keys = {}
+        self._suggestions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._suggestions)
+
+    def add(self, document_key, texts, name, slug):
+        """
+        Adds a document or replaces it if it is already indexed
+
+        @param document_key: (kind, primary key) pair identifying the document
+        @param texts: names the document is found under
+        @param name: name shown in suggestions
+        @param slug: slug of the page of the document
+        """
+        keys = sorted(prefix_keys(texts))
+        with self._lock:
+            self._remove(document_key)
+            for key in keys:
+                insort(self._entries, (key, *document_key))
+            self._document_keys[document_key] = keys
+            self._suggestions[document_key] = (name, slug)
+
+    def load(self, documents):
+        """
+        Fills an empty index with many documents, sorting the entries once instead of inserting them one by one
+
+        @param documents: iterable of PrefixIndex.add arguments
+        """
+        with self._lock:
+            for document_key, texts, name, slug in documents:
+                keys = sorted(prefix_keys(texts))
+                self._entries.extend((key, *document_key) for key in keys)
+                self._document_keys[document_key] = keys
+                self._suggestions[document_key] = (name, slug)
+            self._entries.sort()
+
+    def remove(self, document_key):
+        """
+        Removes a document from the index if it is indexed
+
+        @param document_key: (kind, primary key) pair identifying the document
+        """
+        with self._lock:
+            self._remove(document_key)
+
+    def _remove(self, document_key):
+        for key in self._document_keys.pop(document_key, ()):
+            entry = (key, *document_key)
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+        self._suggestions.pop(document_key, None)
+
+    def suggest(self, query, limit=DEFAULT_SUGGESTIONS):
+        """
+        Finds documents with a word starting with the query, ordered by the matched key
+
+        @param query: typed text
+        @param limit: maximum amount of suggestions
+        @return: list of (kind, name, slug) triples
+        """
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        suggestions = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._entries, (prefix,))
+            while position < len(self._entries) and len(suggestions) < limit:
+                key, kind, pk = self._entries[position]
+                if not key.startswith(prefix):
+                    break
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    suggestions.append((kind, *self._suggestions[(kind, pk)]))
+                position += 1
+        return suggestions
+
+
+def recipe_document(recipe):
+    """
+    @param recipe: Recipe object
+    @return: arguments of PrefixIndex.add for the recipe
+    """
+    return (RECIPE, recipe.pk), [recipe.name], recipe.name, recipe.slug
+
+
+def ingredient_document(ingredient):
+    """
+    @param ingredient: Ingredient object
+    @return: arguments of PrefixIndex.add for the ingredient, found under every grammatical form of its name
+    """
+    return ((INGREDIENT, ingredient.pk), [getattr(ingredient, field) for field in INGREDIENT_NAME_FIELDS],
+            ingredient.name, ingredient.slug)
+
+
+def build_autocomplete_index():
+    """
+    Builds a new index from names of all recipes and searchable ingredients in the database
+
+    @return: the index
+    """
+    index = PrefixIndex()
+    index.load(chain(
+        map(recipe_document, Recipe.objects.only('name', 'slug').iterator()),
+        map(ingredient_document, Ingredient.objects.filter(is_searchable=True).only(
+            'slug', *INGREDIENT_NAME_FIELDS).iterator()),
+    ))
+    return index
+
+
+_autocomplete_index = ProcessIndex('autocomplete', build_autocomplete_index)
+
+
+def get_autocomplete_index():
+    """
+    Returns the process wide index building it from the database on first use and after changes made by other
+    processes
+
+    @return: the index
+    """
+    return _autocomplete_index.get()
+
+
+def reset_autocomplete_index():
+    """
+    Drops the index of every process so that it is rebuilt from the database on next use
+    """
+    _autocomplete_index.reset()
+
+
+def update_recipe(recipe):
+    """
+    Reindexes a saved recipe if the index has already been built
+
+    @param recipe: saved Recipe object
+    """
+    _autocomplete_index.update(lambda index: index.add(*recipe_document(recipe)))
+
+
+def remove_recipe(recipe_pk):
+    """
+    Removes a deleted recipe from the index if it has already been built
+
+    @param recipe_pk: primary key of the deleted recipe
+    """
+    _autocomplete_index.update(lambda index: index.remove((RECIPE, recipe_pk)))
+
+
+def update_ingredient(ingredient):
+    """
+    Reindexes a saved ingredient if the index has already been built; ingredients that are not searchable are removed
+
+    @param ingredient: saved Ingredient object
+    """
+    if ingredient.is_searchable:
+        _autocomplete_index.update(lambda index: index.add(*ingredient_document(ingredient)))
+    else:
+        _autocomplete_index.update(lambda index: index.remove((INGREDIENT, ingredient.pk)))
+
+
+def remove_ingredient(ingredient_pk):
+    """
+    Removes a deleted ingredient from the index if it has already been built
+
+    @param ingredient_pk: primary key of the deleted ingredient
+    """
+    _autocomplete_index.update(lambda index: index.remove((INGREDIENT, ingredient_pk)))
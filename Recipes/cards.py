@@ -0,0 +1,168 @@
+import threading
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from Recipes.images import get_lead_images
+from Recipes.models import (Recipe, RecipeCard, RecipeCategory, RecipeImage, RecipeIngredient, IngredientRecipe,
+                            Ingredient, CategoryRecipe)
+from Recipes.slugs import invalidate_slugs
+
+SHORT_DESCRIPTION_LENGTH = 200
+
+REBUILD_BATCH_SIZE = 500
+
+_deleted_recipes = threading.local()
+
+
+def deleted_recipe_pks():
+    """
+    Returns primary keys of recipes that are being deleted in the current thread; their cards go away with them and
+    must not be refreshed by signals of cascading deletions
+
+    @return: set of primary keys
+    """
+    if not hasattr(_deleted_recipes, 'pks'):
+        _deleted_recipes.pks = set()
+    return _deleted_recipes.pks
+
+
+def build_recipe_cards(recipes):
+    """
+    Builds unsaved cards of recipes loading their categories and first pictures in one query each
+
+    @param recipes: Recipe objects
+    @return: list of RecipeCard objects
+    """
+    recipe_pks = [recipe.pk for recipe in recipes]
+    category_ids = {recipe_pk: set() for recipe_pk in recipe_pks}
+    for recipe_pk, category in RecipeCategory.recipe.through.objects.filter(recipe_id__in=recipe_pks).values_list(
+            'recipe_id', 'recipecategory__name'):
+        category_ids[recipe_pk].add(category)
+    lead_images = get_lead_images(RecipeImage, 'recipe', recipe_pks)
+    return [RecipeCard(
+        recipe_id=recipe.pk,
+        slug=recipe.slug,
+        name=recipe.name,
+        short_description=Truncator(recipe.meal_description).chars(SHORT_DESCRIPTION_LENGTH),
+        prep_time=recipe.prep_time,
+        category_ids=sorted(category_ids[recipe.pk]),
+        lead_image=lead_images[recipe.pk].image.name if recipe.pk in lead_images else '',
+        created_on=recipe.created_on,
+    ) for recipe in recipes]
+
+
+def build_category_recipes(cards):
+    """
+    Builds unsaved category membership entries of recipes from their cards
+
+    @param cards: RecipeCard objects
+    @return: list of CategoryRecipe objects
+    """
+    return [CategoryRecipe(category=category, card_id=card.recipe_id, created_on=card.created_on)
+            for card in cards for category in card.category_ids]
+
+
+def build_ingredient_recipes(cards):
+    """
+    Builds unsaved reverse index entries of ingredients used by recipes from their cards in one query
+
+    @param cards: RecipeCard objects
+    @return: list of IngredientRecipe objects
+    """
+    cards = {card.recipe_id: card for card in cards}
+    ingredient_links = RecipeIngredient.objects.filter(recipe_id__in=list(cards)).values_list(
+        'recipe_id', 'ingredient_id').distinct()
+    return [IngredientRecipe(
+        ingredient_id=ingredient_pk,
+        recipe_id=recipe_pk,
+        slug=cards[recipe_pk].slug,
+        name=cards[recipe_pk].name,
+        lead_image=cards[recipe_pk].lead_image,
+    ) for recipe_pk, ingredient_pk in ingredient_links]
+
+
+def touch_ingredients(ingredients):
+    """
+    Marks ingredients whose pages list changed recipes as modified now and drops their cached slug lookups
+
+    @param ingredients: queryset of the ingredients
+    """
+    slugs = list(ingredients.values_list('slug', flat=True))
+    if slugs:
+        ingredients.update(updated_on=timezone.now())
+        invalidate_slugs(Ingredient, slugs)
+
+
+def refresh_ingredient_recipes(recipe_pks, cards=None):
+    """
+    Rebuilds reverse index entries of ingredients used by recipes and marks ingredients listing the recipes before
+    or after the change as modified
+
+    @param recipe_pks: primary keys of changed recipes
+    @param cards: current cards of the recipes, loaded from the database if not given
+    """
+    recipe_pks = set(recipe_pks) - deleted_recipe_pks()
+    if not recipe_pks:
+        return
+    if cards is None:
+        cards = RecipeCard.objects.filter(recipe_id__in=recipe_pks)
+    entries = build_ingredient_recipes(cards)
+    with transaction.atomic():
+        ingredient_pks = set(IngredientRecipe.objects.filter(recipe_id__in=recipe_pks).values_list(
+            'ingredient_id', flat=True))
+        ingredient_pks.update(entry.ingredient_id for entry in entries)
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_pks).delete()
+        IngredientRecipe.objects.bulk_create(entries)
+        touch_ingredients(Ingredient.objects.filter(pk__in=ingredient_pks))
+
+
+def refresh_recipe_cards(recipe_pks):
+    """
+    Rebuilds cards of recipes together with their category membership entries and reverse index entries of their
+    ingredients; cards of recipes that no longer exist are removed
+
+    @param recipe_pks: primary keys of changed recipes
+    """
+    recipe_pks = set(recipe_pks) - deleted_recipe_pks()
+    if not recipe_pks:
+        return
+    recipes = list(Recipe.objects.filter(pk__in=recipe_pks))
+    cards = build_recipe_cards(recipes)
+    with transaction.atomic():
+        RecipeCard.objects.filter(recipe_id__in=recipe_pks).delete()
+        RecipeCard.objects.bulk_create(cards)
+        CategoryRecipe.objects.bulk_create(build_category_recipes(cards))
+        refresh_ingredient_recipes(recipe_pks, cards)
+
+
+def rebuild_recipe_cards(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Rebuilds cards of all recipes, category membership entries and the reverse index of ingredients in batches;
+    every ingredient is marked as modified since the recipes its page lists may have changed
+
+    @param batch_size: amount of recipes processed at once
+    @return: amount of rebuilt cards
+    """
+    rebuilt = 0
+
+    def rebuild_batch(recipes):
+        cards = RecipeCard.objects.bulk_create(build_recipe_cards(recipes))
+        CategoryRecipe.objects.bulk_create(build_category_recipes(cards))
+        IngredientRecipe.objects.bulk_create(build_ingredient_recipes(cards))
+        return len(cards)
+
+    with transaction.atomic():
+        RecipeCard.objects.all().delete()
+        IngredientRecipe.objects.all().delete()
+        batch = []
+        for recipe in Recipe.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(recipe)
+            if len(batch) == batch_size:
+                rebuilt += rebuild_batch(batch)
+                batch = []
+        if batch:
+            rebuilt += rebuild_batch(batch)
+        touch_ingredients(Ingredient.objects.all())
+    return rebuilt
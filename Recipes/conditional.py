@@ -0,0 +1,69 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def page_etag(request, *versions):
+    """
+    Builds the entity tag of a page from versions of the data it shows, its full path with query parameters and the
+    user it is rendered for; pages answering conditional requests must not carry CSRF tokens, which would make them
+    differ between browsers with the same tag
+
+    @param request: current request
+    @param versions: values changing whenever the shown data changes, for example primary keys and modification times
+    @return: quoted ETag header value
+    """
+    user = getattr(request, 'user', None)
+    variant = (
+        request.get_full_path(),
+        user.pk if user is not None and user.is_authenticated else None,
+    )
+    digest = hashlib.md5(repr((versions, variant)).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def get_not_modified_response(request, etag, last_modified, response=None, shared_max_age=None, private=False):
+    """
+    Checks conditional request headers against validators of the requested page
+
+    @param request: current request
+    @param etag: entity tag of the page built by page_etag
+    @param last_modified: last modification time of the page or None if unknown
+    @param response: response prepared for the page whose cookies the 304 response keeps
+    @param shared_max_age: see set_validators
+    @param private: see set_validators
+    @return: 304 or 412 response or None if the page has to be rendered
+    """
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified is not None else None)
+    if not_modified is not None:
+        set_validators(not_modified, etag, last_modified, shared_max_age, private)
+        if response is not None:
+            not_modified.cookies = response.cookies
+    return not_modified
+
+
+def set_validators(response, etag, last_modified, shared_max_age=None, private=False):
+    """
+    Sets ETag and Last-Modified headers and makes browsers revalidate the page before reusing it; proxies revalidate
+    it too, keeping a copy per Cookie header, unless shared_max_age is given, with which the page is public, the same
+    for every cookie, and shared caches may serve it without revalidating for that many seconds
+
+    @param response: response of the page
+    @param etag: entity tag of the page built by page_etag
+    @param last_modified: last modification time of the page or None if unknown
+    @param shared_max_age: seconds a shared cache may serve the page for or None to revalidate it every time
+    @param private: keep the page out of shared caches, for pages of signed in users
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if shared_max_age is not None and not private:
+        patch_cache_control(response, public=True, max_age=0, s_maxage=shared_max_age)
+        return
+    if private:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+
+# Drop-in replacements of session, authentication and message middleware skipping them for anonymous reads: GET and
+# HEAD requests to read only pages, listed in ANONYMOUS_READ_PATHS setting, from browsers without a session cookie.
+# Such requests can only ever be anonymous, so instead of creating a session store, resolving the user from it and
+# preparing message storage on top of it, the request gets an AnonymousUser and no session at all. Everything else
+# goes through the regular middleware. The fast path is turned on with ANONYMOUS_FAST_PATH setting.
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def is_anonymous_read(request):
+    """
+    Decides once per request whether it takes the fast path
+
+    @param request: current request
+    @return: True if the request is an anonymous read and the fast path is on
+    """
+    anonymous_read = getattr(request, '_anonymous_read', None)
+    if anonymous_read is None:
+        anonymous_read = request._anonymous_read = (
+            getattr(settings, 'ANONYMOUS_FAST_PATH', False)
+            and request.method in SAFE_METHODS
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and request.path_info.startswith(tuple(getattr(settings, 'ANONYMOUS_READ_PATHS', ())))
+        )
+    return anonymous_read
+
+
+async def get_anonymous_user():
+    """
+    Replacement of request.auser for anonymous reads
+    """
+    return AnonymousUser()
+
+
+class FastPathSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware leaving anonymous reads without a session
+    """
+    def __call__(self, request):
+        if is_anonymous_read(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class FastPathAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware giving anonymous reads an AnonymousUser without looking at the session
+    """
+    def __call__(self, request):
+        if is_anonymous_read(request):
+            request.user = AnonymousUser()
+            request.auser = get_anonymous_user
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class FastPathMessageMiddleware(MessageMiddleware):
+    """
+    MessageMiddleware leaving anonymous reads without message storage, for which templates see no messages
+    """
+    def __call__(self, request):
+        if is_anonymous_read(request):
+            return self.get_response(request)
+        return super().__call__(request)
@@ -0,0 +1,34 @@
+from django.db.models import Min
+
+
+def get_lead_images(image_model, owner_field, owner_pks):
+    """
+    Finds the first picture of every object from a list in a single query
+
+    @param image_model: picture model, RecipeImage or IngredientImage
+    @param owner_field: name of the picture model foreign key pointing to the pictured object
+    @param owner_pks: primary keys of pictured objects, recipes or ingredients
+    @return: dictionary mapping primary keys of pictured objects to their first pictures
+    """
+    owner_pks = list(owner_pks)
+    if not owner_pks:
+        return {}
+    lead_image_pks = image_model.objects.filter(**{f'{owner_field}__in': owner_pks}).values(
+        owner_field).annotate(lead_image_pk=Min('pk')).values('lead_image_pk')
+    return {getattr(image, f'{owner_field}_id'): image
+            for image in image_model.objects.filter(pk__in=lead_image_pks)}
+
+
+async def aget_lead_images(image_model, owner_field, owner_pks):
+    """
+    Asynchronous variant of get_lead_images
+
+    @return: dictionary mapping primary keys of pictured objects to their first pictures
+    """
+    owner_pks = list(owner_pks)
+    if not owner_pks:
+        return {}
+    lead_image_pks = image_model.objects.filter(**{f'{owner_field}__in': owner_pks}).values(
+        owner_field).annotate(lead_image_pk=Min('pk')).values('lead_image_pk')
+    return {getattr(image, f'{owner_field}_id'): image
+            async for image in image_model.objects.filter(pk__in=lead_image_pks)}
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from Recipes.transfer import export_catalog, TRANSFER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Streams the whole catalog out as JSON Lines
+    """
+    help = 'Exports ingredients and recipes with their ingredient amounts, categories and pictures as JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='file to write to, standard output by default')
+        parser.add_argument('--batch-size', type=int, default=TRANSFER_BATCH_SIZE,
+                            help='amount of objects loaded at once')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                written = export_catalog(output, options['batch_size'])
+            self.stderr.write(self.style.SUCCESS(f'Exported {written} records to {options["output"]}'))
+        else:
+            export_catalog(self.stdout, options['batch_size'])
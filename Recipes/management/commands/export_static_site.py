@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import Http404
+
+from Recipes.static_site import export_static_site, DEFAULT_EXPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Pre-renders the catalog into static pages for serving it without Django
+    """
+    help = ('Renders every recipe at every servings multiplier, every searchable ingredient, every category and the '
+            'categories index into a directory; a repeated export only renders recipes and ingredients changed '
+            'since the previous one')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='directory to export to')
+        parser.add_argument('--full', action='store_true', help='export all pages, not only changed ones')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='amount of worker processes, the amount of processors by default, 0 to render '
+                                 'without them')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_EXPORT_BATCH_SIZE,
+                            help='amount of pages a worker renders at once')
+
+    def handle(self, *args, **options):
+        try:
+            exported = export_static_site(options['output'], options['full'], options['workers'],
+                                          max(options['batch_size'], 1))
+        except (OSError, ValueError, Http404) as error:
+            raise CommandError(error)
+        pages_per_second = exported['pages'] / exported['seconds'] if exported['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {exported["pages"]} pages, {exported["bytes"]} bytes in {exported["seconds"]:.2f} s '
+            f'({pages_per_second:.1f} pages/s), removed pages of {exported["removed"]} deleted '
+            f'recipes and ingredients'))
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from Recipes.models import RecipeImage, IngredientImage
+from Recipes.thumbnails import generate_thumbnails, is_thumbnailable, DEFAULT_THUMBNAIL_WORKERS
+
+
+class Command(BaseCommand):
+    """
+    Backfills thumbnails of pictures uploaded before thumbnails were generated
+    """
+    help = 'Generates missing thumbnails of all recipe and ingredient pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help='regenerate thumbnails that already exist')
+        parser.add_argument('--workers', type=int, default=DEFAULT_THUMBNAIL_WORKERS,
+                            help='amount of pictures processed at once')
+
+    def handle(self, *args, **options):
+        image_names = set(RecipeImage.objects.values_list('image', flat=True))
+        image_names.update(IngredientImage.objects.values_list('image', flat=True))
+        missing = sorted(image_name for image_name in image_names if image_name and not is_thumbnailable(image_name))
+        for image_name in missing:
+            self.stderr.write(self.style.WARNING(f'Skipping {image_name}: the file does not exist'))
+
+        def generate(image_name):
+            return generate_thumbnails(image_name, overwrite=options['overwrite'])
+
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            generated = sum(len(names) for names in executor.map(
+                generate, sorted(image_names.difference(missing, ['']))))
+        self.stdout.write(self.style.SUCCESS(f'Generated {generated} thumbnails'))
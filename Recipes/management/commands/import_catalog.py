@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Recipes.transfer import import_catalog, TransferError, TRANSFER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Streams a catalog exported with export_catalog into the database
+    """
+    help = ('Imports ingredients and recipes from JSON Lines in batches; an interrupted import continues from its '
+            'checkpoint when run again')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines file written by export_catalog')
+        parser.add_argument('--batch-size', type=int, default=TRANSFER_BATCH_SIZE,
+                            help='amount of records loaded in one transaction')
+        parser.add_argument('--checkpoint', help='checkpoint file, the imported file path with .checkpoint by default')
+        parser.add_argument('--no-checkpoint', action='store_true', help='always import the whole file')
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help='skip rebuilding recipe cards and the ingredient reverse index')
+
+    def handle(self, *args, **options):
+        checkpoint_path = None if options['no_checkpoint'] else (
+            options['checkpoint'] or f'{options["path"]}.checkpoint')
+        try:
+            with open(options['path'], encoding='utf-8') as lines:
+                imported = import_catalog(lines, options['batch_size'], checkpoint_path,
+                                          rebuild=not options['no_rebuild'])
+        except (OSError, TransferError) as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported["ingredient"]} ingredients and {imported["recipe"]} recipes; restart running '
+            f'servers to rebuild their search, autocomplete and pantry indexes'))
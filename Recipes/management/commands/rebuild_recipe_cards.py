@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from Recipes.cards import rebuild_recipe_cards, REBUILD_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the recipe card read model and the ingredient reverse index from recipes, their categories, ingredients
+    and pictures
+    """
+    help = 'Rebuilds cards of all recipes used by category, search and ingredient listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help='amount of recipes processed at once')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_recipe_cards(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} recipe cards'))
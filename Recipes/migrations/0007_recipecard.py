@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_recipe_cards(apps, schema_editor):
+    """
+    Creates cards of already existing recipes
+    """
+    Recipe = apps.get_model('Recipes', 'Recipe')
+    RecipeCard = apps.get_model('Recipes', 'RecipeCard')
+    RecipeCategory = apps.get_model('Recipes', 'RecipeCategory')
+    RecipeImage = apps.get_model('Recipes', 'RecipeImage')
+    category_ids = {}
+    for recipe_id, category in RecipeCategory.recipe.through.objects.values_list('recipe_id', 'recipecategory__name'):
+        category_ids.setdefault(recipe_id, set()).add(category)
+    lead_images = {}
+    for recipe_id, image in RecipeImage.objects.order_by('-pk').values_list('recipe_id', 'image'):
+        lead_images[recipe_id] = image
+    RecipeCard.objects.bulk_create([RecipeCard(
+        recipe_id=recipe.pk,
+        slug=recipe.slug,
+        name=recipe.name,
+        short_description=recipe.meal_description[:200],
+        prep_time=recipe.prep_time,
+        category_ids=sorted(category_ids.get(recipe.pk, ())),
+        lead_image=lead_images.get(recipe.pk, ''),
+        created_on=recipe.created_on,
+    ) for recipe in Recipe.objects.all()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Recipes', '0006_remove_recipecategory_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeCard',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='Recipes.recipe')),
+                ('slug', models.SlugField(max_length=256)),
+                ('name', models.CharField(max_length=256)),
+                ('short_description', models.CharField(blank=True, max_length=256)),
+                ('prep_time', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('category_ids', models.JSONField(default=list)),
+                ('lead_image', models.CharField(blank=True, max_length=100)),
+                ('created_on', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_on', 'recipe'], name='recipecard_created_on_idx')],
+            },
+        ),
+        migrations.RunPython(build_recipe_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_ingredient_recipes(apps, schema_editor):
+    """
+    Creates reverse index entries of ingredients used by already existing recipes
+    """
+    RecipeCard = apps.get_model('Recipes', 'RecipeCard')
+    RecipeIngredient = apps.get_model('Recipes', 'RecipeIngredient')
+    IngredientRecipe = apps.get_model('Recipes', 'IngredientRecipe')
+    cards = {card.recipe_id: card for card in RecipeCard.objects.all()}
+    IngredientRecipe.objects.bulk_create([IngredientRecipe(
+        ingredient_id=ingredient_id,
+        recipe_id=recipe_id,
+        slug=cards[recipe_id].slug,
+        name=cards[recipe_id].name,
+        lead_image=cards[recipe_id].lead_image,
+    ) for recipe_id, ingredient_id in RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id').distinct()
+        if recipe_id in cards], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Recipes', '0007_recipecard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=256)),
+                ('name', models.CharField(max_length=256)),
+                ('lead_image', models.CharField(blank=True, max_length=100)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_entries', to='Recipes.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_entries', to='Recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ingredient', 'name', 'recipe'], name='ingredientrecipe_name_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ingredient', 'recipe'), name='ingredientrecipe_unique')],
+            },
+        ),
+        migrations.RunPython(build_ingredient_recipes, migrations.RunPython.noop),
+    ]
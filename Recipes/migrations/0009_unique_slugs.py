@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def deduplicate_model_slugs(model):
+    """
+    Gives every object of a model a slug no older object uses, appending numbers to colliding ones
+
+    @return: dictionary mapping primary keys of objects whose slug changed to their new slugs
+    """
+    taken = set()
+    changed = {}
+    for pk, name, slug in model.objects.order_by('pk').values_list('pk', 'name', 'slug'):
+        base = slug or slugify(name) or model._meta.model_name
+        unique = base
+        number = 2
+        while unique in taken:
+            unique = f'{base[:256 - len(str(number)) - 1]}-{number}'
+            number += 1
+        taken.add(unique)
+        if unique != slug:
+            changed[pk] = unique
+    for pk, slug in changed.items():
+        model.objects.filter(pk=pk).update(slug=slug)
+    return changed
+
+
+def deduplicate_slugs(apps, schema_editor):
+    """
+    Makes slugs of existing recipes and ingredients unique and copies changed recipe slugs to the read models
+    """
+    deduplicate_model_slugs(apps.get_model('Recipes', 'Ingredient'))
+    changed = deduplicate_model_slugs(apps.get_model('Recipes', 'Recipe'))
+    RecipeCard = apps.get_model('Recipes', 'RecipeCard')
+    IngredientRecipe = apps.get_model('Recipes', 'IngredientRecipe')
+    for recipe_id, slug in changed.items():
+        RecipeCard.objects.filter(recipe_id=recipe_id).update(slug=slug)
+        IngredientRecipe.objects.filter(recipe_id=recipe_id).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Recipes', '0008_ingredientrecipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=256, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=256, unique=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_category_recipes(apps, schema_editor):
+    """
+    Creates category membership entries of already existing recipes from links between recipes and categories,
+    once per category name however many category rows share it
+    """
+    RecipeCard = apps.get_model('Recipes', 'RecipeCard')
+    RecipeCategory = apps.get_model('Recipes', 'RecipeCategory')
+    CategoryRecipe = apps.get_model('Recipes', 'CategoryRecipe')
+    created_on = dict(RecipeCard.objects.values_list('recipe_id', 'created_on'))
+    CategoryRecipe.objects.bulk_create([CategoryRecipe(
+        category=category,
+        card_id=recipe_id,
+        created_on=created_on[recipe_id],
+    ) for recipe_id, category in RecipeCategory.recipe.through.objects.values_list(
+        'recipe_id', 'recipecategory__name').distinct() if recipe_id in created_on], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Recipes', '0010_updated_on'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.IntegerField(choices=[(1, 'breakfasts'), (2, 'suppers'), (3, 'dinners'), (4, 'lunches'), (5, 'desserts'), (6, 'other')])),
+                ('created_on', models.DateTimeField()),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_entries', to='Recipes.recipecard')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'created_on', 'card'], name='categoryrecipe_created_on_idx')],
+                'constraints': [models.UniqueConstraint(fields=('category', 'card'), name='categoryrecipe_unique')],
+            },
+        ),
+        migrations.RunPython(build_category_recipes, migrations.RunPython.noop),
+    ]
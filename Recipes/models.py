@@ -1,8 +1,9 @@
 from django.db import models
-from django.utils.text import slugify
 from django.contrib.auth.models import AbstractUser
 from django.contrib.sessions.models import Session
 
+from Recipes.slugs import unique_slug
+
 
 # Create your models here.
 
@@ -33,7 +34,36 @@ class User(AbstractUser):
     pass
 
 
-class Recipe(models.Model):
+class SlugFromNameMixin:
+    """
+    Populates slug field with a unique string derived from name field when an object is created or renamed; saves
+    that keep the name do not touch the slug
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the name an object was loaded with
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Overrides save method to derive a unique slug if the object has none yet or its name has changed
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'name' in update_fields:
+            if not self.slug or self.name != getattr(self, '_loaded_name', None):
+                self.slug = unique_slug(type(self), self.name, self.pk)
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'slug'}
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
+
+
+class Recipe(SlugFromNameMixin, models.Model):
     """
     Creates a model of a recipe
     """
@@ -45,7 +75,7 @@ class Recipe(models.Model):
     servings = models.PositiveSmallIntegerField(null=True, blank=True)
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
-    slug = models.SlugField(max_length=256, blank=True)
+    slug = models.SlugField(max_length=256, blank=True, unique=True)
 
     @property
     def prep_time_hours(self):
@@ -73,13 +103,6 @@ class Recipe(models.Model):
         }
         return result
 
-    def save(self, *args, **kwargs):
-        """
-        Overrides save method for slug field to populate it with string derived from name field
-        """
-        self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         """
         Populates string representation of object of class Recipe with value from it's name field
@@ -89,7 +112,7 @@ class Recipe(models.Model):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(SlugFromNameMixin, models.Model):
     """
     Creates a model of an ingredient that can be linked with recipes through RecipeIngredient class
     """
@@ -100,15 +123,9 @@ class Ingredient(models.Model):
     name_half = models.CharField(max_length=256)
     recipe = models.ManyToManyField(Recipe, through="RecipeIngredient")
     is_searchable = models.BooleanField(default=False)
-    slug = models.SlugField(max_length=256, blank=True)
+    slug = models.SlugField(max_length=256, blank=True, unique=True)
     ingredient_description = models.TextField(blank=True)
-
-    def save(self, *args, **kwargs):
-        """
-        Overrides save method for slug field to populate it with string derived from name field
-        """
-        self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+    updated_on = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         """
@@ -160,6 +177,7 @@ class RecipeImage(models.Model):
     """
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recipe_images')
     image = models.ImageField(upload_to='recipe/')
+    updated_on = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         """
@@ -186,3 +204,87 @@ class IngredientImage(models.Model):
         @return: Ingredient name field value, picture: picture primary key number
         """
         return f'{self.ingredient.name} picture {self.pk}'
+
+
+class RecipeCard(models.Model):
+    """
+    Creates a denormalized read model of a recipe holding everything listing pages need to show it; kept in line
+    with recipes, their categories and pictures by Recipes.cards
+    """
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    slug = models.SlugField(max_length=256)
+    name = models.CharField(max_length=256)
+    short_description = models.CharField(max_length=256, blank=True)
+    prep_time = models.PositiveSmallIntegerField(null=True, blank=True)
+    category_ids = models.JSONField(default=list)
+    lead_image = models.CharField(max_length=100, blank=True)
+    created_on = models.DateTimeField()
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_on', 'recipe'], name='recipecard_created_on_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Populates string representation of object of class RecipeCard with value from it's name field
+
+        @return: name field value
+        """
+        return self.name
+
+
+class CategoryRecipe(models.Model):
+    """
+    Creates a category membership entry linking a category with the card of a recipe classified in it, holding the
+    creation time of the recipe so that category pages are read from newest straight from an index; entries are
+    copied from recipe cards by Recipes.cards, one per category however many RecipeCategory rows share its name
+    """
+    category = models.IntegerField(choices=CATEGORY_CHOICES)
+    card = models.ForeignKey(RecipeCard, on_delete=models.CASCADE, related_name='category_entries')
+    created_on = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'card'], name='categoryrecipe_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'created_on', 'card'], name='categoryrecipe_created_on_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Populates string representation of object of class CategoryRecipe with the category and the recipe name
+
+        @return: category name: recipe name
+        """
+        return f'{self.get_category_display()}: {self.card.name}'
+
+
+class IngredientRecipe(models.Model):
+    """
+    Creates a reverse index entry linking an ingredient with a recipe using it, holding what the ingredient page needs
+    to list the recipe; entries are copied from recipe cards by Recipes.cards
+    """
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='recipe_entries')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_entries')
+    slug = models.SlugField(max_length=256)
+    name = models.CharField(max_length=256)
+    lead_image = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ingredient', 'recipe'], name='ingredientrecipe_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['ingredient', 'name', 'recipe'], name='ingredientrecipe_name_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Populates string representation of object of class IngredientRecipe with value from it's name field
+
+        @return: name field value
+        """
+        return self.name
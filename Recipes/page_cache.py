@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from Recipes.scaling import get_servings_multipliers
+
+HITS_KEY = 'recipe-page:hits'
+MISSES_KEY = 'recipe-page:misses'
+
+DEFAULT_RECIPE_PAGE_CACHE_TIMEOUT = 300
+
+
+def get_page_cache():
+    """
+    Returns the cache backend storing rendered recipe pages
+
+    @return: cache backend configured with RECIPE_PAGE_CACHE_ALIAS setting
+    """
+    return caches[getattr(settings, 'RECIPE_PAGE_CACHE_ALIAS', 'default')]
+
+
+def recipe_page_key(recipe_slug, servings_multiplier):
+    """
+    Builds the cache key of a rendered recipe page
+
+    @param recipe_slug: slug of the recipe
+    @param servings_multiplier: servings multiplier the page is rendered for
+    @return: cache key
+    """
+    return f'recipe-page:{recipe_slug}:{servings_multiplier}'
+
+
+def count(key):
+    """
+    Increments a counter stored in the page cache, creating it if needed
+
+    @param key: key of the counter
+    """
+    page_cache = get_page_cache()
+    page_cache.add(key, 0, timeout=None)
+    try:
+        page_cache.incr(key)
+    except ValueError:
+        page_cache.set(key, 1, timeout=None)
+
+
+def get_recipe_page(recipe_slug, servings_multiplier):
+    """
+    Looks up a rendered recipe page and counts the lookup as a hit or a miss
+
+    @param recipe_slug: slug of the recipe
+    @param servings_multiplier: servings multiplier the page is rendered for
+    @return: dictionary with the recipe, its picture and rendered fragments or None if the page is not cached
+    """
+    recipe_page = get_page_cache().get(recipe_page_key(recipe_slug, servings_multiplier))
+    count(MISSES_KEY if recipe_page is None else HITS_KEY)
+    return recipe_page
+
+
+def set_recipe_page(recipe_slug, servings_multiplier, recipe_page):
+    """
+    Stores a rendered recipe page for RECIPE_PAGE_CACHE_TIMEOUT seconds, so that processes which did not see a
+    change of the recipe stop serving the old page; pages for unsupported multipliers are not cached
+
+    @param recipe_slug: slug of the recipe
+    @param servings_multiplier: servings multiplier the page is rendered for
+    @param recipe_page: dictionary with the recipe, its picture and rendered fragments
+    """
+    if servings_multiplier in get_servings_multipliers():
+        get_page_cache().set(recipe_page_key(recipe_slug, servings_multiplier), recipe_page,
+                             timeout=getattr(settings, 'RECIPE_PAGE_CACHE_TIMEOUT', DEFAULT_RECIPE_PAGE_CACHE_TIMEOUT))
+
+
+def invalidate_recipe_pages(recipe_slugs):
+    """
+    Drops cached pages of recipes for every supported multiplier
+
+    @param recipe_slugs: slugs of changed recipes
+    """
+    keys = [recipe_page_key(recipe_slug, servings_multiplier)
+            for recipe_slug in set(recipe_slugs)
+            for servings_multiplier in get_servings_multipliers()]
+    if keys:
+        get_page_cache().delete_many(keys)
+
+
+def get_stats():
+    """
+    Reads the page cache counters
+
+    @return: dictionary with amounts of page cache hits and misses
+    """
+    counters = get_page_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+    }
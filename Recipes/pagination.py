@@ -0,0 +1,208 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+AFTER_PARAMETER = 'po'
+BEFORE_PARAMETER = 'przed'
+
+DEFAULT_PAGE_SIZE = 24
+
+
+@dataclass
+class KeysetPage:
+    """
+    Page of a listing together with cursors pointing at the neighbouring pages
+    """
+    items: list
+    next_cursor: str = None
+    previous_cursor: str = None
+    query: dict = field(default_factory=dict)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def next_query(self):
+        """
+        Builds query parameters linking to the next page
+
+        @return: query string of the next page or None if this is the last page
+        """
+        return urlencode({**self.query, AFTER_PARAMETER: self.next_cursor}) if self.next_cursor else None
+
+    @property
+    def previous_query(self):
+        """
+        Builds query parameters linking to the previous page
+
+        @return: query string of the previous page or None if this is the first page
+        """
+        return urlencode({**self.query, BEFORE_PARAMETER: self.previous_cursor}) if self.previous_cursor else None
+
+
+def get_page_size():
+    """
+    Reads the page size of listings from LISTING_PAGE_SIZE setting
+
+    @return: amount of items on a page
+    """
+    return getattr(settings, 'LISTING_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+
+def encode_cursor(values):
+    """
+    Packs key values of a listing item into an url safe cursor
+
+    @param values: list of JSON serializable key values
+    @return: cursor string
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Unpacks a cursor created by encode_cursor
+
+    @param cursor: cursor string from the url
+    @return: list of key values or None if the cursor is missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def get_cursors(request):
+    """
+    Reads the after and before cursors from query parameters of a request
+
+    @param request: current request
+    @return: decoded after and before cursors, None for missing ones
+    """
+    return decode_cursor(request.GET.get(AFTER_PARAMETER)), decode_cursor(request.GET.get(BEFORE_PARAMETER))
+
+
+def cursor_value(value):
+    """
+    Converts a key value into something JSON can store
+
+    @param value: key value read from an item
+    @return: JSON serializable value
+    """
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def keyset_filter(ordering, values, forward):
+    """
+    Builds a filter selecting rows placed after (or before) the row with given key values in the given ordering
+
+    @param ordering: field names, prefixed with '-' for descending order
+    @param values: key values of the boundary row
+    @param forward: True for rows after the boundary, False for rows before it
+    @return: Q object
+    """
+    condition = Q()
+    equal = Q()
+    for ordering_field, value in zip(ordering, values):
+        descending = ordering_field.startswith('-')
+        field_name = ordering_field.lstrip('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{field_name}__{lookup}': value})
+        equal &= Q(**{field_name: value})
+    return condition
+
+
+def page_query(queryset, ordering, after=None, before=None, page_size=None):
+    """
+    Builds the query fetching a page of a queryset with keyset pagination together with one row beyond it telling
+    whether there are more pages in the fetched direction
+
+    @param queryset: queryset to paginate
+    @param ordering: field names, prefixed with '-' for descending order; the last one must be unique
+    @param after: key values of the last item of the previous page
+    @param before: key values of the first item of the next page
+    @param page_size: amount of items on a page, LISTING_PAGE_SIZE setting by default
+    @return: sliced queryset, True if it fetches rows backwards from the before cursor and the after cursor in use
+    """
+    page_size = page_size or get_page_size()
+    try:
+        before_queryset = queryset.filter(keyset_filter(ordering, before, forward=False)) if before else None
+        after_queryset = queryset.filter(keyset_filter(ordering, after, forward=True)) if after else None
+    except (ValidationError, ValueError, TypeError):
+        before_queryset = after_queryset = None
+    if before_queryset is not None and len(before) == len(ordering):
+        reversed_ordering = [field_name[1:] if field_name.startswith('-') else f'-{field_name}'
+                             for field_name in ordering]
+        return before_queryset.order_by(*reversed_ordering)[:page_size + 1], True, None
+    if after_queryset is not None and len(after) == len(ordering):
+        queryset = after_queryset
+    else:
+        after = None
+    return queryset.order_by(*ordering)[:page_size + 1], False, after
+
+
+def build_page(rows, ordering, backwards, after, page_size=None):
+    """
+    Turns rows fetched with a query built by page_query into a page
+
+    @param rows: list of fetched rows
+    @param ordering: field names the rows are ordered by
+    @param backwards: True if the rows were fetched backwards from the before cursor
+    @param after: the after cursor in use
+    @param page_size: amount of items on a page, LISTING_PAGE_SIZE setting by default
+    @return: KeysetPage
+    """
+    page_size = page_size or get_page_size()
+    if backwards:
+        has_previous, has_next = len(rows) > page_size, True
+        items = rows[:page_size][::-1]
+    else:
+        has_previous, has_next = after is not None, len(rows) > page_size
+        items = rows[:page_size]
+
+    def item_cursor(item):
+        return encode_cursor([cursor_value(getattr(item, field_name.lstrip('-'))) for field_name in ordering])
+
+    return KeysetPage(
+        items=items,
+        next_cursor=item_cursor(items[-1]) if items and has_next else None,
+        previous_cursor=item_cursor(items[0]) if items and has_previous else None,
+    )
+
+
+def paginate_queryset(queryset, ordering, after=None, before=None, page_size=None):
+    """
+    Cuts a page out of a queryset with keyset pagination; the cost of a page does not depend on how deep it is as
+    long as the ordering is backed by an index
+
+    @param queryset: queryset to paginate
+    @param ordering: field names, prefixed with '-' for descending order; the last one must be unique
+    @param after: key values of the last item of the previous page
+    @param before: key values of the first item of the next page
+    @param page_size: amount of items on a page, LISTING_PAGE_SIZE setting by default
+    @return: KeysetPage
+    """
+    rows, backwards, after = page_query(queryset, ordering, after, before, page_size)
+    return build_page(list(rows), ordering, backwards, after, page_size)
+
+
+async def apaginate_queryset(queryset, ordering, after=None, before=None, page_size=None):
+    """
+    Asynchronous variant of paginate_queryset fetching the page with the async ORM
+
+    @return: KeysetPage
+    """
+    rows, backwards, after = page_query(queryset, ordering, after, before, page_size)
+    return build_page([row async for row in rows], ordering, backwards, after, page_size)
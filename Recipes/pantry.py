@@ -0,0 +1,193 @@
+import heapq
+import threading
+from collections import Counter, defaultdict
+
+from Recipes.models import RecipeIngredient, RecipeCard, Ingredient
+from Recipes.process_index import ProcessIndex
+
+DEFAULT_PANTRY_RESULTS = 24
+
+MAX_PANTRY_RESULTS = 100
+
+
+def coverage_key(hit):
+    """
+    Orders pantry hits from the recipe with the biggest part of its ingredients covered, then the most covered
+    ingredients, then by primary key so that the order is stable
+
+    @param hit: (recipe primary key, covered ingredients, required ingredients) triple
+    @return: sort key
+    """
+    recipe_pk, covered, required = hit
+    return -covered / required, -covered, recipe_pk
+
+
+class PantryIndex:
+    """
+    Posting lists mapping every ingredient to recipes using it, together with the set of ingredients of every recipe,
+    answering which recipes are best covered by a set of owned ingredients
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._recipe_ingredients = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._recipe_ingredients)
+
+    def set_recipe(self, recipe_pk, ingredient_pks):
+        """
+        Adds a recipe with its ingredients or replaces ingredients of an already indexed recipe; recipes without
+        ingredients are removed
+
+        @param recipe_pk: primary key of the recipe
+        @param ingredient_pks: primary keys of ingredients the recipe requires
+        """
+        ingredient_pks = frozenset(ingredient_pks)
+        with self._lock:
+            self._remove(recipe_pk)
+            if not ingredient_pks:
+                return
+            for ingredient_pk in ingredient_pks:
+                self._postings[ingredient_pk].add(recipe_pk)
+            self._recipe_ingredients[recipe_pk] = ingredient_pks
+
+    def remove_recipe(self, recipe_pk):
+        """
+        Removes a recipe from the index if it is indexed
+
+        @param recipe_pk: primary key of the recipe
+        """
+        with self._lock:
+            self._remove(recipe_pk)
+
+    def _remove(self, recipe_pk):
+        for ingredient_pk in self._recipe_ingredients.pop(recipe_pk, ()):
+            recipes = self._postings[ingredient_pk]
+            recipes.discard(recipe_pk)
+            if not recipes:
+                del self._postings[ingredient_pk]
+
+    def recipe_ingredients(self, recipe_pk):
+        """
+        Returns ingredients of an indexed recipe
+
+        @param recipe_pk: primary key of the recipe
+        @return: frozenset of primary keys of ingredients the recipe requires
+        """
+        return self._recipe_ingredients.get(recipe_pk, frozenset())
+
+    def top(self, owned_ingredient_pks, limit=DEFAULT_PANTRY_RESULTS):
+        """
+        Counts owned ingredients of every recipe using at least one of them by walking their posting lists
+
+        @param owned_ingredient_pks: primary keys of ingredients the user has
+        @param limit: maximum amount of returned recipes
+        @return: list of (recipe primary key, covered ingredients, required ingredients) triples ordered by
+        coverage_key
+        """
+        covered = Counter()
+        with self._lock:
+            for ingredient_pk in set(owned_ingredient_pks):
+                covered.update(self._postings.get(ingredient_pk, ()))
+            hits = [(recipe_pk, count, len(self._recipe_ingredients[recipe_pk]))
+                    for recipe_pk, count in covered.items()]
+        return heapq.nsmallest(limit, hits, key=coverage_key)
+
+
+def recipe_ingredient_sets(**filters):
+    """
+    Reads distinct ingredients of recipes matching filters
+
+    @return: dictionary mapping recipe primary keys to sets of ingredient primary keys
+    """
+    ingredient_sets = defaultdict(set)
+    for recipe_pk, ingredient_pk in RecipeIngredient.objects.filter(**filters).values_list(
+            'recipe_id', 'ingredient_id').iterator():
+        ingredient_sets[recipe_pk].add(ingredient_pk)
+    return ingredient_sets
+
+
+def build_pantry_index():
+    """
+    Builds a new index from all links between recipes and ingredients in the database
+
+    @return: the index
+    """
+    index = PantryIndex()
+    for recipe_pk, ingredient_pks in recipe_ingredient_sets().items():
+        index.set_recipe(recipe_pk, ingredient_pks)
+    return index
+
+
+_pantry_index = ProcessIndex('pantry', build_pantry_index)
+
+
+def get_pantry_index():
+    """
+    Returns the process wide index building it from the database on first use and after changes made by other
+    processes
+
+    @return: the index
+    """
+    return _pantry_index.get()
+
+
+def reset_pantry_index():
+    """
+    Drops the index of every process so that it is rebuilt from the database on next use
+    """
+    _pantry_index.reset()
+
+
+def update_recipe(recipe_pk):
+    """
+    Rereads ingredients of a recipe whose ingredient links changed if the index has already been built
+
+    @param recipe_pk: primary key of the changed recipe
+    """
+    def reread(index):
+        index.set_recipe(recipe_pk, recipe_ingredient_sets(recipe_id=recipe_pk)[recipe_pk])
+
+    _pantry_index.update(reread)
+
+
+def remove_recipe(recipe_pk):
+    """
+    Removes a deleted recipe from the index if it has already been built
+
+    @param recipe_pk: primary key of the deleted recipe
+    """
+    _pantry_index.update(lambda index: index.remove_recipe(recipe_pk))
+
+
+def find_pantry_recipes(ingredient_slugs, limit=DEFAULT_PANTRY_RESULTS):
+    """
+    Finds recipes best covered by owned ingredients and loads their cards and names of ingredients still missing
+
+    @param ingredient_slugs: slugs of ingredients the user has
+    @param limit: maximum amount of returned recipes, capped at MAX_PANTRY_RESULTS
+    @return: owned Ingredient objects and a list of dictionaries with a recipe card, amounts of covered and required
+    ingredients and names of missing ones, ordered from the best covered recipe
+    """
+    ingredient_slugs = [slug for slug in ingredient_slugs if slug]
+    if not ingredient_slugs:
+        return [], []
+    owned = list(Ingredient.objects.filter(slug__in=ingredient_slugs).order_by('name'))
+    owned_pks = {ingredient.pk for ingredient in owned}
+    index = get_pantry_index()
+    hits = index.top(owned_pks, min(limit, MAX_PANTRY_RESULTS))
+    if not hits:
+        return owned, []
+
+    missing = {recipe_pk: index.recipe_ingredients(recipe_pk) - owned_pks for recipe_pk, covered, required in hits}
+    cards = RecipeCard.objects.in_bulk([recipe_pk for recipe_pk, covered, required in hits])
+    missing_pks = set().union(*missing.values())
+    names = dict(Ingredient.objects.filter(pk__in=missing_pks).values_list('pk', 'name')) if missing_pks else {}
+    return owned, [{
+        'recipe': cards[recipe_pk],
+        'covered': covered,
+        'required': required,
+        'missing': sorted(names[ingredient_pk] for ingredient_pk in missing[recipe_pk] if ingredient_pk in names),
+    } for recipe_pk, covered, required in hits if recipe_pk in cards]
@@ -0,0 +1,101 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_INDEX_CACHE_ALIAS = 'default'
+
+
+def get_index_cache():
+    """
+    Returns the cache holding versions of indexes, configured with CATALOG_INDEX_CACHE_ALIAS setting
+
+    @return: cache backend
+    """
+    return caches[getattr(settings, 'CATALOG_INDEX_CACHE_ALIAS', DEFAULT_INDEX_CACHE_ALIAS)]
+
+
+def bump_version(key):
+    """
+    Increments a version kept in the index cache, starting it at 1 if it is missing
+
+    @param key: cache key of the version
+    @return: the new version
+    """
+    cache = get_index_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+class ProcessIndex:
+    """
+    Index kept in the memory of a process, built from the database on first use and updated in place by changes made
+    in this process. Other processes learn about the changes through a version in the index cache, which every change
+    increments: an index built under another version is rebuilt when it is read
+    """
+
+    def __init__(self, name, build):
+        """
+        @param name: name of the index in cache keys
+        @param build: function building the index from the database
+        """
+        self.version_key = f'index-version:{name}'
+        self._build = build
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """
+        Returns the index of this process without building it
+
+        @return: the index or None if it has not been built yet or the catalog changed in another process since
+        """
+        index = self._index
+        if index is not None and self._version == get_index_cache().get(self.version_key, 0):
+            return index
+        return None
+
+    def get(self):
+        """
+        Returns the index of this process, building it from the database if it has not been built yet or the catalog
+        changed in another process since
+
+        @return: the index
+        """
+        index = self.current()
+        if index is None:
+            with self._lock:
+                version = get_index_cache().get(self.version_key, 0)
+                if self._index is None or self._version != version:
+                    self._index = self._build()
+                    self._version = version
+                index = self._index
+        return index
+
+    def update(self, change):
+        """
+        Applies a change to the index of this process if it has been built and makes other processes rebuild theirs
+
+        @param change: function changing the index in place
+        """
+        with self._lock:
+            index, version = self._index, self._version
+            if index is not None:
+                change(index)
+        new_version = bump_version(self.version_key)
+        with self._lock:
+            if index is not None and self._index is index and self._version == version == new_version - 1:
+                self._version = new_version
+
+    def reset(self):
+        """
+        Drops the index of this process and makes other processes rebuild theirs from the database on next use
+        """
+        with self._lock:
+            self._index = None
+        bump_version(self.version_key)
@@ -0,0 +1,232 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_REQUEST_MS = 500
+
+REPORTED_DUPLICATES = 5
+
+_current_profile = ContextVar('request_profile', default=None)
+_original_template_render = Template.render
+_profiled_requests = 0
+_profiled_requests_lock = threading.Lock()
+
+
+class RequestProfile:
+    """
+    Collects timings and executed queries of a single request
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.view_started = None
+
+    def record_query(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper timing a query and remembering its SQL
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def sql_seconds(self):
+        """
+        @return: total time spent executing queries
+        """
+        return sum(duration for sql, duration in self.queries)
+
+    def duplicates(self):
+        """
+        Finds queries executed more than once with the same SQL, differing only in parameters at most
+
+        @return: list of (sql, times executed) pairs starting from the most repeated
+        """
+        return [(sql, executed) for sql, executed in Counter(sql for sql, duration in self.queries).most_common()
+                if executed > 1]
+
+    def summary(self, request, response):
+        """
+        Builds the structured log record of a finished request
+
+        @return: dictionary of request metrics with times in milliseconds
+        """
+        finished = time.perf_counter()
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(1000 * (finished - self.started), 3),
+            'view_ms': round(1000 * (finished - self.view_started), 3) if self.view_started is not None else 0,
+            'sql_ms': round(1000 * self.sql_seconds, 3),
+            'template_ms': round(1000 * self.template_seconds, 3),
+            'queries': len(self.queries),
+            'duplicate_queries': sum(executed - 1 for sql, executed in self.duplicates()),
+        }
+
+
+def profiled_template_render(template, context):
+    """
+    Replacement of Template.render adding the time of outermost renders to the profile of the current request;
+    included and extended templates are counted within their parent
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_template_render(template, context)
+    profile.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_template_render(template, context)
+    finally:
+        profile.template_depth -= 1
+        if profile.template_depth == 0:
+            profile.template_seconds += time.perf_counter() - start
+
+
+def server_timing(metrics):
+    """
+    Formats request metrics as a Server-Timing header value
+
+    @param metrics: dictionary built by RequestProfile.summary
+    @return: header value
+    """
+    return ', '.join([
+        f'sql;dur={metrics["sql_ms"]};desc="{metrics["queries"]} queries, {metrics["duplicate_queries"]} duplicate"',
+        f'tpl;dur={metrics["template_ms"]}',
+        f'view;dur={metrics["view_ms"]}',
+        f'total;dur={metrics["total_ms"]}',
+    ])
+
+
+@contextmanager
+def profiled_templates():
+    """
+    Times template renders while at least one request is profiled: profiled_template_render replaces Template.render
+    when the first profiled request starts and the original is put back when the last one ends
+    """
+    global _original_template_render, _profiled_requests
+    with _profiled_requests_lock:
+        if _profiled_requests == 0:
+            _original_template_render = Template.render
+            Template.render = profiled_template_render
+        _profiled_requests += 1
+    try:
+        yield
+    finally:
+        with _profiled_requests_lock:
+            _profiled_requests -= 1
+            if _profiled_requests == 0:
+                Template.render = _original_template_render
+
+
+@contextmanager
+def recorded_queries(profile):
+    """
+    Records queries into a profile; connections belong to a thread, so only queries of the calling thread are recorded
+
+    @param profile: RequestProfile to record into
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile.record_query))
+        yield
+
+
+@contextmanager
+def profiling():
+    """
+    Profiles the code run within: template renders are recorded into a new profile, queries only when made in this
+    thread, see recorded_queries
+
+    @return: context manager giving the RequestProfile
+    """
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        with profiled_templates():
+            yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in middleware measuring queries, SQL, template and view time of every request. Enabled with REQUEST_PROFILING
+    setting; metrics are sent as a Server-Timing header and logged as a JSON line, and requests slower than
+    REQUEST_PROFILING_SLOW_MS are logged together with their queries
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = getattr(settings, 'REQUEST_PROFILING_SLOW_MS', DEFAULT_SLOW_REQUEST_MS)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with profiling() as profile, recorded_queries(profile):
+            response = self.get_response(request)
+        return self.report(request, response, profile)
+
+    async def __acall__(self, request):
+        """
+        Profiles a request handled by async views and middleware without switching it to a thread; the ORM runs in
+        the thread sensitive executor of the request, so queries are recorded on connections of that thread
+        """
+        with profiling() as profile:
+            queries = ExitStack()
+            await sync_to_async(queries.enter_context)(recorded_queries(profile))
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(queries.close)()
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        """
+        Adds the Server-Timing header to the response of a profiled request and logs its metrics
+
+        @return: the response
+        """
+        metrics = profile.summary(request, response)
+        response['Server-Timing'] = server_timing(metrics)
+        logger.info(json.dumps(metrics))
+        if metrics['total_ms'] >= self.slow_request_ms:
+            logger.warning(json.dumps({
+                **metrics,
+                'duplicates': [{'sql': sql, 'executed': executed}
+                               for sql, executed in profile.duplicates()[:REPORTED_DUPLICATES]],
+                'query_list': [{'sql': sql, 'ms': round(1000 * duration, 3)} for sql, duration in profile.queries],
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Marks the moment the view starts; view time runs from here until the response is back in this middleware
+        """
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+        return None
@@ -0,0 +1,270 @@
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+TEASPOON_GRAMMAR_PL = {
+    1: "łyżeczka",
+    2: "łyżeczki",
+    5: "łyżeczek",
+    0: "łyżeczki",
+}
+
+TABLESPOON_GRAMMAR_PL = {
+    1: "łyżka",
+    2: "łyżki",
+    5: "łyżek",
+    0: "łyżki",
+}
+
+GLASS_GRAMMAR_PL = {
+    1: "szklanka",
+    2: "szklanki",
+    5: "szklanek",
+    0: "szklanki",
+}
+
+PINCH_GRAMMAR_PL = {
+    1: "szczypta",
+    2: "szczypty",
+    5: "szczypt",
+    0: "szczypty",
+}
+
+GRAM_GRAMMAR_PL = {
+    1: "gram",
+    2: "gramy",
+    5: "gramów",
+    0: "grama",
+}
+
+TO_TASTE_GRAMMAR_PL = {
+    0: "do smaku",
+}
+
+UNIT_GRAMMAR_PL = {
+    0: None,
+}
+
+PORTION_GRAMMAR_PL = {
+    1: "porcję",
+    2: "porcje",
+    5: "porcji",
+    0: "porcji",
+}
+
+MEASURE_GRAMMAR_PL = {
+    1: TEASPOON_GRAMMAR_PL,
+    2: TABLESPOON_GRAMMAR_PL,
+    3: GLASS_GRAMMAR_PL,
+    4: PINCH_GRAMMAR_PL,
+    5: GRAM_GRAMMAR_PL,
+    6: TO_TASTE_GRAMMAR_PL,
+    7: UNIT_GRAMMAR_PL,
+}
+
+COUNTABLE_MEASURES = (1, 2, 3, 5)
+PINCH_MEASURE = 4
+TO_TASTE_MEASURE = 6
+UNIT_MEASURE = 7
+
+ACCEPTED_FRACTIONS = (0, 0.25, 0.33, 0.5, 0.67, 0.75)
+
+FRACTIONS_DISPLAY = {
+    0: "",
+    0.25: "1/4",
+    0.33: "1/3",
+    0.5: "1/2",
+    0.67: "2/3",
+    0.75: "3/4",
+}
+
+DEFAULT_SERVINGS_MULTIPLIERS = (1, 2, 3, 4, 5)
+
+SERVINGS_PARAMETER = 'porcje'
+
+# Cookie older versions of recipe pages kept the servings multiplier in
+LEGACY_SERVINGS_COOKIE = 'servings_multiplier'
+
+IngredientAmount = namedtuple('IngredientAmount', (
+    'requires_display', 'has_decimal_place', 'decimal', 'fraction',
+    'requires_measure_name', 'ingredient_name', 'measure_name',
+))
+
+
+def get_servings_multipliers():
+    """
+    Reads the supported servings multipliers from SERVINGS_MULTIPLIERS setting
+
+    @return: sorted tuple of supported multipliers
+    """
+    return tuple(sorted(getattr(settings, 'SERVINGS_MULTIPLIERS', DEFAULT_SERVINGS_MULTIPLIERS)))
+
+
+def parse_servings_multiplier(value):
+    """
+    Reads a servings multiplier from a query parameter or cookie value
+
+    @param value: text of the value or None if it is missing
+    @return: the multiplier or None if the value is not one of supported multipliers
+    """
+    try:
+        servings_multiplier = int(value)
+    except (TypeError, ValueError):
+        return None
+    return servings_multiplier if servings_multiplier in get_servings_multipliers() else None
+
+
+def servings_url(recipe_path, servings_multiplier):
+    """
+    @param recipe_path: path of a recipe page
+    @param servings_multiplier: supported servings multiplier
+    @return: canonical url of the page for the multiplier, without the query parameter for 1
+    """
+    if servings_multiplier == 1:
+        return recipe_path
+    return f'{recipe_path}?{SERVINGS_PARAMETER}={servings_multiplier}'
+
+
+def grammar_form(amount):
+    """
+    Picks the key of Polish grammar tables matching an amount: 1 for one, 2 for two to four, 5 for five or more
+    whole pieces and 0 for fractions
+
+    @param amount: amount of the counted thing
+    @return: key of a grammar table
+    """
+    if amount == 1:
+        return 1
+    elif amount in (2, 3, 4):
+        return 2
+    elif amount >= 5 and amount % 1 == 0:
+        return 5
+    return 0
+
+
+def find_closest_fraction(value):
+    """
+    Finds the accepted fraction arithmetically closest to a given value by bisecting the sorted accepted fractions and
+    comparing the two neighbours; on a tie the lower fraction wins
+
+    @param value: fractional part of an amount
+    @return: closest accepted fraction
+    """
+    position = bisect_left(ACCEPTED_FRACTIONS, value)
+    if position == 0:
+        return ACCEPTED_FRACTIONS[0]
+    if position == len(ACCEPTED_FRACTIONS):
+        return ACCEPTED_FRACTIONS[-1]
+    lower, upper = ACCEPTED_FRACTIONS[position - 1], ACCEPTED_FRACTIONS[position]
+    return lower if abs(value - lower) <= abs(upper - value) else upper
+
+
+def calculate_dynamic_portions(recipe, servings_multiplier):
+    """
+    Recalculates the default amount of portions and applies grammar to name based on a servings multiplier
+
+    @param recipe: recipe for which portions are calculated
+    @param servings_multiplier: currently selected amount of servings
+    @return: amount of portions and grammatically correct name
+    """
+    dynamic_portions = recipe.servings * servings_multiplier
+    return PORTION_GRAMMAR_PL[grammar_form(dynamic_portions)], dynamic_portions
+
+
+def render_ingredient_amount(amount, measure, ingredient_names, servings_multiplier):
+    """
+    Recalculates the amount of an ingredient for a servings multiplier, splits it into whole and fractional part for
+    display and picks grammatically correct names of the measure and the ingredient
+
+    @param amount: amount of the ingredient for default servings
+    @param measure: measure key from MEASURE_CHOICES
+    @param ingredient_names: name_one, name_two, name_five and name_half forms of the ingredient name
+    @param servings_multiplier: currently selected amount of servings
+    @return: IngredientAmount ready for the template
+    """
+    name_one, name_two, name_five, name_half = ingredient_names
+    dynamic_amount = amount * servings_multiplier
+
+    if measure in (PINCH_MEASURE, TO_TASTE_MEASURE):
+        requires_display = False
+        has_decimal_place = False
+        decimal = None
+        fraction = None
+    else:
+        requires_display = True
+        fractional_part = dynamic_amount % 1
+        closest_fraction = find_closest_fraction(fractional_part)
+        fraction = FRACTIONS_DISPLAY[closest_fraction] if closest_fraction != 0 else None
+        if dynamic_amount >= 1:
+            has_decimal_place = True
+            decimal = str(int(dynamic_amount - fractional_part))
+        else:
+            has_decimal_place = False
+            decimal = None
+
+    requires_measure_name = True
+    measure_grammar = MEASURE_GRAMMAR_PL[measure]
+    if measure == UNIT_MEASURE:
+        requires_measure_name = False
+        measure_name = None
+        ingredient_name = {1: name_one, 2: name_two, 5: name_five, 0: name_half}[grammar_form(dynamic_amount)]
+    elif measure in COUNTABLE_MEASURES:
+        measure_name = measure_grammar[grammar_form(dynamic_amount)]
+        ingredient_name = name_half
+    elif measure == PINCH_MEASURE:
+        measure_name = measure_grammar[1]
+        ingredient_name = name_half
+    else:
+        measure_name = measure_grammar[0]
+        ingredient_name = name_one
+
+    return IngredientAmount(requires_display, has_decimal_place, decimal, fraction,
+                            requires_measure_name, ingredient_name, measure_name)
+
+
+@lru_cache(maxsize=8192)
+def scale_ingredient(amount, measure, ingredient_names, servings_multipliers):
+    """
+    Precomputes rendered amounts of an ingredient for every supported servings multiplier; results are memoized on
+    the ingredient values so that a changed ingredient simply gets a new entry
+
+    @param amount: amount of the ingredient for default servings
+    @param measure: measure key from MEASURE_CHOICES
+    @param ingredient_names: name_one, name_two, name_five and name_half forms of the ingredient name
+    @param servings_multipliers: tuple of supported multipliers
+    @return: dictionary mapping multipliers to IngredientAmount
+    """
+    return {servings_multiplier: render_ingredient_amount(amount, measure, ingredient_names, servings_multiplier)
+            for servings_multiplier in servings_multipliers}
+
+
+def recipe_ingredient_scaling(recipe_ingredient):
+    """
+    Returns the precomputed scaling table of a RecipeIngredient with its ingredient loaded
+
+    @param recipe_ingredient: RecipeIngredient object
+    @return: dictionary mapping supported multipliers to IngredientAmount
+    """
+    ingredient = recipe_ingredient.ingredient
+    ingredient_names = (ingredient.name_one, ingredient.name_two, ingredient.name_five, ingredient.name_half)
+    return scale_ingredient(recipe_ingredient.amount, recipe_ingredient.measure, ingredient_names,
+                            get_servings_multipliers())
+
+
+def scale_recipe_ingredient(recipe_ingredient, servings_multiplier):
+    """
+    Renders a RecipeIngredient for a servings multiplier using the precomputed table when the multiplier is supported
+
+    @param recipe_ingredient: RecipeIngredient object
+    @param servings_multiplier: currently selected amount of servings
+    @return: IngredientAmount ready for the template
+    """
+    scaling = recipe_ingredient_scaling(recipe_ingredient)
+    if servings_multiplier in scaling:
+        return scaling[servings_multiplier]
+    ingredient = recipe_ingredient.ingredient
+    ingredient_names = (ingredient.name_one, ingredient.name_two, ingredient.name_five, ingredient.name_half)
+    return render_ingredient_amount(recipe_ingredient.amount, recipe_ingredient.measure, ingredient_names,
+                                    servings_multiplier)
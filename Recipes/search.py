@@ -0,0 +1,416 @@
+import asyncio
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
+from Recipes.models import Recipe, RecipeCard, Ingredient
+from Recipes.pagination import KeysetPage, encode_cursor, get_page_size
+from Recipes.process_index import ProcessIndex
+
+POLISH_LETTERS = str.maketrans('ąćęłńóśźżĄĆĘŁŃÓŚŹŻ', 'acelnoszzACELNOSZZ')
+
+STOP_WORDS = frozenset(('a', 'do', 'i', 'na', 'o', 'oraz', 'w', 'z', 'ze'))
+
+STEM_SUFFIXES = tuple(sorted((
+    'ach', 'ami', 'ego', 'emu', 'ich', 'owi', 'ych', 'ymi', 'imi',
+    'em', 'ia', 'ie', 'om', 'ow',
+    'a', 'e', 'i', 'o', 'u', 'y',
+), key=len, reverse=True))
+
+MIN_STEM_LENGTH = 3
+
+MIN_PREFIX_LENGTH = 3
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+RECIPE_FIELD_WEIGHTS = (
+    ('name', 5.0),
+    ('meal_description', 2.0),
+    ('prep_instructions', 1.0),
+)
+
+INGREDIENT_FIELD_WEIGHTS = (
+    ('name', 5.0),
+    ('name_one', 4.0),
+    ('name_two', 4.0),
+    ('name_five', 4.0),
+    ('name_half', 4.0),
+)
+
+RECIPE = 'recipe'
+INGREDIENT = 'ingredient'
+
+
+def fold_diacritics(text):
+    """
+    Lowercases the text and strips Polish and any other diacritics from it
+
+    @param text: text to normalize
+    @return: lowercase text without diacritics
+    """
+    text = text.translate(POLISH_LETTERS).lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(character for character in text if not unicodedata.combining(character))
+
+
+def stem(word):
+    """
+    Cuts off the longest known Polish inflectional suffix as long as a stem of at least MIN_STEM_LENGTH letters remains
+
+    @param word: folded word
+    @return: stem of the word
+    """
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def split_words(text):
+    """
+    Splits text into folded words skipping stop words
+
+    @param text: text to split
+    @return: list of folded words
+    """
+    return [word for word in TOKEN_PATTERN.findall(fold_diacritics(text or '')) if word not in STOP_WORDS]
+
+
+def tokenize(text):
+    """
+    Splits text into stemmed search terms
+
+    @param text: text to split
+    @return: list of search terms
+    """
+    return [stem(word) for word in split_words(text)]
+
+
+def ranking_key(hit):
+    """
+    Orders search hits from the highest score; ties are resolved by document key to keep the order stable
+
+    @param hit: (document key, score) pair
+    @return: sorting key
+    """
+    document_key, score = hit
+    return -score, document_key
+
+
+class SearchIndex:
+    """
+    Inverted index mapping search terms to weighted documents; documents are identified by (kind, primary key) pairs
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._document_terms = {}
+        self._vocabulary = []
+        self._vocabulary_is_stale = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._document_terms)
+
+    def add(self, document_key, weighted_texts):
+        """
+        Adds a document to the index or replaces it if it is already indexed
+
+        @param document_key: (kind, primary key) pair identifying the document
+        @param weighted_texts: pairs of text and weight of the field it comes from
+        """
+        term_weights = defaultdict(float)
+        for text, weight in weighted_texts:
+            for term in tokenize(text):
+                term_weights[term] += weight
+        with self._lock:
+            self._remove(document_key)
+            for term, weight in term_weights.items():
+                if term not in self._postings:
+                    self._vocabulary_is_stale = True
+                self._postings[term][document_key] = weight
+            self._document_terms[document_key] = tuple(term_weights)
+
+    def remove(self, document_key):
+        """
+        Removes a document from the index if it is indexed
+
+        @param document_key: (kind, primary key) pair identifying the document
+        """
+        with self._lock:
+            self._remove(document_key)
+
+    def _remove(self, document_key):
+        for term in self._document_terms.pop(document_key, ()):
+            documents = self._postings[term]
+            documents.pop(document_key, None)
+            if not documents:
+                del self._postings[term]
+                self._vocabulary_is_stale = True
+
+    def _prefix_terms(self, prefix):
+        if self._vocabulary_is_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_is_stale = False
+        position = bisect_left(self._vocabulary, prefix)
+        terms = []
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            terms.append(self._vocabulary[position])
+            position += 1
+        return terms
+
+    def search(self, query, limit=None, after=None, before=None):
+        """
+        Finds documents containing every word of the query; the last word may also be an unfinished prefix of an
+        indexed term. Each matching term contributes its field weight times its inverse document frequency
+
+        @param query: searched phrase
+        @param limit: maximum amount of returned documents, all of them if None
+        @param after: (document key, score) hit; only documents ranked below it are returned
+        @param before: (document key, score) hit; only documents ranked above it are returned, the closest ones if
+        limited
+        @return: list of (document key, score) pairs ordered from the best match
+        """
+        words = split_words(query)
+        if not words:
+            return []
+        with self._lock:
+            document_count = len(self._document_terms)
+            scores = None
+            for position, word in enumerate(words):
+                terms = {stem(word)}
+                if position == len(words) - 1 and len(word) >= MIN_PREFIX_LENGTH:
+                    terms.update(self._prefix_terms(word))
+                word_scores = defaultdict(float)
+                for term in terms:
+                    documents = self._postings.get(term)
+                    if not documents:
+                        continue
+                    idf = math.log(1 + document_count / len(documents))
+                    for document_key, weight in documents.items():
+                        word_scores[document_key] = max(word_scores[document_key], weight * idf)
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {key: score + word_scores[key] for key, score in scores.items() if key in word_scores}
+                if not scores:
+                    return []
+        hits = scores.items()
+        if after is not None:
+            boundary = ranking_key(after)
+            hits = [hit for hit in hits if ranking_key(hit) > boundary]
+        elif before is not None:
+            boundary = ranking_key(before)
+            hits = [hit for hit in hits if ranking_key(hit) < boundary]
+            if limit is not None:
+                return sorted(heapq.nlargest(limit, hits, key=ranking_key), key=ranking_key)
+        if limit is not None:
+            return heapq.nsmallest(limit, hits, key=ranking_key)
+        return sorted(hits, key=ranking_key)
+
+
+def recipe_document(recipe):
+    """
+    Collects the indexed fields of a recipe
+
+    @param recipe: Recipe object
+    @return: document key and weighted texts of a recipe
+    """
+    return (RECIPE, recipe.pk), [(getattr(recipe, field), weight) for field, weight in RECIPE_FIELD_WEIGHTS]
+
+
+def ingredient_document(ingredient):
+    """
+    Collects the indexed grammatical forms of an ingredient
+
+    @param ingredient: Ingredient object
+    @return: document key and weighted texts of an ingredient
+    """
+    return (INGREDIENT, ingredient.pk), [(getattr(ingredient, field), weight)
+                                         for field, weight in INGREDIENT_FIELD_WEIGHTS]
+
+
+def build_search_index():
+    """
+    Builds a new index from all recipes and searchable ingredients in the database
+
+    @return: the index
+    """
+    index = SearchIndex()
+    recipe_fields = [field for field, weight in RECIPE_FIELD_WEIGHTS]
+    for recipe in Recipe.objects.only(*recipe_fields).iterator():
+        index.add(*recipe_document(recipe))
+    ingredient_fields = [field for field, weight in INGREDIENT_FIELD_WEIGHTS]
+    for ingredient in Ingredient.objects.filter(is_searchable=True).only(*ingredient_fields).iterator():
+        index.add(*ingredient_document(ingredient))
+    return index
+
+
+_search_index = ProcessIndex('search', build_search_index)
+
+
+def get_search_index():
+    """
+    Returns the process wide index building it from the database on first use and after changes made by other
+    processes
+
+    @return: the index
+    """
+    return _search_index.get()
+
+
+def reset_search_index():
+    """
+    Drops the index of every process so that it is rebuilt from the database on next use
+    """
+    _search_index.reset()
+
+
+def update_recipe(recipe):
+    """
+    Reindexes a saved recipe if the index has already been built
+
+    @param recipe: saved Recipe object
+    """
+    _search_index.update(lambda index: index.add(*recipe_document(recipe)))
+
+
+def remove_recipe(recipe_pk):
+    """
+    Removes a deleted recipe from the index if it has already been built
+
+    @param recipe_pk: primary key of the deleted recipe
+    """
+    _search_index.update(lambda index: index.remove((RECIPE, recipe_pk)))
+
+
+def update_ingredient(ingredient):
+    """
+    Reindexes a saved ingredient if the index has already been built; ingredients that are not searchable are removed
+
+    @param ingredient: saved Ingredient object
+    """
+    if ingredient.is_searchable:
+        _search_index.update(lambda index: index.add(*ingredient_document(ingredient)))
+    else:
+        _search_index.update(lambda index: index.remove((INGREDIENT, ingredient.pk)))
+
+
+def remove_ingredient(ingredient_pk):
+    """
+    Removes a deleted ingredient from the index if it has already been built
+
+    @param ingredient_pk: primary key of the deleted ingredient
+    """
+    _search_index.update(lambda index: index.remove((INGREDIENT, ingredient_pk)))
+
+
+def hit_from_cursor(cursor):
+    """
+    Turns decoded cursor values back into a search hit
+
+    @param cursor: [score, kind, primary key] list or None
+    @return: (document key, score) hit or None if the cursor does not describe one
+    """
+    if cursor is None or len(cursor) != 3:
+        return None
+    score, kind, pk = cursor
+    if not isinstance(score, (int, float)) or kind not in (RECIPE, INGREDIENT) or not isinstance(pk, int):
+        return None
+    return (kind, pk), score
+
+
+def find_hits(index, searched, after, before, page_size):
+    """
+    Runs the searched phrase against the index of this process and cuts a page of hits
+
+    @param index: SearchIndex of this process
+    @param searched: searched phrase
+    @param after: cursor of the last result of the previous page
+    @param before: cursor of the first result of the next page
+    @param page_size: amount of results on a page
+    @return: list of ((kind, primary key), score) hits and flags telling whether previous and next pages exist
+    """
+    after, before = hit_from_cursor(after), hit_from_cursor(before)
+    hits = index.search(searched or '', page_size + 1, after=after, before=before)
+    if before is not None:
+        return hits[-page_size:], len(hits) > page_size, True
+    return hits[:page_size], after is not None, len(hits) > page_size
+
+
+def build_search_page(hits, has_previous, has_next, objects):
+    """
+    Turns a page of hits and their loaded objects into a page of results; hits of objects deleted in the meantime are
+    skipped
+
+    @param hits: list of ((kind, primary key), score) hits
+    @param has_previous: a previous page exists
+    @param has_next: a next page exists
+    @param objects: dictionary mapping kinds to dictionaries of loaded objects by primary key
+    @return: KeysetPage of (kind, object) pairs
+    """
+    def hit_cursor(hit):
+        (kind, pk), score = hit
+        return encode_cursor([score, kind, pk])
+
+    return KeysetPage(
+        items=[(kind, objects[kind][pk]) for (kind, pk), score in hits if pk in objects[kind]],
+        next_cursor=hit_cursor(hits[-1]) if hits and has_next else None,
+        previous_cursor=hit_cursor(hits[0]) if hits and has_previous else None,
+    )
+
+
+def hit_pks(hits, kind):
+    """
+    @return: primary keys of hits of a kind
+    """
+    return [pk for (hit_kind, pk), score in hits if hit_kind == kind]
+
+
+def search_catalog(searched, after=None, before=None, page_size=None):
+    """
+    Runs the searched phrase against the index and loads a page of cards of matching recipes and matching ingredients
+
+    @param searched: searched phrase
+    @param after: cursor values of the last result of the previous page
+    @param before: cursor values of the first result of the next page
+    @param page_size: amount of results on a page, LISTING_PAGE_SIZE setting by default
+    @return: KeysetPage of (kind, object) pairs where kind is RECIPE with a RecipeCard or INGREDIENT with an
+    Ingredient, ordered from the best match
+    """
+    hits, has_previous, has_next = find_hits(get_search_index(), searched, after, before,
+                                             page_size or get_page_size())
+    recipe_pks, ingredient_pks = hit_pks(hits, RECIPE), hit_pks(hits, INGREDIENT)
+    objects = {
+        RECIPE: RecipeCard.objects.in_bulk(recipe_pks) if recipe_pks else {},
+        INGREDIENT: Ingredient.objects.in_bulk(ingredient_pks) if ingredient_pks else {},
+    }
+    return build_search_page(hits, has_previous, has_next, objects)
+
+
+async def asearch_catalog(searched, after=None, before=None, page_size=None):
+    """
+    Asynchronous variant of search_catalog loading recipe cards and ingredients concurrently with the async ORM,
+    skipping queries for kinds without hits; the index is built in a worker thread if the one of this process has not
+    been built yet or is out of date
+
+    @return: KeysetPage of (kind, object) pairs
+    """
+    index = _search_index.current()
+    if index is None:
+        index = await sync_to_async(get_search_index)()
+    hits, has_previous, has_next = find_hits(index, searched, after, before, page_size or get_page_size())
+    recipe_pks, ingredient_pks = hit_pks(hits, RECIPE), hit_pks(hits, INGREDIENT)
+    recipes, ingredients = await asyncio.gather(
+        RecipeCard.objects.ain_bulk(recipe_pks),
+        Ingredient.objects.ain_bulk(ingredient_pks),
+    )
+    return build_search_page(hits, has_previous, has_next, {RECIPE: recipes, INGREDIENT: ingredients})
@@ -0,0 +1,135 @@
+from array import array
+
+from Recipes.models import Recipe, RecipeIngredient
+from Recipes.scaling import render_ingredient_amount
+
+RECIPE_PARAMETER = 'przepis'
+
+SERVINGS_SEPARATOR = ':'
+
+MAX_SERVINGS_MULTIPLIER = 20
+
+TEASPOON_MEASURE = 1
+TABLESPOON_MEASURE = 2
+GLASS_MEASURE = 3
+
+VOLUME = 'volume'
+
+# Volumes of spoon and glass measures in millilitres, the unit volume amounts are summed in; ordered from the
+# biggest measure, which is the order totals are expressed in
+VOLUME_MEASURES_ML = (
+    (GLASS_MEASURE, 250),
+    (TABLESPOON_MEASURE, 15),
+    (TEASPOON_MEASURE, 5),
+)
+
+# Maps every measure to the group of measures it can be summed with and the factor converting it to the base unit
+# of the group; measures that cannot be converted, grams included, are groups of their own
+MEASURE_GROUPS = {
+    **{measure: (VOLUME, millilitres) for measure, millilitres in VOLUME_MEASURES_ML},
+    4: (4, 1),
+    5: (5, 1),
+    6: (6, 1),
+    7: (7, 1),
+}
+
+SHOPPING_LIST_FIELDS = ('recipe__slug', 'ingredient_id', 'measure', 'amount', 'ingredient__name',
+                        'ingredient__name_one', 'ingredient__name_two', 'ingredient__name_five',
+                        'ingredient__name_half', 'ingredient__slug', 'ingredient__is_searchable')
+
+
+def parse_shopping_plan(values):
+    """
+    Reads recipes and servings multipliers from query parameter values in the form slug or slug:multiplier; a recipe
+    given more than once has its multipliers added up, malformed multipliers count as 1
+
+    @param values: values of RECIPE_PARAMETER query parameters
+    @return: dictionary mapping recipe slugs to servings multipliers
+    """
+    plan = {}
+    for value in values:
+        slug, _, servings_multiplier = value.strip().partition(SERVINGS_SEPARATOR)
+        if not slug:
+            continue
+        try:
+            servings_multiplier = min(max(int(servings_multiplier or 1), 1), MAX_SERVINGS_MULTIPLIER)
+        except ValueError:
+            servings_multiplier = 1
+        plan[slug] = min(plan.get(slug, 0) + servings_multiplier, MAX_SERVINGS_MULTIPLIER)
+    return plan
+
+
+def sum_amounts(rows, plan):
+    """
+    Adds up amounts of ingredients over recipes of a plan into one flat array, with one slot for every ingredient and
+    group of measures, converting measures of a group to its base unit
+
+    @param rows: (recipe slug, ingredient primary key, measure, amount) tuples, possibly followed by other values
+    @param plan: dictionary mapping recipe slugs to servings multipliers
+    @return: dictionary mapping (ingredient primary key, measure group) pairs to slots and the array of totals
+    """
+    slots = {}
+    totals = array('d')
+    for row in rows:
+        recipe_slug, ingredient_pk, measure, amount = row[:4]
+        group, factor = MEASURE_GROUPS[measure]
+        key = (ingredient_pk, group)
+        slot = slots.get(key)
+        if slot is None:
+            slot = slots[key] = len(totals)
+            totals.append(0.0)
+        totals[slot] += amount * factor * plan[recipe_slug]
+    return slots, totals
+
+
+def express_total(group, total):
+    """
+    Expresses a total of a measure group in a measure from MEASURE_CHOICES: volumes in the biggest spoon or glass
+    measure giving at least one, other groups in their own measure
+
+    @param group: measure group from MEASURE_GROUPS
+    @param total: total in the base unit of the group
+    @return: measure and amount
+    """
+    if group != VOLUME:
+        return group, total
+    for measure, millilitres in VOLUME_MEASURES_ML:
+        if total >= millilitres:
+            return measure, total / millilitres
+    measure, millilitres = VOLUME_MEASURES_ML[-1]
+    return measure, total / millilitres
+
+
+def build_shopping_list(plan):
+    """
+    Combines ingredients of recipes of a plan into a shopping list: rows of all the recipes are read in a single
+    query as plain tuples, summed by sum_amounts and rendered with the Polish grammar of recipe pages
+
+    @param plan: dictionary mapping recipe slugs to servings multipliers
+    @return: list of dictionaries with the ingredient slug, whether it is searchable and IngredientAmount fields,
+    ordered by ingredient name
+    """
+    if not plan:
+        return []
+    rows = list(RecipeIngredient.objects.filter(recipe__slug__in=list(plan)).values_list(*SHOPPING_LIST_FIELDS))
+    slots, totals = sum_amounts(rows, plan)
+    ingredients = {row[1]: row[4:] for row in rows}
+
+    shopping_list = []
+    for (ingredient_pk, group), slot in slots.items():
+        name, name_one, name_two, name_five, name_half, slug, is_searchable = ingredients[ingredient_pk]
+        measure, amount = express_total(group, totals[slot])
+        ingredient_amount = render_ingredient_amount(amount, measure, (name_one, name_two, name_five, name_half), 1)
+        shopping_list.append((name, measure, {'slug': slug, 'is_searchable': is_searchable,
+                                              **ingredient_amount._asdict()}))
+    shopping_list.sort(key=lambda item: item[:2])
+    return [item for _, _, item in shopping_list]
+
+
+def get_plan_recipes(plan):
+    """
+    @param plan: dictionary mapping recipe slugs to servings multipliers
+    @return: list of (recipe slug, name, servings multiplier) triples of existing recipes of the plan ordered by name
+    """
+    return [(slug, name, plan[slug]) for slug, name in Recipe.objects.filter(slug__in=list(plan)).order_by(
+        'name').values_list('slug', 'name')]
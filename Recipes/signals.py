@@ -0,0 +1,201 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from Recipes import autocomplete, pantry, search
+from Recipes.cards import refresh_recipe_cards, refresh_ingredient_recipes, deleted_recipe_pks, touch_ingredients
+from Recipes.models import Recipe, Ingredient, RecipeIngredient, RecipeImage, RecipeCategory, IngredientImage
+from Recipes.page_cache import invalidate_recipe_pages
+from Recipes.slugs import invalidate_slugs
+from Recipes.thumbnails import schedule_thumbnails
+
+
+def recipe_slugs(**filters):
+    """
+    Finds slugs of recipes matching filters
+
+    @return: list of slugs
+    """
+    return list(Recipe.objects.filter(**filters).values_list('slug', flat=True))
+
+
+def touch_recipes(**filters):
+    """
+    Marks recipes matching filters as modified now without sending their save signals, so that pages showing their
+    parts are not answered as unchanged
+
+    @return: list of slugs of the recipes
+    """
+    recipes = Recipe.objects.filter(**filters)
+    slugs = list(recipes.values_list('slug', flat=True))
+    if slugs:
+        recipes.update(updated_on=timezone.now())
+    return slugs
+
+
+def invalidate_recipes(slugs):
+    """
+    Drops cached pages and cached slug lookups of changed recipes
+
+    @param slugs: slugs of the recipes
+    """
+    slugs = list(slugs)
+    invalidate_recipe_pages(slugs)
+    invalidate_slugs(Recipe, slugs)
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(sender, instance, **kwargs):
+    """
+    Drops cached pages and the cached lookup of the slug a recipe had before it is renamed
+    """
+    if instance.pk is not None:
+        invalidate_recipes(recipe_slugs(pk=instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """
+    Keeps the search and autocomplete indexes, the recipe card and cached pages in line with a saved recipe
+    """
+    transaction.on_commit(partial(search.update_recipe, instance))
+    transaction.on_commit(partial(autocomplete.update_recipe, instance))
+    refresh_recipe_cards([instance.pk])
+    invalidate_recipes([instance.slug])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """
+    Marks a recipe as being deleted so that cascading deletions of its parts do not rebuild its card
+    """
+    deleted_recipe_pks().add(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """
+    Removes a deleted recipe from the search, autocomplete and pantry indexes and from cached pages
+    """
+    deleted_recipe_pks().discard(instance.pk)
+    transaction.on_commit(partial(search.remove_recipe, instance.pk))
+    transaction.on_commit(partial(autocomplete.remove_recipe, instance.pk))
+    transaction.on_commit(partial(pantry.remove_recipe, instance.pk))
+    invalidate_recipes([instance.slug])
+
+
+@receiver(pre_save, sender=Ingredient)
+def ingredient_saving(sender, instance, **kwargs):
+    """
+    Drops the cached lookup of the slug an ingredient had before it is renamed
+    """
+    if instance.pk is not None:
+        invalidate_slugs(Ingredient, Ingredient.objects.filter(pk=instance.pk).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, **kwargs):
+    """
+    Keeps the search and autocomplete indexes and cached pages of recipes using it in line with a saved ingredient
+    """
+    transaction.on_commit(partial(search.update_ingredient, instance))
+    transaction.on_commit(partial(autocomplete.update_ingredient, instance))
+    invalidate_recipes(touch_recipes(recipe_ingredients__ingredient_id=instance.pk))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    """
+    Drops cached pages of recipes using an ingredient before the links to them are deleted
+    """
+    invalidate_recipes(touch_recipes(recipe_ingredients__ingredient_id=instance.pk))
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    """
+    Removes a deleted ingredient from the search and autocomplete indexes and from cached slug lookups
+    """
+    transaction.on_commit(partial(search.remove_ingredient, instance.pk))
+    transaction.on_commit(partial(autocomplete.remove_ingredient, instance.pk))
+    invalidate_slugs(Ingredient, [instance.slug])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    """
+    Rebuilds reverse index entries, pantry index entry and drops cached pages of a recipe whose ingredient has changed
+    """
+    if instance.recipe_id not in deleted_recipe_pks():
+        transaction.on_commit(partial(pantry.update_recipe, instance.recipe_id))
+    refresh_ingredient_recipes([instance.recipe_id])
+    invalidate_recipes(touch_recipes(pk=instance.recipe_id))
+
+
+@receiver(post_save, sender=RecipeImage)
+@receiver(post_delete, sender=RecipeImage)
+def recipe_image_changed(sender, instance, **kwargs):
+    """
+    Rebuilds the card and drops cached pages of a recipe whose picture has changed
+    """
+    refresh_recipe_cards([instance.recipe_id])
+    invalidate_recipes(touch_recipes(pk=instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=RecipeCategory.recipe.through)
+def recipe_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Rebuilds cards of recipes added to or removed from a category
+    """
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_recipe_pks = list(instance.recipe.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        refresh_recipe_cards([instance.pk] if reverse else getattr(instance, '_cleared_recipe_pks', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_recipe_cards([instance.pk] if reverse else pk_set)
+
+
+@receiver(post_save, sender=RecipeCategory)
+def recipe_category_saved(sender, instance, **kwargs):
+    """
+    Rebuilds cards of recipes in a saved category
+    """
+    refresh_recipe_cards(instance.recipe.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=RecipeCategory)
+def recipe_category_deleting(sender, instance, **kwargs):
+    """
+    Remembers recipes of a category before it is deleted together with links to them
+    """
+    instance._deleted_recipe_pks = list(instance.recipe.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=RecipeCategory)
+def recipe_category_deleted(sender, instance, **kwargs):
+    """
+    Rebuilds cards of recipes that belonged to a deleted category
+    """
+    refresh_recipe_cards(getattr(instance, '_deleted_recipe_pks', []))
+
+
+@receiver(post_save, sender=IngredientImage)
+@receiver(post_delete, sender=IngredientImage)
+def ingredient_image_changed(sender, instance, **kwargs):
+    """
+    Marks an ingredient whose picture has changed as modified
+    """
+    touch_ingredients(Ingredient.objects.filter(pk=instance.ingredient_id))
+
+
+@receiver(post_save, sender=RecipeImage)
+@receiver(post_save, sender=IngredientImage)
+def image_saved(sender, instance, **kwargs):
+    """
+    Generates thumbnails of a saved picture
+    """
+    schedule_thumbnails(instance.image.name)
@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404
+from django.utils.text import slugify
+
+DEFAULT_SLUG_CACHE_SIZE = 10000
+
+DEFAULT_SLUG_CACHE_LOCAL_TIMEOUT = 10
+
+SlugEntry = namedtuple('SlugEntry', ('pk', 'modified'))
+
+
+def free_slug(base, taken, max_length):
+    """
+    Picks the base slug or the base with the lowest number appended that is not taken
+
+    @param base: slug derived from a name
+    @param taken: collection of slugs already in use
+    @param max_length: maximum length of the slug field
+    @return: free slug
+    """
+    slug = base
+    number = 2
+    while slug in taken:
+        suffix = f'-{number}'
+        slug = f'{base[:max_length - len(suffix)]}{suffix}'
+        number += 1
+    return slug
+
+
+def slug_base(model, name):
+    """
+    @return: slug derived from a name cut to the length of the slug field of a model
+    """
+    return slugify(name)[:model._meta.get_field('slug').max_length] or model._meta.model_name
+
+
+def unique_slug(model, name, pk=None):
+    """
+    Derives a slug from a name that no other object of a model uses yet by appending the lowest free number
+    to colliding slugs
+
+    @param model: model with a unique slug field
+    @param name: name the slug is derived from
+    @param pk: primary key of the object getting the slug, its own slug does not count as a collision
+    @return: unique slug
+    """
+    base = slug_base(model, name)
+    taken = set(model.objects.filter(slug__startswith=base).exclude(pk=pk).values_list('slug', flat=True))
+    return free_slug(base, taken, model._meta.get_field('slug').max_length)
+
+
+def assign_unique_slugs(model, objects):
+    """
+    Sets unique slugs on a batch of new objects with a single query unless their slugs collide
+
+    @param model: model with a unique slug field
+    @param objects: unsaved objects with names
+    """
+    max_length = model._meta.get_field('slug').max_length
+    bases = [slug_base(model, obj.name) for obj in objects]
+    taken = set(model.objects.filter(slug__in=set(bases)).values_list('slug', flat=True))
+    for obj, base in zip(objects, bases):
+        if base in taken:
+            taken.update(model.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+        obj.slug = free_slug(base, taken, max_length)
+        taken.add(obj.slug)
+
+
+class SlugCache:
+    """
+    Thread safe least recently used cache whose entries expire after a timeout
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        @param key: cache key
+        @return: cached value or None if it is missing or expired
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value, time.monotonic() + self.timeout
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_slug_cache = None
+_slug_cache_lock = threading.Lock()
+
+
+def get_slug_cache():
+    """
+    Returns the process local slug cache creating it on first use
+
+    @return: SlugCache sized with SLUG_CACHE_SIZE setting and expiring after SLUG_CACHE_LOCAL_TIMEOUT seconds
+    """
+    global _slug_cache
+    if _slug_cache is None:
+        with _slug_cache_lock:
+            if _slug_cache is None:
+                _slug_cache = SlugCache(getattr(settings, 'SLUG_CACHE_SIZE', DEFAULT_SLUG_CACHE_SIZE),
+                                        getattr(settings, 'SLUG_CACHE_LOCAL_TIMEOUT', DEFAULT_SLUG_CACHE_LOCAL_TIMEOUT))
+    return _slug_cache
+
+
+def reset_slug_cache():
+    """
+    Drops the process local slug cache
+    """
+    global _slug_cache
+    with _slug_cache_lock:
+        _slug_cache = None
+
+
+def get_shared_slug_cache():
+    """
+    Returns the cache backend shared between processes configured with SLUG_CACHE_ALIAS setting
+
+    @return: cache backend or None if slugs are only cached in the process
+    """
+    alias = getattr(settings, 'SLUG_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def slug_key(model, slug):
+    """
+    Builds the cache key of a slug
+
+    @param model: model the slug belongs to
+    @param slug: slug from the url
+    @return: cache key
+    """
+    return f'slug:{model._meta.label_lower}:{slug}'
+
+
+def get_cached_slug(model, slug):
+    """
+    Looks a slug up in the process local cache, then in the shared cache, without querying the database
+
+    @param model: Recipe or Ingredient
+    @param slug: slug from the url
+    @return: SlugEntry or None if the slug is not cached
+    """
+    key = slug_key(model, slug)
+    local_cache = get_slug_cache()
+    entry = local_cache.get(key)
+    if entry is None:
+        shared_cache = get_shared_slug_cache()
+        if shared_cache is not None:
+            entry = shared_cache.get(key)
+            if entry is not None:
+                local_cache.set(key, entry)
+    return entry
+
+
+def remember_slug(model, slug, pk, modified=None):
+    """
+    Caches the primary key and the last modification time of an object loaded by its slug
+
+    @param model: Recipe or Ingredient
+    @param slug: slug of the object
+    @param pk: primary key of the object
+    @param modified: last modification time of the object or None for models without updated_on field
+    @return: the cached SlugEntry
+    """
+    key = slug_key(model, slug)
+    entry = SlugEntry(pk, modified)
+    get_slug_cache().set(key, entry)
+    shared_cache = get_shared_slug_cache()
+    if shared_cache is not None:
+        shared_cache.set(key, entry, timeout=None)
+    return entry
+
+
+def resolve_slug(model, slug):
+    """
+    Turns a slug into the primary key and the last modification time of an object, querying the database only if
+    the slug is not cached
+
+    @param model: Recipe or Ingredient
+    @param slug: slug from the url
+    @return: SlugEntry, modified is None for models without updated_on field
+    @raise Http404: if no object has the slug
+    """
+    entry = get_cached_slug(model, slug)
+    if entry is not None:
+        return entry
+    fields = ['pk', 'updated_on'] if any(field.name == 'updated_on' for field in model._meta.fields) else ['pk']
+    row = model.objects.filter(slug=slug).values_list(*fields).first()
+    if row is None:
+        raise Http404(f'No {model._meta.object_name} matches the given query.')
+    return remember_slug(model, slug, *row)
+
+
+def invalidate_slugs(model, slugs):
+    """
+    Drops cached entries of changed or deleted objects
+
+    @param model: model the slugs belong to
+    @param slugs: slugs of changed objects
+    """
+    keys = [slug_key(model, slug) for slug in set(slugs)]
+    local_cache = get_slug_cache()
+    for key in keys:
+        local_cache.delete(key)
+    shared_cache = get_shared_slug_cache()
+    if shared_cache is not None and keys:
+        shared_cache.delete_many(keys)
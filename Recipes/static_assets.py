@@ -0,0 +1,97 @@
+import gzip
+import posixpath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.otf', '.eot')
+
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def gzip_compress(content):
+    """
+    @param content: bytes to compress
+    @return: gzip stream of the bytes without a modification time so that rebuilds produce identical files
+    """
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def brotli_compress(content):
+    """
+    @param content: bytes to compress
+    @return: brotli stream of the bytes
+    """
+    return brotli.compress(content, quality=11)
+
+
+def get_compressors():
+    """
+    @return: list of content encodings, file suffixes and compressing functions of precompressed variants, brotli only
+             when the optional brotli package is installed; the order is the order of preference when serving
+    """
+    compressors = [('gzip', '.gz', gzip_compress)]
+    if brotli is not None:
+        compressors.insert(0, ('br', '.br', brotli_compress))
+    return compressors
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Storage of collected static files which, on top of copies with content hashes in their names listed in the
+    manifest, writes gzip and brotli compressed variants of text files next to them; a web server or StaticFileView
+    sends the variant the browser accepts, and since a hashed name changes with every change of the content, these
+    files can be cached by browsers for STATIC_MAX_AGE without ever asking again
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        """
+        Hashes the files as ManifestStaticFilesStorage does, then compresses the original and hashed copies
+        """
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            names = {name}
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            if hashed_name:
+                names.add(hashed_name)
+            for compressed_name in names:
+                self.compress(compressed_name)
+
+    def compress(self, name):
+        """
+        Writes compressed variants of a stored file, skipping those that are not smaller than the file
+
+        @param name: name of the file in the storage
+        """
+        with self.open(name) as stored_file:
+            content = stored_file.read()
+        for encoding, suffix, compress in get_compressors():
+            compressed = compress(content)
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) < len(content):
+                self._save(name + suffix, ContentFile(compressed))
+
+    @cached_property
+    def immutable_names(self):
+        """
+        @return: set of hashed names from the manifest, files which never change under their name
+        """
+        return frozenset(self.hashed_files.values())
+
+    def is_immutable(self, name):
+        """
+        @param name: name of a file in the storage
+        @return: True if the name contains a content hash, so the file can be cached for STATIC_MAX_AGE
+        """
+        return posixpath.normpath(name) in self.immutable_names
@@ -0,0 +1,240 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve
+from django.utils import timezone
+
+from Recipes.fast_path import get_anonymous_user
+from Recipes.models import Recipe, Ingredient, CATEGORY_CHOICES
+from Recipes.scaling import get_servings_multipliers, servings_url
+
+# A static copy of the catalog for serving traffic spikes without Django: every recipe page at every servings
+# multiplier, every searchable ingredient page, every category page and the categories index are rendered by their
+# views, as an anonymous visitor gets them, into a directory tree mirroring their urls. Ingredient and category pages
+# are exported without their further pages and without links to them, since those carry keyset cursors in query
+# parameters which a web server does not map to files. Pages of recipes at a multiplier other than 1 are kept next to
+# the page of the recipe, which a web server finds for the query parameter, for example with nginx:
+#     location /przepis/ { try_files ${uri}porcje-$arg_porcje.html ${uri}index.html =404; }
+
+PAGE_FILE_NAME = 'index.html'
+
+STATE_FILE_NAME = '.static-export.json'
+
+DEFAULT_EXPORT_BATCH_SIZE = 50
+
+RECIPES_DIRECTORY = 'przepis'
+
+INGREDIENTS_DIRECTORY = 'skladnik'
+
+# Attribute marking requests of rendered pages, for which templates leave out pagination links
+STATIC_EXPORT_ATTRIBUTE = 'static_export'
+
+
+def servings_page_name(servings_multiplier):
+    """
+    @param servings_multiplier: supported servings multiplier
+    @return: name of the file of a recipe page at the multiplier
+    """
+    if servings_multiplier == 1:
+        return PAGE_FILE_NAME
+    return f'porcje-{servings_multiplier}.html'
+
+
+def recipe_pages(slug, servings_multipliers):
+    """
+    @param slug: slug of a recipe
+    @param servings_multipliers: supported servings multipliers
+    @return: list of (url, file path relative to the export directory) pairs of the recipe page at every multiplier
+    """
+    return [(servings_url(f'/{RECIPES_DIRECTORY}/{slug}/', servings_multiplier),
+             os.path.join(RECIPES_DIRECTORY, slug, servings_page_name(servings_multiplier)))
+            for servings_multiplier in servings_multipliers]
+
+
+def path_page(path):
+    """
+    @param path: path of a page without query parameters
+    @return: (url, file path relative to the export directory) pair of the page
+    """
+    return path, os.path.join(*path.strip('/').split('/'), PAGE_FILE_NAME)
+
+
+def list_pages(since=None):
+    """
+    Lists pages to export: recipe and ingredient pages changed after the last export, all of them without it, and
+    category pages which are always exported since they are few and any recipe change can reorder them. Versions of
+    recipes and ingredients change with their parts, pictures and listed recipes too, see Recipes.signals
+
+    @param since: time of the last export or None to list all pages
+    @return: list of (url, file path relative to the export directory) pairs
+    """
+    recipes = Recipe.objects.all()
+    ingredients = Ingredient.objects.filter(is_searchable=True)
+    if since is not None:
+        recipes = recipes.filter(updated_on__gt=since)
+        ingredients = ingredients.filter(updated_on__gt=since)
+    servings_multipliers = get_servings_multipliers()
+
+    pages = []
+    for slug in recipes.order_by('pk').values_list('slug', flat=True).iterator():
+        pages.extend(recipe_pages(slug, servings_multipliers))
+    for slug in ingredients.order_by('pk').values_list('slug', flat=True).iterator():
+        pages.append(path_page(f'/{INGREDIENTS_DIRECTORY}/{slug}/'))
+    pages.extend(path_page(f'/kategoria/{category_key}/') for category_key, _ in CATEGORY_CHOICES)
+    pages.append(path_page('/kategorie/'))
+    return pages
+
+
+def render_page(url):
+    """
+    Renders a page by its view as an anonymous visitor gets it, with async views run to completion and without
+    pagination links
+
+    @param url: url of the page, possibly with query parameters
+    @return: content of the page
+    @raise ValueError: if the view does not answer with the page
+    """
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    request.auser = get_anonymous_user
+    setattr(request, STATIC_EXPORT_ATTRIBUTE, True)
+    match = resolve(request.path_info)
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    response = view(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise ValueError(f'{url} answered with {response.status_code}')
+    return response.content
+
+
+def write_file(path, content):
+    """
+    Replaces a file at once, so that a web server serving the export never reads a half written page
+
+    @param path: path of the file
+    @param content: bytes to write
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as temporary:
+            temporary.write(content)
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def export_pages(output_dir, pages):
+    """
+    Renders a batch of pages into the export directory; run by workers of the process pool
+
+    @param output_dir: export directory
+    @param pages: list of (url, file path relative to the export directory) pairs
+    @return: amount of written pages and bytes
+    """
+    written_bytes = 0
+    for url, file_path in pages:
+        content = render_page(url)
+        write_file(os.path.join(output_dir, file_path), content)
+        written_bytes += len(content)
+    return len(pages), written_bytes
+
+
+def remove_stale_pages(output_dir, directory, slugs):
+    """
+    Removes exported pages of recipes or ingredients which were deleted, renamed or are no longer searchable
+
+    @param output_dir: export directory
+    @param directory: directory of the pages in the export directory
+    @param slugs: slugs of pages that should exist
+    @return: amount of removed directories
+    """
+    path = os.path.join(output_dir, directory)
+    if not os.path.isdir(path):
+        return 0
+    stale = [name for name in os.listdir(path) if name not in slugs]
+    for name in stale:
+        shutil.rmtree(os.path.join(path, name))
+    return len(stale)
+
+
+def read_state(output_dir):
+    """
+    Reads what the last export of a directory was made from
+
+    @param output_dir: export directory
+    @return: dictionary with the time the export started and the servings multipliers it was made for or None if the
+    directory has not been exported to
+    """
+    try:
+        with open(os.path.join(output_dir, STATE_FILE_NAME), encoding='utf-8') as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return None
+    state['exported_on'] = datetime.fromisoformat(state['exported_on'])
+    return state
+
+
+def write_state(output_dir, exported_on):
+    """
+    Records a finished export of a directory
+
+    @param output_dir: export directory
+    @param exported_on: time the export started
+    """
+    write_file(os.path.join(output_dir, STATE_FILE_NAME), json.dumps({
+        'exported_on': exported_on.isoformat(),
+        'servings_multipliers': get_servings_multipliers(),
+    }).encode())
+
+
+def export_static_site(output_dir, full=False, workers=None, batch_size=DEFAULT_EXPORT_BATCH_SIZE):
+    """
+    Exports the catalog as static pages; unless full is set or the supported servings multipliers have changed, only
+    pages of recipes and ingredients modified since the last export of the directory are rendered again. Workers are
+    forked, so that they share the configured Django, after closing database connections which they open anew
+
+    @param output_dir: export directory
+    @param full: export all pages
+    @param workers: amount of worker processes, the amount of processors by default, 0 to render in this process
+    @param batch_size: amount of pages a worker renders at once
+    @return: dictionary with amounts of exported pages, written bytes and removed stale directories and the time the
+    export took in seconds
+    """
+    started = time.perf_counter()
+    exported_on = timezone.now()
+    state = None if full else read_state(output_dir)
+    if state is not None and tuple(state.get('servings_multipliers', ())) != get_servings_multipliers():
+        state = None
+    pages = list_pages(state['exported_on'] if state is not None else None)
+    batches = [pages[start:start + batch_size] for start in range(0, len(pages), batch_size)]
+
+    if workers == 0:
+        results = [export_pages(output_dir, batch) for batch in batches]
+    else:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            results = list(executor.map(export_pages, [output_dir] * len(batches), batches))
+
+    removed = remove_stale_pages(output_dir, RECIPES_DIRECTORY, set(Recipe.objects.values_list('slug', flat=True)))
+    removed += remove_stale_pages(output_dir, INGREDIENTS_DIRECTORY, set(
+        Ingredient.objects.filter(is_searchable=True).values_list('slug', flat=True)))
+    write_state(output_dir, exported_on)
+    return {
+        'pages': sum(pages_count for pages_count, _ in results),
+        'bytes': sum(written_bytes for _, written_bytes in results),
+        'removed': removed,
+        'seconds': time.perf_counter() - started,
+    }
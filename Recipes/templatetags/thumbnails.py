@@ -0,0 +1,29 @@
+from django import template
+
+from Recipes.thumbnails import srcset, thumbnail_url, get_thumbnail_widths
+
+register = template.Library()
+
+DEFAULT_SIZES = '20rem'
+
+
+@register.inclusion_tag('Recipes/responsive-image.html')
+def responsive_image(image_name, alt, sizes=DEFAULT_SIZES):
+    """
+    Renders a picture with WebP and JPEG thumbnails of every width to choose from, falling back to the smallest JPEG
+
+    @param image_name: storage name of the original picture, empty if there is none
+    @param alt: alternative text of the picture
+    @param sizes: sizes attribute telling the browser how wide the picture is displayed
+    @return: context of the responsive image template
+    """
+    image_name = str(image_name or '')
+    if not image_name:
+        return {'alt': alt}
+    return {
+        'alt': alt,
+        'sizes': sizes,
+        'src': thumbnail_url(image_name, get_thumbnail_widths()[0], 'jpg'),
+        'webp_srcset': srcset(image_name, 'webp'),
+        'jpg_srcset': srcset(image_name, 'jpg'),
+    }
@@ -0,0 +1,182 @@
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS_DIRECTORY = 'thumbnails'
+
+IMAGE_DIRECTORIES = ('recipe/', 'ingredient/')
+
+DEFAULT_THUMBNAIL_WIDTHS = (320, 640)
+
+DEFAULT_THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+THUMBNAIL_QUALITY = 80
+
+# Errors raised by generate_thumbnails for pictures that are corrupt, not images at all or too big to decode
+THUMBNAIL_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_thumbnail_widths():
+    """
+    Reads widths of generated thumbnails from THUMBNAIL_WIDTHS setting
+
+    @return: sorted tuple of widths in pixels
+    """
+    return tuple(sorted(getattr(settings, 'THUMBNAIL_WIDTHS', DEFAULT_THUMBNAIL_WIDTHS)))
+
+
+def thumbnail_name(image_name, width, extension):
+    """
+    Builds the storage name of a thumbnail; the name of the original is kept inside so that the original can be found
+    from the thumbnail name alone
+
+    @param image_name: storage name of the original picture
+    @param width: width of the thumbnail
+    @param extension: extension from THUMBNAIL_FORMATS
+    @return: storage name of the thumbnail
+    """
+    return posixpath.join(THUMBNAILS_DIRECTORY, str(width), f'{image_name}.{extension}')
+
+
+def thumbnail_url(image_name, width, extension):
+    """
+    Builds the url of a thumbnail
+
+    @param image_name: storage name of the original picture
+    @param width: width of the thumbnail
+    @param extension: extension from THUMBNAIL_FORMATS
+    @return: url of the thumbnail
+    """
+    return f'{settings.MEDIA_URL}{thumbnail_name(image_name, width, extension)}'
+
+
+def srcset(image_name, extension):
+    """
+    Builds the srcset attribute value listing thumbnails of every width in a format
+
+    @param image_name: storage name of the original picture
+    @param extension: extension from THUMBNAIL_FORMATS
+    @return: srcset attribute value
+    """
+    return ', '.join(f'{thumbnail_url(image_name, width, extension)} {width}w' for width in get_thumbnail_widths())
+
+
+def is_thumbnailable(image_name):
+    """
+    Checks that a name points to an uploaded picture of a recipe or an ingredient
+
+    @param image_name: storage name of a picture
+    @return: True if thumbnails can be made from the picture
+    """
+    return (image_name.startswith(IMAGE_DIRECTORIES) and '..' not in image_name.split('/')
+            and default_storage.exists(image_name))
+
+
+def render_thumbnail(image, width, extension):
+    """
+    Scales a picture down to a width, never up, and encodes it
+
+    @param image: opened Pillow image of the original picture
+    @param width: width of the thumbnail
+    @param extension: extension from THUMBNAIL_FORMATS
+    @return: encoded thumbnail bytes
+    """
+    thumbnail = image.copy()
+    thumbnail.thumbnail((width, image.height), Image.LANCZOS)
+    output = io.BytesIO()
+    thumbnail.save(output, THUMBNAIL_FORMATS[extension][0], quality=THUMBNAIL_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def generate_thumbnails(image_name, widths=None, extensions=None, overwrite=False):
+    """
+    Generates missing thumbnails of a picture decoding the original only once
+
+    @param image_name: storage name of the original picture
+    @param widths: widths to generate, THUMBNAIL_WIDTHS setting by default
+    @param extensions: formats to generate, every format from THUMBNAIL_FORMATS by default
+    @param overwrite: regenerate thumbnails that already exist
+    @return: storage names of generated thumbnails
+    """
+    wanted = [(width, extension, thumbnail_name(image_name, width, extension))
+              for width in (widths or get_thumbnail_widths())
+              for extension in (extensions or THUMBNAIL_FORMATS)]
+    if not overwrite:
+        wanted = [(width, extension, name) for width, extension, name in wanted if not default_storage.exists(name)]
+    if not wanted:
+        return []
+
+    with default_storage.open(image_name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image = image.convert('RGB')
+    generated = []
+    for width, extension, name in wanted:
+        content = render_thumbnail(image, width, extension)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        generated.append(default_storage.save(name, ContentFile(content)))
+    return generated
+
+
+def get_executor():
+    """
+    Returns the worker pool generating thumbnails of uploaded pictures, creating it on first use
+
+    @return: ThreadPoolExecutor sized with THUMBNAIL_WORKERS setting
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', DEFAULT_THUMBNAIL_WORKERS),
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def generate_thumbnails_safely(image_name):
+    """
+    Generates thumbnails of a picture logging instead of raising errors, for use outside of a request
+
+    @param image_name: storage name of the original picture
+    """
+    try:
+        generate_thumbnails(image_name)
+    except THUMBNAIL_ERRORS:
+        logger.exception('Could not generate thumbnails of %s', image_name)
+
+
+def schedule_thumbnails(image_name):
+    """
+    Generates thumbnails of an uploaded picture once the transaction saving it commits; with THUMBNAIL_WORKERS set to
+    0 they are generated right away in the current thread
+
+    @param image_name: storage name of the original picture
+    """
+    if not image_name:
+        return
+
+    def generate():
+        if getattr(settings, 'THUMBNAIL_WORKERS', DEFAULT_THUMBNAIL_WORKERS):
+            get_executor().submit(generate_thumbnails_safely, image_name)
+        else:
+            generate_thumbnails_safely(image_name)
+
+    transaction.on_commit(generate)
@@ -0,0 +1,359 @@
+import json
+import os
+
+from django.db import transaction, IntegrityError, DataError
+from django.utils import timezone
+
+from Recipes import autocomplete, pantry, search
+from Recipes.cards import rebuild_recipe_cards, touch_ingredients
+from Recipes.models import (Recipe, Ingredient, RecipeIngredient, RecipeCategory, RecipeImage, IngredientImage,
+                            CATEGORY_CHOICES, MEASURE_CHOICES)
+from Recipes.page_cache import invalidate_recipe_pages
+from Recipes.slugs import assign_unique_slugs, invalidate_slugs
+
+INGREDIENT = 'ingredient'
+RECIPE = 'recipe'
+
+TRANSFER_BATCH_SIZE = 1000
+
+INGREDIENT_FIELDS = ('name_one', 'name_two', 'name_five', 'name_half', 'is_searchable', 'ingredient_description')
+
+RECIPE_FIELDS = ('meal_description', 'prep_time', 'prep_instructions', 'has_servings', 'servings')
+
+CATEGORY_KEYS = frozenset(key for key, _ in CATEGORY_CHOICES)
+
+MEASURE_KEYS = frozenset(key for key, _ in MEASURE_CHOICES)
+
+
+class TransferError(ValueError):
+    """
+    Raised when a line of an imported file cannot be loaded
+    """
+    def __init__(self, line_number, message):
+        super().__init__(f'line {line_number}: {message}')
+        self.line_number = line_number
+
+
+def chunked(queryset, batch_size):
+    """
+    Walks a queryset in primary key order one batch at a time without loading all of it
+
+    @param queryset: queryset to walk
+    @param batch_size: amount of objects in a batch
+    @return: generator of lists of objects
+    """
+    last_pk = None
+    while True:
+        batch_queryset = queryset.order_by('pk')
+        if last_pk is not None:
+            batch_queryset = batch_queryset.filter(pk__gt=last_pk)
+        batch = list(batch_queryset[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def group_values(queryset, key_field, *fields):
+    """
+    Groups values of related rows by the object they belong to
+
+    @return: dictionary mapping key_field values to lists of rows of the other fields
+    """
+    grouped = {}
+    for key, *values in queryset.values_list(key_field, *fields):
+        grouped.setdefault(key, []).append(values[0] if len(fields) == 1 else values)
+    return grouped
+
+
+def export_records(batch_size=TRANSFER_BATCH_SIZE):
+    """
+    Yields the whole catalog as JSON serializable records: every ingredient with its grammatical forms and pictures,
+    then every recipe with its ingredient amounts, categories and pictures. Related rows are loaded with a query per
+    batch, so memory use does not grow with the catalog
+
+    @param batch_size: amount of objects loaded at once
+    @return: generator of dictionaries
+    """
+    for ingredients in chunked(Ingredient.objects.all(), batch_size):
+        images = group_values(IngredientImage.objects.filter(ingredient__in=ingredients).order_by('pk'),
+                              'ingredient_id', 'image')
+        for ingredient in ingredients:
+            record = {'type': INGREDIENT, 'name': ingredient.name}
+            record.update((field, getattr(ingredient, field)) for field in INGREDIENT_FIELDS)
+            record['images'] = images.get(ingredient.pk, [])
+            yield record
+
+    for recipes in chunked(Recipe.objects.all(), batch_size):
+        recipe_ingredients = group_values(RecipeIngredient.objects.filter(recipe__in=recipes).order_by('pk'),
+                                          'recipe_id', 'ingredient__name', 'measure', 'amount')
+        categories = group_values(RecipeCategory.recipe.through.objects.filter(recipe__in=recipes).order_by(
+            'recipecategory__name'), 'recipe_id', 'recipecategory__name')
+        images = group_values(RecipeImage.objects.filter(recipe__in=recipes).order_by('pk'), 'recipe_id', 'image')
+        for recipe in recipes:
+            record = {'type': RECIPE, 'name': recipe.name}
+            record.update((field, getattr(recipe, field)) for field in RECIPE_FIELDS)
+            record['ingredients'] = [{'ingredient': name, 'measure': measure, 'amount': amount}
+                                     for name, measure, amount in recipe_ingredients.get(recipe.pk, [])]
+            record['categories'] = sorted(set(categories.get(recipe.pk, [])))
+            record['images'] = images.get(recipe.pk, [])
+            yield record
+
+
+def export_catalog(output, batch_size=TRANSFER_BATCH_SIZE):
+    """
+    Writes the whole catalog to a text stream as JSON Lines
+
+    @param output: writable text stream
+    @param batch_size: amount of objects loaded at once
+    @return: amount of written records
+    """
+    written = 0
+    for record in export_records(batch_size):
+        output.write(f'{json.dumps(record, ensure_ascii=False)}\n')
+        written += 1
+    return written
+
+
+def read_checkpoint(checkpoint_path):
+    """
+    Reads the number of the last line committed by an interrupted import
+
+    @param checkpoint_path: path of the checkpoint file or None
+    @return: line number, 0 if there is no checkpoint
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path) as checkpoint:
+        return json.load(checkpoint)['line']
+
+
+def write_checkpoint(checkpoint_path, line_number):
+    """
+    Atomically stores the number of the last committed line
+
+    @param checkpoint_path: path of the checkpoint file or None
+    @param line_number: number of the last line of the committed batch
+    """
+    if not checkpoint_path:
+        return
+    temporary_path = f'{checkpoint_path}.tmp'
+    with open(temporary_path, 'w') as checkpoint:
+        json.dump({'line': line_number}, checkpoint)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def sync_images(image_model, owner_field, images):
+    """
+    Makes pictures of a batch of objects match imported picture paths, keeping pictures that already match
+
+    @param image_model: picture model, RecipeImage or IngredientImage
+    @param owner_field: name of the picture model foreign key pointing to the pictured object
+    @param images: dictionary mapping primary keys of pictured objects to lists of picture paths
+    """
+    existing = set(image_model.objects.filter(**{f'{owner_field}__in': list(images)}).values_list(
+        f'{owner_field}_id', 'image'))
+    wanted = {(owner_pk, image) for owner_pk, owner_images in images.items() for image in owner_images}
+    for owner_pk, image in existing - wanted:
+        image_model.objects.filter(**{f'{owner_field}_id': owner_pk, 'image': image}).delete()
+    image_model.objects.bulk_create([image_model(**{f'{owner_field}_id': owner_pk, 'image': image})
+                                     for owner_pk, owner_images in images.items() for image in owner_images
+                                     if (owner_pk, image) not in existing])
+
+
+def upsert(model, records, fields):
+    """
+    Updates objects whose unique names appear in records and creates the missing ones with unique slugs; slugs of
+    existing objects are kept
+
+    @param model: Recipe or Ingredient
+    @param records: list of (line number, record) pairs
+    @param fields: names of copied fields besides name and slug
+    @return: dictionary mapping names to primary keys
+    """
+    existing = model.objects.in_bulk([record['name'] for line_number, record in records], field_name='name')
+    created = []
+    for line_number, record in records:
+        values = {field: record.get(field, model._meta.get_field(field).get_default()) for field in fields}
+        obj = existing.get(record['name'])
+        if obj is None:
+            created.append(model(name=record['name'], **values))
+        else:
+            for field, value in values.items():
+                setattr(obj, field, value)
+    if existing:
+        model.objects.bulk_update(list(existing.values()), fields)
+    if created:
+        assign_unique_slugs(model, created)
+        model.objects.bulk_create(created)
+    return dict(model.objects.filter(name__in=[record['name'] for line_number, record in records]).values_list(
+        'name', 'pk'))
+
+
+def import_ingredients(records):
+    """
+    Loads a batch of ingredient records
+
+    @param records: list of (line number, record) pairs
+    """
+    pks = upsert(Ingredient, records, INGREDIENT_FIELDS)
+    sync_images(IngredientImage, 'ingredient', {pks[record['name']]: record.get('images', [])
+                                                for line_number, record in records})
+    touch_ingredients(Ingredient.objects.filter(pk__in=pks.values()))
+    touch_recipes(Recipe.objects.filter(recipe_ingredients__ingredient_id__in=pks.values()))
+
+
+def import_recipes(records):
+    """
+    Loads a batch of recipe records together with their ingredient amounts, categories and pictures
+
+    @param records: list of (line number, record) pairs
+    """
+    ingredient_names = {item.get('ingredient')
+                        for line_number, record in records for item in record.get('ingredients', [])}
+    ingredient_pks = dict(Ingredient.objects.filter(name__in=ingredient_names).values_list('name', 'pk'))
+    for line_number, record in records:
+        for item in record.get('ingredients', []):
+            if item.get('ingredient') not in ingredient_pks:
+                raise TransferError(line_number, f'unknown ingredient {item.get("ingredient")!r}')
+            if item.get('measure') not in MEASURE_KEYS:
+                raise TransferError(line_number, f'unknown measure {item.get("measure")!r}')
+            if not isinstance(item.get('amount'), (int, float)):
+                raise TransferError(line_number, f'invalid amount {item.get("amount")!r}')
+        for category in record.get('categories', []):
+            if category not in CATEGORY_KEYS:
+                raise TransferError(line_number, f'unknown category {category!r}')
+
+    pks = upsert(Recipe, records, RECIPE_FIELDS)
+    recipe_pks = [pks[record['name']] for line_number, record in records]
+
+    existing_links = {recipe_pk: [] for recipe_pk in recipe_pks}
+    for link in RecipeIngredient.objects.filter(recipe_id__in=recipe_pks).order_by('pk'):
+        existing_links[link.recipe_id].append(link)
+    updated_links = []
+    created_links = []
+    stale_link_pks = []
+    for line_number, record in records:
+        recipe_pk = pks[record['name']]
+        links = existing_links[recipe_pk]
+        items = record.get('ingredients', [])
+        for link, item in zip(links, items):
+            wanted = (ingredient_pks[item['ingredient']], item['measure'], item['amount'])
+            if (link.ingredient_id, link.measure, link.amount) != wanted:
+                link.ingredient_id, link.measure, link.amount = wanted
+                updated_links.append(link)
+        created_links.extend(RecipeIngredient(recipe_id=recipe_pk, ingredient_id=ingredient_pks[item['ingredient']],
+                                              measure=item['measure'], amount=item['amount'])
+                             for item in items[len(links):])
+        stale_link_pks.extend(link.pk for link in links[len(items):])
+    if stale_link_pks:
+        RecipeIngredient.objects.filter(pk__in=stale_link_pks).delete()
+    RecipeIngredient.objects.bulk_update(updated_links, ['ingredient', 'measure', 'amount'])
+    RecipeIngredient.objects.bulk_create(created_links)
+
+    categories = dict(RecipeCategory.objects.order_by('-pk').values_list('name', 'pk'))
+    missing_categories = {category for line_number, record in records for category in record.get('categories', [])
+                          if category not in categories}
+    if missing_categories:
+        RecipeCategory.objects.bulk_create([RecipeCategory(name=name) for name in missing_categories])
+        categories = dict(RecipeCategory.objects.order_by('-pk').values_list('name', 'pk'))
+    memberships = RecipeCategory.recipe.through
+    existing_memberships = set(memberships.objects.filter(recipe_id__in=recipe_pks).values_list(
+        'recipe_id', 'recipecategory_id'))
+    wanted_memberships = {(pks[record['name']], categories[category])
+                          for line_number, record in records for category in record.get('categories', [])}
+    stale_memberships = existing_memberships - wanted_memberships
+    for recipe_pk, category_pk in stale_memberships:
+        memberships.objects.filter(recipe_id=recipe_pk, recipecategory_id=category_pk).delete()
+    memberships.objects.bulk_create([memberships(recipe_id=recipe_pk, recipecategory_id=category_pk)
+                                     for recipe_pk, category_pk in wanted_memberships - existing_memberships])
+
+    sync_images(RecipeImage, 'recipe', {pks[record['name']]: record.get('images', [])
+                                        for line_number, record in records})
+    touch_recipes(Recipe.objects.filter(pk__in=recipe_pks))
+
+
+def touch_recipes(recipes):
+    """
+    Marks imported recipes or recipes using imported ingredients as modified now and drops their cached pages and
+    cached slug lookups
+
+    @param recipes: queryset of the recipes
+    """
+    slugs = set(recipes.values_list('slug', flat=True))
+    if slugs:
+        recipes.update(updated_on=timezone.now())
+        invalidate_recipe_pages(slugs)
+        invalidate_slugs(Recipe, slugs)
+
+
+IMPORTERS = {
+    INGREDIENT: import_ingredients,
+    RECIPE: import_recipes,
+}
+
+
+def read_records(lines, start_line=0):
+    """
+    Parses JSON Lines lazily skipping blank lines and lines committed before a checkpoint
+
+    @param lines: iterable of text lines
+    @param start_line: number of the last already imported line
+    @return: generator of (line number, record) pairs
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if line_number <= start_line or not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise TransferError(line_number, f'invalid JSON: {error}')
+        if not isinstance(record, dict) or record.get('type') not in IMPORTERS or not record.get('name'):
+            raise TransferError(line_number, 'expected an ingredient or a recipe record with a name')
+        yield line_number, record
+
+
+def import_catalog(lines, batch_size=TRANSFER_BATCH_SIZE, checkpoint_path=None, rebuild=True):
+    """
+    Streams JSON Lines written by export_catalog into the database. Consecutive records of the same type are loaded
+    in batches, each in its own transaction with bulk queries; after every batch the number of its last line is
+    stored in the checkpoint file so that an interrupted import continues where it stopped. Objects are matched by
+    their unique names, so importing the same file twice changes nothing. Recipe cards, the ingredient reverse index
+    and in-memory indexes of this process are rebuilt at the end
+
+    @param lines: iterable of text lines, for example an open file
+    @param batch_size: amount of records loaded at once
+    @param checkpoint_path: path of the checkpoint file, None to import without checkpoints
+    @param rebuild: rebuild derived data after the import
+    @return: dictionary with amounts of imported ingredients and recipes
+    """
+    imported = {INGREDIENT: 0, RECIPE: 0}
+    batch = []
+
+    def flush():
+        record_type = batch[0][1]['type']
+        records = list({record['name']: (line_number, record) for line_number, record in batch}.values())
+        try:
+            with transaction.atomic():
+                IMPORTERS[record_type](records)
+        except (IntegrityError, DataError) as error:
+            raise TransferError(batch[0][0], f'batch ending at line {batch[-1][0]} could not be saved: {error}')
+        write_checkpoint(checkpoint_path, batch[-1][0])
+        imported[record_type] += len(records)
+        batch.clear()
+
+    for line_number, record in read_records(lines, read_checkpoint(checkpoint_path)):
+        if batch and (len(batch) == batch_size or batch[0][1]['type'] != record['type']):
+            flush()
+        batch.append((line_number, record))
+    if batch:
+        flush()
+
+    if rebuild:
+        rebuild_recipe_cards()
+        search.reset_search_index()
+        autocomplete.reset_autocomplete_index()
+        pantry.reset_pantry_index()
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return imported
@@ -1,17 +1,56 @@
+import mimetypes
+from dataclasses import replace
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse
-from django.shortcuts import render, redirect
-from django.template.loader import get_template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Prefetch, Count
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers, add_never_cache_headers
+from django.utils.safestring import mark_safe
 from django.views import View
 from django.contrib.auth import get_user_model, login, authenticate, logout
 
-from Recipes.models import Recipe, RecipeImage, RecipeIngredient, Ingredient, IngredientImage, RecipeCategory
+from Recipes.conditional import page_etag, get_not_modified_response, set_validators
+from Recipes.models import (Recipe, RecipeImage, RecipeIngredient, Ingredient, IngredientImage, IngredientRecipe,
+                            CategoryRecipe)
 from Recipes.forms import RecipeForm
+from Recipes.autocomplete import get_autocomplete_index, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS
+from Recipes.images import get_lead_images
+from Recipes.pagination import get_cursors, paginate_queryset
+from Recipes.pantry import find_pantry_recipes, DEFAULT_PANTRY_RESULTS
+from Recipes.page_cache import get_recipe_page, set_recipe_page, get_stats
+from Recipes.scaling import (calculate_dynamic_portions, scale_recipe_ingredient, get_servings_multipliers,
+                             parse_servings_multiplier, servings_url, SERVINGS_PARAMETER, LEGACY_SERVINGS_COOKIE,
+                             ACCEPTED_FRACTIONS, FRACTIONS_DISPLAY, MEASURE_GRAMMAR_PL, PORTION_GRAMMAR_PL)
+from Recipes.search import search_catalog, RECIPE, INGREDIENT
+from Recipes.shopping import parse_shopping_plan, build_shopping_list, get_plan_recipes, RECIPE_PARAMETER
+from Recipes.slugs import get_cached_slug, remember_slug, resolve_slug
+from Recipes.static_assets import get_compressors, STATIC_MAX_AGE
+from Recipes.thumbnails import (generate_thumbnails, get_thumbnail_widths, is_thumbnailable, thumbnail_name,
+                                THUMBNAIL_FORMATS, THUMBNAIL_ERRORS)
 
 # Create your views here.
 
 User = get_user_model()
 
+THUMBNAIL_MAX_AGE = 60 * 60 * 24 * 365
+
+AUTOCOMPLETE_MAX_AGE = 60
+
+SUGGESTION_URL_PREFIXES = {
+    RECIPE: 'przepis',
+    INGREDIENT: 'skladnik',
+}
+
+INGREDIENT_RECIPES_ORDERING = ('name', 'recipe_id')
+
+CATEGORY_ENTRIES_ORDERING = ('-created_on', '-card_id')
+
 CATEGORIES_PL = {
     1: "śniadania",
     2: "kolacje",
@@ -21,77 +60,6 @@ CATEGORIES_PL = {
     6: "inne",
 }
 
-TEASPOON_GRAMMAR_PL = {
-    1: "łyżeczka",
-    2: "łyżeczki",
-    5: "łyżeczek",
-    0: "łyżeczki",
-}
-
-TABLESPOON_GRAMMAR_PL = {
-    1: "łyżka",
-    2: "łyżki",
-    5: "łyżek",
-    0: "łyżki",
-}
-
-GLASS_GRAMMAR_PL = {
-    1: "szklanka",
-    2: "szklanki",
-    5: "szklanek",
-    0: "szklanki",
-}
-
-PINCH_GRAMMAR_PL = {
-    1: "szczypta",
-    2: "szczypty",
-    5: "szczypt",
-    0: "szczypty",
-}
-
-GRAM_GRAMMAR_PL = {
-    1: "gram",
-    2: "gramy",
-    5: "gramów",
-    0: "grama",
-}
-
-TO_TASTE_GRAMMAR_PL = {
-    0: "do smaku",
-}
-
-UNIT_GRAMMAR_PL = {
-    0, None,
-}
-
-PORTION_GRAMMAR_PL = {
-    1: "porcję",
-    2: "porcje",
-    5: "porcji",
-    0: "porcji",
-}
-
-MEASURE_GRAMMAR_PL = {
-    1: TEASPOON_GRAMMAR_PL,
-    2: TABLESPOON_GRAMMAR_PL,
-    3: GLASS_GRAMMAR_PL,
-    4: PINCH_GRAMMAR_PL,
-    5: GRAM_GRAMMAR_PL,
-    6: TO_TASTE_GRAMMAR_PL,
-    7: UNIT_GRAMMAR_PL,
-}
-
-ACCEPTED_FRACTIONS = (0, 0.25, 0.33, 0.5, 0.67, 0.75)
-
-FRACTIONS_DISPLAY = {
-    0: "",
-    0.25: "1/4",
-    0.33: "1/3",
-    0.5: "1/2",
-    0.67: "2/3",
-    0.75: "3/4",
-}
-
 
 class MainPageView(View):
     """
@@ -116,185 +84,248 @@ class RecipeDetailsView(View):
         """
         Finds recipe based on the slug, filters its details and first from of available pictures from database
         as well as all ingredients required to prepare this recipe and lists the data;
-        sets multiplier in a cookie as 1
+        reads the multiplier from SERVINGS_PARAMETER query parameter, so that every amount of servings has its own url
+        which shared caches can keep for anonymous visitors; answers with 304 if the recipe has not changed since the
+        browser got it
         """
+        servings_redirect = self.get_servings_redirect(request)
+        if servings_redirect is not None:
+            return servings_redirect
 
-        recipe_slug = kwargs['slug']
-        recipe = Recipe.objects.get(slug=recipe_slug)
-        recipe_ingredients = RecipeIngredient.objects.filter(recipe_id=recipe.pk)
-        try:
-            recipe_image = RecipeImage.objects.filter(recipe_id=recipe.pk)[0]
-        except IndexError:
-            recipe_image = None
+        servings_multiplier = int(request.GET.get(SERVINGS_PARAMETER, 1))
 
-        response = HttpResponse()
+        return self.render_recipe_page(request, HttpResponse(), kwargs['slug'], servings_multiplier, conditional=True)
 
-        servings_multiplier = 1
+    def post(self, request, *args, **kwargs):
+        """
+        Handles the form of older versions of the page which recalculated the recipe through a cookie: moves the
+        multiplier in the direction chosen in the form and redirects to the url of the page for the new multiplier
+        """
+        return self.redirect_to_servings(request, self.change_servings_multiplier(request))
 
-        response.set_cookie(key='servings_multiplier', value=servings_multiplier)
+    def get_servings_redirect(self, request):
+        """
+        Sends links to their canonical url: the multiplier is given in SERVINGS_PARAMETER query parameter only when it
+        is supported and other than 1; links without it from browsers remembering a multiplier in the legacy cookie
+        are sent to the url of that multiplier
 
-        portions_grammar_name, dynamic_portions = calculate_dynamic_portions(recipe, servings_multiplier)
+        @param request: current request
+        @return: redirect response or None if the url is canonical
+        """
+        value = request.GET.get(SERVINGS_PARAMETER)
+        if value is None:
+            if request.COOKIES.get(LEGACY_SERVINGS_COOKIE):
+                return self.redirect_to_servings(
+                    request, parse_servings_multiplier(request.COOKIES[LEGACY_SERVINGS_COOKIE]) or 1)
+            return None
+        servings_multiplier = parse_servings_multiplier(value)
+        if servings_multiplier is None or servings_multiplier == 1 or str(servings_multiplier) != value:
+            return self.redirect_to_servings(request, servings_multiplier or 1)
+        return None
+
+    def redirect_to_servings(self, request, servings_multiplier):
+        """
+        Redirects to the url of the recipe page for a multiplier, removing the legacy cookie; the redirect is never
+        cached since it depends on the cookie
 
-        recipe_ingredients_data = get_recipe_ingredients_data(recipe_ingredients, servings_multiplier)
+        @param request: current request
+        @param servings_multiplier: supported servings multiplier
+        @return: redirect response
+        """
+        response = redirect(servings_url(request.path, servings_multiplier))
+        if request.COOKIES.get(LEGACY_SERVINGS_COOKIE):
+            response.delete_cookie(LEGACY_SERVINGS_COOKIE)
+        add_never_cache_headers(response)
+        return response
 
-        context = {
-            'recipe': recipe,
-            'recipe_image': recipe_image,
-            'portions_grammar_name': portions_grammar_name,
-            'dynamic_portions': dynamic_portions,
-            'recipe_ingredients_data': recipe_ingredients_data,
-        }
-        template = get_template('Recipes/recipe-details.html')
-        response.write(template.render(context=context, request=request))
+    def change_servings_multiplier(self, request):
+        """
+        Moves the multiplier of the page, taken from the url or the legacy cookie, one step in the direction chosen in
+        the form, within supported multipliers
 
-        return response
+        @param request: current request
+        @return: the selected servings multiplier
+        """
+        servings_multiplier = (parse_servings_multiplier(request.GET.get(SERVINGS_PARAMETER))
+                               or parse_servings_multiplier(request.COOKIES.get(LEGACY_SERVINGS_COOKIE)) or 1)
+        servings_modifier = request.POST.get('modify_servings')
+        servings_multipliers = get_servings_multipliers()
+        if servings_modifier == 'more' and servings_multiplier < servings_multipliers[-1]:
+            servings_multiplier += 1
+        elif servings_modifier == 'less' and servings_multiplier > servings_multipliers[0]:
+            servings_multiplier -= 1
+        return servings_multiplier
+
+    def get_shared_max_age(self, request):
+        """
+        @param request: current request
+        @return: seconds shared caches may serve the page for, None for signed in users whose pages stay private
+        """
+        if request.user.is_authenticated:
+            return None
+        return getattr(settings, 'RECIPE_SHARED_MAX_AGE', None)
 
-    def post(self, request, *args, **kwargs):
+    def render_recipe_page(self, request, response, recipe_slug, servings_multiplier, conditional=False):
         """
-        Finds recipe based on the slug, filters its details and first from of available pictures from database
-        as well as all ingredients required to prepare this recipe and lists the data;
-        overwrites the multiplier stored in a cookie and recalculates the portions and required ingredients based on it
+        Renders the recipe page into the response; the recipe, its picture and the rendered ingredient list are taken
+        from the page cache and only loaded from the database on a cache miss or when the cached page is older than
+        the recipe. The last modification time of the recipe comes from the slug cache; on a slug cache miss it is
+        taken from a freshly loaded recipe or queried, never from a cached page which may be stale in this process.
+        It changes whenever the recipe, its ingredients or its pictures change
+
+        @param request: current request
+        @param response: response the page is written to
+        @param recipe_slug: slug of the recipe from the url
+        @param servings_multiplier: currently selected amount of servings
+        @param conditional: answer with 304 if the request validators match the ETag or the last modification time
+        @return: the response or a 304 response carrying its cookies
         """
+        slug_entry = get_cached_slug(Recipe, recipe_slug)
+        not_modified = self.get_not_modified(request, response, slug_entry, servings_multiplier, conditional)
+        if not_modified is not None:
+            return not_modified
 
-        recipe_slug = kwargs['slug']
-        recipe = Recipe.objects.get(slug=recipe_slug)
-        recipe_ingredients = RecipeIngredient.objects.filter(recipe_id=recipe.pk)
+        context = {}
+        recipe_page = get_recipe_page(recipe_slug, servings_multiplier)
+        resolved = slug_entry is None
+        if resolved and recipe_page is not None:
+            slug_entry = resolve_slug(Recipe, recipe_slug)
+        if recipe_page is None or is_stale_page(recipe_page, slug_entry):
+            recipe_page, context = self.build_recipe_page(recipe_slug, servings_multiplier,
+                                                          *load_recipe_details(recipe_slug))
+            if slug_entry is None:
+                slug_entry = remember_slug(Recipe, recipe_slug, recipe_page['recipe'].pk,
+                                           recipe_page['recipe'].updated_on)
+
+        if resolved:
+            not_modified = self.get_not_modified(request, response, slug_entry, servings_multiplier, conditional)
+            if not_modified is not None:
+                return not_modified
+
+        return self.write_recipe_page(request, response, recipe_page, servings_multiplier, context, slug_entry,
+                                      conditional)
+
+    def get_not_modified(self, request, response, slug_entry, servings_multiplier, conditional):
+        """
+        Checks validators of a conditional request against the recipe version from the slug cache
 
-        try:
-            recipe_image = RecipeImage.objects.filter(recipe_id=recipe.pk)[0]
-        except IndexError:
-            recipe_image = None
-
-        response = HttpResponse()
-
-        if request.COOKIES.get('servings_multiplier'):
-            servings_multiplier = int(request.COOKIES.get('servings_multiplier'))
-            servings_modifier = request.POST.get('modify_servings')
-            if servings_modifier == 'more' and servings_multiplier < 5:
-                servings_multiplier += 1
-                response.set_cookie(key='servings_multiplier', value=servings_multiplier)
-            elif servings_modifier == 'less' and servings_multiplier > 1:
-                servings_multiplier -= 1
-                response.set_cookie(key='servings_multiplier', value=servings_multiplier)
-        else:
-            servings_multiplier = 1
+        @return: 304 response carrying cookies of the prepared response or None if the page has to be rendered
+        """
+        if not conditional or slug_entry is None:
+            return None
+        etag = page_etag(request, slug_entry.pk, slug_entry.modified, servings_multiplier)
+        return get_not_modified_response(request, etag, slug_entry.modified, response,
+                                         self.get_shared_max_age(request), request.user.is_authenticated)
 
-        portions_grammar_name, dynamic_portions = calculate_dynamic_portions(recipe, servings_multiplier)
+    def build_recipe_page(self, recipe_slug, servings_multiplier, recipe, recipe_ingredients, recipe_image):
+        """
+        Renders the ingredient list of a loaded recipe and stores the page parts in the page cache
 
+        @return: dictionary with the recipe, its picture and the rendered ingredient list and the context of the page
+        """
         recipe_ingredients_data = get_recipe_ingredients_data(recipe_ingredients, servings_multiplier)
-
-        context = {
+        recipe_page = {
             'recipe': recipe,
             'recipe_image': recipe_image,
+            'recipe_ingredients': render_to_string('Recipes/recipe-ingredients.html', context={
+                'recipe_ingredients_data': recipe_ingredients_data,
+            }),
+        }
+        set_recipe_page(recipe_slug, servings_multiplier, recipe_page)
+        return recipe_page, {'recipe_ingredients_data': recipe_ingredients_data}
+
+    def write_recipe_page(self, request, response, recipe_page, servings_multiplier, context, slug_entry,
+                          conditional):
+        """
+        Renders the recipe page from its parts into the response
+
+        @return: the response
+        """
+        portions_grammar_name, dynamic_portions = calculate_dynamic_portions(recipe_page['recipe'],
+                                                                             servings_multiplier)
+        servings_multipliers = get_servings_multipliers()
+
+        context.update({
+            'recipe': recipe_page['recipe'],
+            'recipe_image': recipe_page['recipe_image'],
             'portions_grammar_name': portions_grammar_name,
             'dynamic_portions': dynamic_portions,
-            'recipe_ingredients_data': recipe_ingredients_data,
-        }
+            'recipe_ingredients': mark_safe(recipe_page['recipe_ingredients']),
+            'servings_multiplier': servings_multiplier,
+            'more_servings_multiplier': min(servings_multiplier + 1, servings_multipliers[-1]),
+            'less_servings_multiplier': max(servings_multiplier - 1, servings_multipliers[0]),
+        })
         template = get_template('Recipes/recipe-details.html')
         response.write(template.render(context=context, request=request))
+        if conditional:
+            set_validators(response, page_etag(request, slug_entry.pk, slug_entry.modified, servings_multiplier),
+                           slug_entry.modified, self.get_shared_max_age(request), request.user.is_authenticated)
 
         return response
 
 
-def calculate_dynamic_portions(recipe, servings_multiplier):
+class RecipeScalingView(View):
     """
-    Recalculates the default amount of portions and applies grammar to name based on a servings multiplier stored in a
-    cookie
+    Serves data needed to recalculate a recipe for another amount of servings in the browser
+    """
+    def get(self, request, *args, **kwargs):
+        """
+        Returns base amounts, measures and name forms of recipe ingredients together with grammar tables as JSON
+        """
+        recipe, recipe_ingredients, recipe_image = load_recipe_details(kwargs['slug'])
+        scaling_data = {
+            'servings': recipe.servings,
+            'servings_multipliers': get_servings_multipliers(),
+            'accepted_fractions': ACCEPTED_FRACTIONS,
+            'fractions_display': FRACTIONS_DISPLAY,
+            'portion_grammar': PORTION_GRAMMAR_PL,
+            'measure_grammar': MEASURE_GRAMMAR_PL,
+            'ingredients': [{
+                'amount': recipe_ingredient.amount,
+                'measure': recipe_ingredient.measure,
+                'names': [
+                    recipe_ingredient.ingredient.name_one,
+                    recipe_ingredient.ingredient.name_two,
+                    recipe_ingredient.ingredient.name_five,
+                    recipe_ingredient.ingredient.name_half,
+                ],
+                'slug': recipe_ingredient.ingredient.slug if recipe_ingredient.ingredient.is_searchable else None,
+            } for recipe_ingredient in recipe_ingredients],
+        }
+        return JsonResponse(scaling_data, json_dumps_params={'ensure_ascii': False})
 
-    @param recipe: recipe for which portions are calculated
-    @param servings_multiplier: currently selected amount of servings sourced from a cookie
-    @return: amount of portions and grammatically correct name
-    """
-    dynamic_portions = recipe.servings * servings_multiplier
-    if dynamic_portions == 1:
-        portions_grammar_name = PORTION_GRAMMAR_PL[1]
-    elif dynamic_portions in [2, 3, 4]:
-        portions_grammar_name = PORTION_GRAMMAR_PL[2]
-    elif dynamic_portions >= 5 and dynamic_portions % 1 == 0:
-        portions_grammar_name = PORTION_GRAMMAR_PL[5]
-    else:
-        portions_grammar_name = PORTION_GRAMMAR_PL[0]
-    return portions_grammar_name, dynamic_portions
-
-
-def find_closest_value_in_list(lst, val):
-    """
-    From a list finds value that is arithmetically closest to a given value
-
-    @param lst: list of accepted values
-    @param val: value that will be checked against lst
-    @return: closest matching value from lst
-    """
-    return lst[min(range(len(lst)), key=lambda i: abs(lst[i] - val))]
-
-
-def find_fraction_display(recipe_ingredient, servings_multiplier):
-    if recipe_ingredient.measure in (4, 6):
-        requires_amount_display = False
-        has_decimal_place = False
-        dynamic_amount_decimal_part_display = None
-        fraction_display = None
-    else:
-        requires_amount_display = True
-        dynamic_amount = recipe_ingredient.amount * servings_multiplier
-        dynamic_amount_fractional_part = dynamic_amount % 1
-        closest_accepted_fraction = find_closest_value_in_list(ACCEPTED_FRACTIONS, dynamic_amount_fractional_part)
-        if closest_accepted_fraction != 0:
-            fraction_display = FRACTIONS_DISPLAY[closest_accepted_fraction]
-        else:
-            fraction_display = None
-        if dynamic_amount >= 1:
-            has_decimal_place = True
-            dynamic_amount_decimal_part = int(dynamic_amount - dynamic_amount_fractional_part)
-            dynamic_amount_decimal_part_display = str(dynamic_amount_decimal_part)
-        else:
-            has_decimal_place = False
-            dynamic_amount_decimal_part_display = None
-    return requires_amount_display, has_decimal_place, dynamic_amount_decimal_part_display, fraction_display
+
+RECIPE_DETAILS_QUERIES = 3
 
 
-def dynamic_grammar_name(recipe_ingredient, servings_multiplier):
+def is_stale_page(recipe_page, slug_entry):
     """
-    Generates grammatically correct grammar name of ingredient and/or measure of an ingredient based on selected amount
-    of servings
+    @param recipe_page: cached recipe page
+    @param slug_entry: SlugEntry of the recipe or None if the slug is not resolved
+    @return: True if the page was rendered from an older version of the recipe than the resolved one
+    """
+    return slug_entry is not None and recipe_page['recipe'].updated_on != slug_entry.modified
 
-    @param recipe_ingredient: collection of data about and ingredient including mesure type, amount and several
-    grammatical name options
-    @param servings_multiplier: currently selected amount of servings sourced from a cookie
-    @return: grammatically correct name of ingredient and/or measure for a given amount of it
-    """
-    measure = recipe_ingredient.measure
-    dynamic_amount = recipe_ingredient.amount * servings_multiplier
-    measure_pl_grammar_dict = MEASURE_GRAMMAR_PL[measure]
-    requires_measure_name = True
-    if measure == 7:
-        requires_measure_name = False
-        measure_name = None
-        if dynamic_amount == 1:
-            ingredient_name = recipe_ingredient.ingredient.name_one
-        elif dynamic_amount in [2, 3, 4]:
-            ingredient_name = recipe_ingredient.ingredient.name_two
-        elif dynamic_amount >= 5 and dynamic_amount % 1 == 0:
-            ingredient_name = recipe_ingredient.ingredient.name_five
-        else:
-            ingredient_name = recipe_ingredient.ingredient.name_half
-    elif measure in (1, 2, 3, 5):
-        if dynamic_amount == 1:
-            measure_name = measure_pl_grammar_dict[1]
-        elif dynamic_amount in [2, 3, 4]:
-            measure_name = measure_pl_grammar_dict[2]
-        elif dynamic_amount >= 5 and dynamic_amount % 1 == 0:
-            measure_name = measure_pl_grammar_dict[5]
-        else:
-            measure_name = measure_pl_grammar_dict[0]
-        ingredient_name = recipe_ingredient.ingredient.name_half
-    elif measure == 4:
-        measure_name = measure_pl_grammar_dict[1]
-        ingredient_name = recipe_ingredient.ingredient.name_half
-    elif measure == 6:
-        measure_name = measure_pl_grammar_dict[0]
-        ingredient_name = recipe_ingredient.ingredient.name_one
-    return requires_measure_name, ingredient_name, measure_name
+
+def load_recipe_details(recipe_slug):
+    """
+    Loads a recipe together with all of its ingredients and its first picture in a fixed number of queries
+    (RECIPE_DETAILS_QUERIES): one for the recipe, one for its ingredients joined with ingredient details and one
+    for its pictures, no matter how many ingredients the recipe has
+
+    @param recipe_slug: slug of the recipe from the url
+    @return: the recipe, its ingredients and its first picture or None if it has no pictures
+    """
+    recipe_queryset = Recipe.objects.prefetch_related(
+        Prefetch('recipe_ingredients',
+                 queryset=RecipeIngredient.objects.select_related('ingredient').order_by('pk')),
+        Prefetch('recipe_images', queryset=RecipeImage.objects.order_by('pk')),
+    )
+    recipe = get_object_or_404(recipe_queryset, slug=recipe_slug)
+    recipe_ingredients = recipe.recipe_ingredients.all()
+    recipe_images = recipe.recipe_images.all()
+    recipe_image = recipe_images[0] if recipe_images else None
+    return recipe, recipe_ingredients, recipe_image
 
 
 def get_recipe_ingredients_data(recipe_ingredients, servings_multiplier):
@@ -310,20 +341,9 @@ def get_recipe_ingredients_data(recipe_ingredients, servings_multiplier):
     """
     recipe_ingredients_data = []
     for recipe_ingredient in recipe_ingredients:
-        requires_display, has_decimal_place, decimal, fraction = find_fraction_display(recipe_ingredient,
-                                                                                       servings_multiplier)
-        requires_measure_name, ingredient_name, measure_name = dynamic_grammar_name(recipe_ingredient,
-                                                                                    servings_multiplier)
-        recipe_ingredient_data = {
-            'recipe_ingredient': recipe_ingredient,
-            'requires_display': requires_display,
-            'has_decimal_place': has_decimal_place,
-            'decimal': decimal,
-            'fraction': fraction,
-            'requires_measure_name': requires_measure_name,
-            'ingredient_name': ingredient_name,
-            'measure_name': measure_name,
-        }
+        ingredient_amount = scale_recipe_ingredient(recipe_ingredient, servings_multiplier)
+        recipe_ingredient_data = {'recipe_ingredient': recipe_ingredient}
+        recipe_ingredient_data.update(ingredient_amount._asdict())
         recipe_ingredients_data.append(recipe_ingredient_data)
     return recipe_ingredients_data
 
@@ -335,23 +355,52 @@ class IngredientDetailsView(View):
     def get(self, request, *args, **kwargs):
         """
         Finds ingredient based on the slug, filters its details and first from of available pictures from database
-        as well as all recipes that include this ingredient and lists the data
+        as well as a page of recipes that include this ingredient read from the ingredient reverse index, listed by
+        name, and lists the data; answers with 304 if the ingredient, its pictures and recipes listed with it have not
+        changed since the browser got the page
         """
         ingredient_slug = kwargs['slug']
-        ingredient = Ingredient.objects.get(slug=ingredient_slug)
-        ingredient_recipes = RecipeIngredient.objects.filter(ingredient_id=ingredient.pk)
-        try:
-            ingredient_image = IngredientImage.objects.filter(ingredient_id=ingredient.pk)[0]
-        except IndexError:
-            ingredient_image = None
+        ingredient = None
+        slug_entry = get_cached_slug(Ingredient, ingredient_slug)
+        if slug_entry is None:
+            ingredient = get_object_or_404(Ingredient, slug=ingredient_slug)
+            slug_entry = remember_slug(Ingredient, ingredient_slug, ingredient.pk, ingredient.updated_on)
+        not_modified = self.get_not_modified(request, slug_entry)
+        if not_modified is not None:
+            return not_modified
+        if ingredient is None:
+            ingredient = get_object_or_404(Ingredient, pk=slug_entry.pk)
+        ingredient_image = get_lead_images(IngredientImage, 'ingredient', [ingredient.pk]).get(ingredient.pk)
+        after, before = get_cursors(request)
+        ingredient_recipes = paginate_queryset(IngredientRecipe.objects.filter(ingredient_id=ingredient.pk),
+                                               INGREDIENT_RECIPES_ORDERING, after, before)
+        return self.render_ingredient_page(request, slug_entry, ingredient, ingredient_image, ingredient_recipes)
+
+    def get_not_modified(self, request, slug_entry):
+        """
+        Checks validators of a conditional request against the ingredient version from the slug cache
+
+        @return: 304 response or None if the page has to be rendered
+        """
+        return get_not_modified_response(request, page_etag(request, slug_entry.pk, slug_entry.modified),
+                                         slug_entry.modified)
 
+    def render_ingredient_page(self, request, slug_entry, ingredient, ingredient_image, ingredient_recipes):
+        """
+        Renders the ingredient page from loaded data
+
+        @return: the response
+        """
         context = {
             'ingredient': ingredient,
             'ingredient_image': ingredient_image,
             'ingredient_recipes': ingredient_recipes,
+            'page': ingredient_recipes,
         }
 
-        return render(request, template_name='Recipes/ingredient-details.html', context=context)
+        response = render(request, template_name='Recipes/ingredient-details.html', context=context)
+        set_validators(response, page_etag(request, slug_entry.pk, slug_entry.modified), slug_entry.modified)
+        return response
 
 
 class RecipeCategoriesView(View):
@@ -360,10 +409,13 @@ class RecipeCategoriesView(View):
     """
     def get(self, request, *args, **kwargs):
         """
-        Generates a view with listed categories
+        Generates a view with listed categories and amounts of recipes in them
         """
+        category_counts = get_category_counts()
         context = {
-            'categories': CATEGORIES_PL
+            'categories': CATEGORIES_PL,
+            'category_counts': [(category_key, category_name, category_counts.get(category_key, 0))
+                                for category_key, category_name in CATEGORIES_PL.items()],
         }
         return render(request, template_name='Recipes/recipe-categories.html', context=context)
 
@@ -374,34 +426,138 @@ class RecipeCategoryView(View):
     """
     def get(self, request, *args, **kwargs):
         """
-        Finds category based on the primary key from the slug, filters all recipes classified in this category and
-        renders a page listing them
+        Finds category based on the primary key from the slug, filters cards of recipes classified in this category
+        and renders a page listing them from newest; further pages are reached with cursors from query parameters.
+        The ETag of the page comes from the cards on it and the time each of them was built, so that unchanged pages
+        are answered with 304 without being rendered; no Last-Modified is sent since a recipe leaving the page does
+        not make any of the remaining cards newer
         """
         category_key = kwargs['pk']
-        category_name = CATEGORIES_PL[category_key]
-        try:
-            category_recipes = RecipeCategory.objects.filter(name=category_key)[0].recipe.all()
-        except IndexError:
-            category_recipes = []
+        after, before = get_cursors(request)
+        category_entries = paginate_queryset(get_category_entries(category_key), CATEGORY_ENTRIES_ORDERING, after,
+                                             before)
+        return self.render_category_page(request, category_key, category_entries)
 
-        recipes_data = []
+    def render_category_page(self, request, category_key, category_entries):
+        """
+        Answers with 304 if the loaded page of cards is unchanged or renders it
 
-        for recipe in category_recipes:
-            try:
-                recipe_image = RecipeImage.objects.filter(recipe_id=recipe.pk)[0]
-            except IndexError:
-                recipe_image = None
-            recipes_data.append({
-                'recipe': recipe,
-                'recipe_image': recipe_image,
-            })
+        @param request: current request
+        @param category_key: key of the category
+        @param category_entries: KeysetPage of category membership entries with their cards
+        @return: the response
+        """
+        recipe_cards = replace(category_entries, items=[entry.card for entry in category_entries])
+        category_etag = page_etag(request, category_key, recipe_cards.next_cursor, recipe_cards.previous_cursor,
+                                  [(recipe_card.pk, recipe_card.updated_on) for recipe_card in recipe_cards])
+        not_modified = get_not_modified_response(request, category_etag, None)
+        if not_modified is not None:
+            return not_modified
 
         context = {
-            'category_name': category_name,
-            'recipes_data': recipes_data,
+            'category_name': CATEGORIES_PL[category_key],
+            'recipe_cards': recipe_cards,
+            'page': recipe_cards,
         }
 
-        return render(request, template_name='Recipes/category.html', context=context)
+        response = render(request, template_name='Recipes/category.html', context=context)
+        set_validators(response, category_etag, None)
+        return response
+
+
+def get_category_entries(category_key):
+    """
+    @param category_key: key of the category
+    @return: queryset of membership entries of recipes classified in the category joined with their cards
+    """
+    if category_key not in CATEGORIES_PL:
+        raise Http404('Category not found')
+    return CategoryRecipe.objects.filter(category=category_key).select_related('card')
+
+
+def get_category_counts():
+    """
+    Counts recipes in every category with a single aggregate query over membership entries
+
+    @return: dictionary mapping category keys to amounts of recipes, categories without recipes are left out
+    """
+    return dict(CategoryRecipe.objects.order_by().values('category').annotate(count=Count('card')).values_list(
+        'category', 'count'))
+
+
+class RecipePageCacheStatsView(View):
+    """
+    View exposing recipe page cache counters for monitoring
+    """
+    def get(self, request, *args, **kwargs):
+        """
+        Returns amounts of recipe page cache hits and misses as JSON
+        """
+        return JsonResponse(get_stats())
+
+
+class ThumbnailView(View):
+    """
+    View serving thumbnails of pictures, generating missing ones on first request; once generated they are stored under
+    the media directory where the web server finds them without reaching this view
+    """
+    def get(self, request, width, name, *args, **kwargs):
+        """
+        Generates the thumbnail if it is not stored yet and returns it; pictures which cannot be decoded have no
+        thumbnails
+
+        @param width: width of the thumbnail, one of THUMBNAIL_WIDTHS
+        @param name: storage name of the original picture followed by the thumbnail format extension
+        """
+        image_name, _, extension = name.rpartition('.')
+        if width not in get_thumbnail_widths() or extension not in THUMBNAIL_FORMATS or not is_thumbnailable(
+                image_name):
+            raise Http404('Thumbnail not found')
+        stored_name = thumbnail_name(image_name, width, extension)
+        if not default_storage.exists(stored_name):
+            try:
+                generate_thumbnails(image_name, widths=[width], extensions=[extension])
+            except THUMBNAIL_ERRORS:
+                raise Http404('Thumbnail not found')
+        response = FileResponse(default_storage.open(stored_name), content_type=THUMBNAIL_FORMATS[extension][1])
+        patch_cache_control(response, public=True, max_age=THUMBNAIL_MAX_AGE)
+        return response
+
+
+class StaticFileView(View):
+    """
+    View serving collected static files for deployments without a web server in front of Django, see SERVE_STATIC
+    setting; sends precompressed variants written by CompressedManifestStaticFilesStorage to browsers accepting them
+    and lets browsers keep files with hashed names for STATIC_MAX_AGE, other files have to be revalidated
+    """
+    def get(self, request, path, *args, **kwargs):
+        """
+        Returns the file or its compressed variant
+
+        @param path: name of the file under STATIC_ROOT
+        """
+        try:
+            if not path or path.endswith('/') or not staticfiles_storage.exists(path):
+                raise Http404('Static file not found')
+        except SuspiciousFileOperation:
+            raise Http404('Static file not found')
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        accepted = {coding.split(';')[0].strip() for coding in request.headers.get('Accept-Encoding', '').split(',')}
+        served, content_encoding = path, None
+        for encoding, suffix, _ in get_compressors():
+            if encoding in accepted and staticfiles_storage.exists(path + suffix):
+                served, content_encoding = path + suffix, encoding
+                break
+        response = FileResponse(staticfiles_storage.open(served), content_type=content_type)
+        if content_encoding is not None:
+            response['Content-Encoding'] = content_encoding
+        patch_vary_headers(response, ['Accept-Encoding'])
+        is_immutable = getattr(staticfiles_storage, 'is_immutable', None)
+        if is_immutable is not None and is_immutable(path):
+            patch_cache_control(response, public=True, max_age=STATIC_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
 
 
 class AddRecipeView(LoginRequiredMixin, View):
@@ -454,50 +610,161 @@ class SearchResultsView(View):
 
     def get(self, request, *args, **kwargs):
         """
-        Renders empty search result page
+        Renders a page of results for the phrase from the q query parameter or an empty search result page
         """
-        context = {}
-        return render(request, template_name='Recipes/search-results.html', context=context)
+        searched = request.GET.get('q')
+        if not searched:
+            context = {}
+            return render(request, template_name='Recipes/search-results.html', context=context)
+        after, before = get_cursors(request)
+        return self.render_results(request, searched, after, before)
 
     def post(self, request, *args, **kwargs):
         """
-        Intercepts searched phrase and runs a check in the database against recipes and ingredients containing it in
-        their names, then renders a view with a list of matching results
+        Intercepts searched phrase from the search form of older versions of pages, which posted it, and renders the
+        first page of results
         """
-        searched = request.POST.get('searched')
-        recipes = Recipe.objects.filter(name__icontains=searched)
-        ingredients = Ingredient.objects.filter(name__icontains=searched)
+        return self.render_results(request, request.POST.get('searched'))
+
+    def render_results(self, request, searched, after=None, before=None):
+        """
+        Runs the searched phrase against the search index of recipes and searchable ingredients, then renders a page
+        of matching results ordered from the best match
+
+        @param request: current request
+        @param searched: searched phrase
+        @param after: cursor of the last result of the previous page
+        @param before: cursor of the first result of the next page
+        @return: rendered page
+        """
+        found = search_catalog(searched, after, before)
+        ingredient_images = get_lead_images(IngredientImage, 'ingredient',
+                                            [obj.pk for kind, obj in found if kind == INGREDIENT])
+        return self.render_found(request, searched, found, ingredient_images)
+
+    def render_found(self, request, searched, found, ingredient_images):
+        """
+        Renders a loaded page of search results
+
+        @param request: current request
+        @param searched: searched phrase
+        @param found: KeysetPage of (kind, object) pairs
+        @param ingredient_images: dictionary mapping primary keys of found ingredients to their first pictures
+        @return: rendered page
+        """
+        found.query = {'q': searched or ''}
         search_results = []
 
-        for recipe in recipes:
-            try:
-                recipe_image = RecipeImage.objects.filter(recipe_id=recipe.pk)[0]
-            except IndexError:
-                recipe_image = None
-            search_results.append({
-                'recipe': recipe,
-                'recipe_image': recipe_image,
-            })
-
-        for ingredient in ingredients:
-            if ingredient.is_searchable:
-                try:
-                    ingredient_image = IngredientImage.objects.filter(ingredient_id=ingredient.pk)[0]
-                except IndexError:
-                    ingredient_image = None
+        for kind, obj in found:
+            if kind == RECIPE:
+                search_results.append({
+                    'recipe': obj,
+                })
+            else:
                 search_results.append({
-                    'ingredient': ingredient,
-                    'ingredient_image': ingredient_image,
+                    'ingredient': obj,
+                    'ingredient_image': ingredient_images.get(obj.pk),
                 })
 
         context = {
             'searched': searched,
-            'search_results': search_results
+            'search_results': search_results,
+            'page': found,
         }
 
         return render(request, template_name='Recipes/search-results.html', context=context)
 
 
+class AutocompleteView(View):
+    """
+    Serves names of recipes and searchable ingredients starting with typed text as JSON, meant to be requested on
+    every keystroke in the search form
+    """
+    def get(self, request, *args, **kwargs):
+        """
+        Returns suggestions for the q query parameter from the in memory prefix index; the amount of suggestions can
+        be set with the limit query parameter, up to MAX_SUGGESTIONS
+        """
+        try:
+            limit = min(max(int(request.GET.get('limit', DEFAULT_SUGGESTIONS)), 1), MAX_SUGGESTIONS)
+        except ValueError:
+            limit = DEFAULT_SUGGESTIONS
+        suggestions = get_autocomplete_index().suggest(request.GET.get('q', ''), limit)
+        autocomplete_data = {
+            'suggestions': [{
+                'kind': kind,
+                'name': name,
+                'url': f'/{SUGGESTION_URL_PREFIXES[kind]}/{slug}/',
+            } for kind, name, slug in suggestions],
+        }
+        response = JsonResponse(autocomplete_data, json_dumps_params={'ensure_ascii': False})
+        patch_cache_control(response, public=True, max_age=AUTOCOMPLETE_MAX_AGE)
+        return response
+
+
+class PantryView(View):
+    """
+    View finding recipes that can be cooked from ingredients the user has
+    """
+    def get(self, request, *args, **kwargs):
+        """
+        Renders a form of ingredients to choose from and recipes ranked by how many of their ingredients are covered
+        by the chosen ones
+        """
+        owned, pantry_recipes = find_pantry_recipes(request.GET.getlist('skladnik'))
+        context = {
+            'ingredients': Ingredient.objects.order_by('name').values_list('slug', 'name'),
+            'owned_slugs': {ingredient.slug for ingredient in owned},
+            'pantry_recipes': pantry_recipes,
+        }
+        return render(request, template_name='Recipes/pantry.html', context=context)
+
+
+class PantryResultsView(View):
+    """
+    Serves recipes ranked by coverage of owned ingredients as JSON
+    """
+    def get(self, request, *args, **kwargs):
+        """
+        Returns recipes best covered by ingredients from skladnik query parameters together with ingredients they
+        still miss; the amount of recipes can be set with the limit query parameter
+        """
+        try:
+            limit = max(int(request.GET.get('limit', DEFAULT_PANTRY_RESULTS)), 1)
+        except ValueError:
+            limit = DEFAULT_PANTRY_RESULTS
+        owned, pantry_recipes = find_pantry_recipes(request.GET.getlist('skladnik'), limit)
+        pantry_data = {
+            'ingredients': [ingredient.slug for ingredient in owned],
+            'recipes': [{
+                'slug': pantry_recipe['recipe'].slug,
+                'name': pantry_recipe['recipe'].name,
+                'lead_image': pantry_recipe['recipe'].lead_image,
+                'covered': pantry_recipe['covered'],
+                'required': pantry_recipe['required'],
+                'missing': pantry_recipe['missing'],
+            } for pantry_recipe in pantry_recipes],
+        }
+        return JsonResponse(pantry_data, json_dumps_params={'ensure_ascii': False})
+
+
+class ShoppingListView(View):
+    """
+    View combining ingredients of several recipes into one shopping list
+    """
+    def get(self, request, *args, **kwargs):
+        """
+        Renders summed up ingredients of recipes from przepis query parameters, each given as slug or
+        slug:servings_multiplier
+        """
+        plan = parse_shopping_plan(request.GET.getlist(RECIPE_PARAMETER))
+        context = {
+            'plan_recipes': get_plan_recipes(plan),
+            'shopping_list': build_shopping_list(plan),
+        }
+        return render(request, template_name='Recipes/shopping-list.html', context=context)
+
+
 class UserLoginView(View):
     """
     View handling login process
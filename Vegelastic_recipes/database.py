@@ -0,0 +1,45 @@
+from django.core.exceptions import ImproperlyConfigured
+
+PSYCOPG_POOLING = 'psycopg'
+
+PGBOUNCER_POOLING = 'pgbouncer'
+
+POOLING_MODES = (PSYCOPG_POOLING, PGBOUNCER_POOLING)
+
+
+def persistent_databases(databases, max_age, health_checks=True, pooling=None, pool_size=4):
+    """
+    Copies database configurations so that connections outlive requests instead of being opened by each of them
+
+    Without pooling every worker keeps its own connection for max_age seconds and, with health checks on, pings it
+    before the first query of a request that reuses it, so that a connection dropped by the database server is
+    replaced instead of failing the request. Pooling is meant for deployments with many workers and works with
+    PostgreSQL only: PSYCOPG_POOLING hands connections out of a psycopg pool of pool_size connections kept by every
+    worker process, PGBOUNCER_POOLING expects a pgbouncer in transaction mode on the configured host and port, keeps
+    persistent connections to it and disables server side cursors which do not survive transaction pooling.
+
+    @param databases: DATABASES setting
+    @param max_age: seconds to keep a connection or None to keep it until it breaks
+    @param health_checks: check reused connections before using them
+    @param pooling: one of POOLING_MODES or None
+    @param pool_size: maximum amount of connections in a psycopg pool of a worker
+    @return: new DATABASES setting
+    @raise ImproperlyConfigured: if pooling is unknown or a database does not support it
+    """
+    if pooling is not None and pooling not in POOLING_MODES:
+        raise ImproperlyConfigured(f'Unknown database pooling {pooling!r}, use one of {", ".join(POOLING_MODES)}')
+    configured = {}
+    for alias, database in databases.items():
+        database = {**database, 'OPTIONS': dict(database.get('OPTIONS', {}))}
+        database['CONN_MAX_AGE'] = max_age
+        database['CONN_HEALTH_CHECKS'] = health_checks
+        if pooling is not None and 'postgresql' not in database['ENGINE']:
+            raise ImproperlyConfigured(f'Database pooling needs PostgreSQL, {alias!r} uses {database["ENGINE"]}')
+        if pooling == PSYCOPG_POOLING:
+            # the pool owns the connections, Django returns them to it at the end of every request
+            database['CONN_MAX_AGE'] = 0
+            database['OPTIONS']['pool'] = {'min_size': 1, 'max_size': pool_size}
+        elif pooling == PGBOUNCER_POOLING:
+            database['DISABLE_SERVER_SIDE_CURSORS'] = True
+        configured[alias] = database
+    return configured
@@ -0,0 +1,28 @@
+from django.core.exceptions import ImproperlyConfigured
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def session_engine(name):
+    """
+    Picks the session backend by a short name
+
+    'db' keeps sessions in the database and reads them with a query on every request carrying a session cookie,
+    'cached_db' reads them from the default cache and falls back to the database, 'cache' keeps them in the default
+    cache only, which has to be shared between processes, such as Redis or Memcached, and loses sessions evicted from
+    it, 'signed_cookies' keeps them in the cookie itself, signed with SECRET_KEY, so that they cost no lookup at all
+    but cannot be revoked on the server and are sent with every request.
+
+    @param name: one of SESSION_ENGINES keys
+    @return: SESSION_ENGINE setting
+    @raise ImproperlyConfigured: if the name is unknown
+    """
+    try:
+        return SESSION_ENGINES[name]
+    except KeyError:
+        raise ImproperlyConfigured(f'Unknown session engine {name!r}, use one of {", ".join(SESSION_ENGINES)}')
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 from pathlib import Path
 
+from Vegelastic_recipes.sessions import session_engine
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,15 +46,56 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Recipes.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'Recipes.fast_path.FastPathSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'Recipes.fast_path.FastPathAuthenticationMiddleware',
+    'Recipes.fast_path.FastPathMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Anonymous reads, GET and HEAD requests without a session cookie to pages under ANONYMOUS_READ_PATHS, skip session,
+# authentication and message middleware when ANONYMOUS_FAST_PATH is on, see Recipes.fast_path; the listed pages must
+# not use the session, nor add messages
+
+ANONYMOUS_FAST_PATH = True
+
+ANONYMOUS_READ_PATHS = ('/przepis/', '/skladnik/', '/kategorie/', '/kategoria/', '/szukaj/')
+
+# Sessions
+# https://docs.djangoproject.com/en/3.2/topics/http/sessions/#configuring-the-session-engine
+# VEGELASTIC_SESSION_ENGINE environment variable picks the backend: 'db' by default, 'cached_db', 'cache' or
+# 'signed_cookies', see Vegelastic_recipes.sessions.session_engine
+
+SESSION_ENGINE = session_engine(os.environ.get('VEGELASTIC_SESSION_ENGINE', 'db'))
+
+# Request profiling: when REQUEST_PROFILING is on, every response gets a Server-Timing header with query count, SQL,
+# template and view time, a JSON line is logged to Recipes.profiling and requests taking at least
+# REQUEST_PROFILING_SLOW_MS milliseconds are logged together with all their queries
+
+REQUEST_PROFILING = False
+
+REQUEST_PROFILING_SLOW_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'Recipes.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'Vegelastic_recipes.urls'
 
 TEMPLATES = [
@@ -83,6 +126,53 @@ except ModuleNotFoundError:
     print("Check for errors and try again.")
     exit(0)
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Rendered recipe pages are kept in the RECIPE_PAGE_CACHE_ALIAS cache for RECIPE_PAGE_CACHE_TIMEOUT seconds. Changes
+# of recipes drop their pages only from the cache of the process that made them, so a local memory cache serves old
+# pages from other processes until they expire; deployments with more than one worker process must point
+# RECIPE_PAGE_CACHE_ALIAS at a cache shared between processes, such as
+# 'django.core.cache.backends.redis.RedisCache' or 'django.core.cache.backends.memcached.PyMemcacheCache'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+RECIPE_PAGE_CACHE_ALIAS = 'default'
+
+RECIPE_PAGE_CACHE_TIMEOUT = 300
+
+# Slugs of recipes and ingredients are resolved to primary keys and last modification times through a process local
+# LRU cache of SLUG_CACHE_SIZE entries kept for SLUG_CACHE_LOCAL_TIMEOUT seconds; with SLUG_CACHE_ALIAS set, entries
+# are also shared between processes through that cache, which is also where invalidations reach other processes
+
+SLUG_CACHE_SIZE = 10000
+
+SLUG_CACHE_LOCAL_TIMEOUT = 10
+
+SLUG_CACHE_ALIAS = None
+
+# Search, autocomplete and pantry indexes are kept in the memory of every process and updated in place only by changes
+# made in that process; other processes rebuild theirs from the database once a version kept in the
+# CATALOG_INDEX_CACHE_ALIAS cache, which every change increments, differs from the one they were built under.
+# Deployments with more than one worker process must point CATALOG_INDEX_CACHE_ALIAS at a cache shared between
+# processes, like RECIPE_PAGE_CACHE_ALIAS, otherwise other processes keep serving results of their own indexes until
+# they restart
+
+CATALOG_INDEX_CACHE_ALIAS = 'default'
+
+# Amount of items on a page of category listings and search results; pages are cut with cursors, not offsets
+
+LISTING_PAGE_SIZE = 24
+
+# Recipe, ingredient, category and search pages are served by native async views from Recipes.async_views when
+# ASYNC_VIEWS is on; Vegelastic_recipes.asgi turns it on through VEGELASTIC_ASYNC_VIEWS environment variable, under
+# WSGI the sync views are used since async ones would need an event loop for every request
+
+ASYNC_VIEWS = os.environ.get('VEGELASTIC_ASYNC_VIEWS') == '1'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -123,6 +213,26 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
 
+# collectstatic copies static files to STATIC_ROOT under names with content hashes and writes gzip and, with the brotli
+# package installed, brotli compressed variants next to them; templates link the hashed names through the manifest,
+# so DEBUG off needs collectstatic after every change of static files. Hashed files never change and can be cached
+# by browsers for a year: a web server should serve STATIC_ROOT at STATIC_URL with precompressed variants and
+# "Cache-Control: public, max-age=31536000, immutable" for hashed names, without one set SERVE_STATIC to let Django
+# do the same through Recipes.views.StaticFileView
+
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'Recipes.static_assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+SERVE_STATIC = False
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -131,3 +241,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'Recipes.User'
+
+# Thumbnails of uploaded pictures are generated in THUMBNAIL_WIDTHS by a pool of THUMBNAIL_WORKERS threads and stored
+# under MEDIA_ROOT/thumbnails; set THUMBNAIL_WORKERS to 0 to generate them while saving
+
+THUMBNAIL_WIDTHS = (320, 640)
+
+THUMBNAIL_WORKERS = 2
+
+# Servings multipliers offered on recipe pages; ingredient amounts are precomputed for each of them
+
+SERVINGS_MULTIPLIERS = (1, 2, 3, 4, 5)
+
+# Recipe pages of anonymous visitors are public: shared caches, such as a reverse proxy in front of the site, may serve
+# them for RECIPE_SHARED_MAX_AGE seconds without asking the site, while browsers revalidate them on every use; set it
+# to None to keep recipe pages private
+
+RECIPE_SHARED_MAX_AGE = 300
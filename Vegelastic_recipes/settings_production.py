@@ -0,0 +1,38 @@
+"""
+Production settings profile for Vegelastic_recipes project, used with
+    DJANGO_SETTINGS_MODULE=Vegelastic_recipes.settings_production
+
+It extends settings.py with debugging turned off and database connections kept between requests, configured through
+environment variables:
+    VEGELASTIC_ALLOWED_HOSTS - comma separated host names the site is served under
+    VEGELASTIC_CONN_MAX_AGE - seconds to keep a database connection, 600 by default, empty to keep it until it breaks
+    VEGELASTIC_CONN_HEALTH_CHECKS - 0 to skip checking reused connections
+    VEGELASTIC_DB_POOLING - 'psycopg' or 'pgbouncer' to pool PostgreSQL connections, see
+                            Vegelastic_recipes.database.persistent_databases
+    VEGELASTIC_DB_POOL_SIZE - maximum amount of pooled connections of a worker with psycopg pooling, 4 by default
+    VEGELASTIC_SERVE_STATIC - 1 to serve collected static files without a web server, see SERVE_STATIC
+"""
+import os
+
+from Vegelastic_recipes.settings import *  # noqa: F401,F403
+from Vegelastic_recipes.settings import DATABASES
+from Vegelastic_recipes.database import persistent_databases
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('VEGELASTIC_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+# Database
+# https://docs.djangoproject.com/en/3.2/ref/databases/#persistent-connections
+
+conn_max_age = os.environ.get('VEGELASTIC_CONN_MAX_AGE', '600')
+
+DATABASES = persistent_databases(
+    DATABASES,
+    max_age=int(conn_max_age) if conn_max_age else None,
+    health_checks=os.environ.get('VEGELASTIC_CONN_HEALTH_CHECKS') != '0',
+    pooling=os.environ.get('VEGELASTIC_DB_POOLING') or None,
+    pool_size=int(os.environ.get('VEGELASTIC_DB_POOL_SIZE', '4')),
+)
+
+SERVE_STATIC = os.environ.get('VEGELASTIC_SERVE_STATIC') == '1'
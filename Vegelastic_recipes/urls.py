@@ -13,21 +13,48 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 import Recipes.views as recipe_views
+import Recipes.async_views as async_recipe_views
 from django.conf import settings
 from django.conf.urls.static import static
 
+# Read only pages are served by native async views under ASGI, see ASYNC_VIEWS setting
+if settings.ASYNC_VIEWS:
+    RecipeDetailsView = async_recipe_views.AsyncRecipeDetailsView
+    IngredientDetailsView = async_recipe_views.AsyncIngredientDetailsView
+    RecipeCategoryView = async_recipe_views.AsyncRecipeCategoryView
+    SearchResultsView = async_recipe_views.AsyncSearchResultsView
+else:
+    RecipeDetailsView = recipe_views.RecipeDetailsView
+    IngredientDetailsView = recipe_views.IngredientDetailsView
+    RecipeCategoryView = recipe_views.RecipeCategoryView
+    SearchResultsView = recipe_views.SearchResultsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', recipe_views.MainPageView.as_view(), name="index"),
     path('login/', recipe_views.UserLoginView.as_view(), name="login"),
     path('logout/', recipe_views.UserLogoutView.as_view(), name="logout"),
-    path('przepis/<slug:slug>/', recipe_views.RecipeDetailsView.as_view()),
+    path('przepis/<slug:slug>/', RecipeDetailsView.as_view()),
+    path('przepis/<slug:slug>/skalowanie/', recipe_views.RecipeScalingView.as_view()),
     path('dodaj/przepis/', recipe_views.AddRecipeView.as_view()),
-    path('skladnik/<slug:slug>/', recipe_views.IngredientDetailsView.as_view()),
+    path('skladnik/<slug:slug>/', IngredientDetailsView.as_view()),
     path('kategorie/', recipe_views.RecipeCategoriesView.as_view()),
-    path('kategoria/<int:pk>/', recipe_views.RecipeCategoryView.as_view()),
-    path('szukaj/', recipe_views.SearchResultsView.as_view()),
+    path('kategoria/<int:pk>/', RecipeCategoryView.as_view()),
+    path('szukaj/', SearchResultsView.as_view()),
+    path('szukaj/podpowiedzi/', recipe_views.AutocompleteView.as_view()),
+    path('spizarnia/', recipe_views.PantryView.as_view()),
+    path('spizarnia/wyniki/', recipe_views.PantryResultsView.as_view()),
+    path('lista-zakupow/', recipe_views.ShoppingListView.as_view()),
+    path('statystyki/cache/', recipe_views.RecipePageCacheStatsView.as_view()),
+    path('thumbnails/<int:width>/<path:name>', recipe_views.ThumbnailView.as_view()),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Collected static files with far future caching when no web server serves them, see SERVE_STATIC setting
+if settings.SERVE_STATIC and not settings.DEBUG:
+    urlpatterns.append(re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+                               recipe_views.StaticFileView.as_view()))
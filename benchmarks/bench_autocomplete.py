@@ -0,0 +1,76 @@
+"""
+Times building the autocomplete prefix index, looking typed prefixes up in it and the whole autocomplete request
+
+Run from the project root:
+    python -m benchmarks.bench_autocomplete --recipes 100000 --ingredients 5000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment, setup_databases, teardown_databases  # noqa: E402
+
+from Recipes.autocomplete import get_autocomplete_index  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+QUERY_COUNT = 1000
+
+
+def measure(function, queries):
+    """
+    Runs every query once
+
+    @return: mean and 99th percentile time of a single query
+    """
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        function(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'mean_ms': 1000 * sum(timings) / len(timings),
+        'p99_ms': 1000 * timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        catalog = generate_catalog(arguments.recipes, arguments.ingredients, arguments.seed, images_per_recipe=0)
+        generator = random.Random(arguments.seed)
+        queries = [word[:generator.randint(1, len(word))] for word in generator.choices(catalog.words, k=QUERY_COUNT)]
+
+        start = time.perf_counter()
+        index = get_autocomplete_index()
+        build_seconds = time.perf_counter() - start
+        client = Client()
+        result = {
+            'recipes': arguments.recipes,
+            'ingredients': arguments.ingredients,
+            'index_build_s': build_seconds,
+            'suggest': measure(index.suggest, queries),
+            'request': measure(lambda query: client.get('/szukaj/podpowiedzi/', {'q': query}), queries),
+        }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
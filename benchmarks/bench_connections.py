@@ -0,0 +1,184 @@
+"""
+Measures how much of the time of recipe and search requests goes to opening database connections: the same urls are
+requested through the WSGI handler, so that connections are closed at the end of requests exactly as under a WSGI
+server, once with connections closed after every request as with settings.py and once with the persistent and health
+checked connections of settings_production.py; results are printed or written as JSON so that runs on different
+commits and databases can be compared.
+
+The database configured in settings is used for a test database; a SQLite one is created as a file, since in-memory
+SQLite databases are never closed.
+
+Run from the project root:
+    python -m benchmarks.bench_connections --recipes 1000 --requests 500 --output connections.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+
+from Recipes.search import get_search_index  # noqa: E402
+from Recipes.slugs import reset_slug_cache  # noqa: E402
+from Vegelastic_recipes.database import persistent_databases  # noqa: E402
+from benchmarks.bench_views import current_commit  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+PROFILES = {
+    'per_request': {'max_age': 0, 'health_checks': False},
+    'persistent': {'max_age': 600, 'health_checks': True},
+}
+
+
+def view_urls(catalog, generator, count):
+    """
+    Picks urls of the benchmarked views
+
+    @return: dictionary mapping view names to lists of urls
+    """
+    return {
+        'RecipeDetailsView': [f'/przepis/{slug}/' for slug in generator.choices(catalog.recipe_slugs, k=count)],
+        'SearchResultsView': [f'/szukaj/?{urlencode({"q": word})}'
+                              for word in generator.choices(catalog.words, k=count)],
+    }
+
+
+def use_profile(profile):
+    """
+    Reconfigures the default connection as persistent_databases would and closes it
+    """
+    connection.close()
+    configured = persistent_databases({'default': connection.settings_dict}, **profile)['default']
+    connection.settings_dict['CONN_MAX_AGE'] = configured['CONN_MAX_AGE']
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = configured['CONN_HEALTH_CHECKS']
+
+
+def request(application, url):
+    """
+    Requests a url the way a WSGI server does, closing the response which ends the request
+
+    @return: status code of the response
+    """
+    path, _, query = url.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET', 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    response = application(environ, lambda response_status, headers: status.append(response_status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return int(status[0].split()[0])
+
+
+def measure_view(application, urls):
+    """
+    Requests every url once after one warm up request, with cached pages and slugs dropped before every request so
+    that all of them reach the database
+
+    @return: mean and median time of a request and amount of connections opened by the requests
+    """
+    opened = []
+
+    def count_connection(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    request(application, urls[0])
+    timings = []
+    connection_created.connect(count_connection)
+    try:
+        for url in urls:
+            cache.clear()
+            reset_slug_cache()
+            start = time.perf_counter()
+            status = request(application, url)
+            timings.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f'{url} returned {status}')
+    finally:
+        connection_created.disconnect(count_connection)
+    timings.sort()
+    return {
+        'mean_ms': 1000 * sum(timings) / len(timings),
+        'p50_ms': 1000 * timings[len(timings) // 2],
+        'connections_opened': len(opened),
+    }
+
+
+def measure_connect(count):
+    """
+    @return: mean time in milliseconds of opening a connection and running its first query
+    """
+    connection.close()
+    start = time.perf_counter()
+    for _ in range(count):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        connection.close()
+    return 1000 * (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipes', type=int, default=1000, help='amount of recipes in the synthetic catalog')
+    parser.add_argument('--requests', type=int, default=200, help='amount of requests per view and profile')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write JSON results to instead of printing them')
+    arguments = parser.parse_args()
+
+    settings.ALLOWED_HOSTS = ['*']
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench_connections.sqlite3')
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            catalog = generate_catalog(arguments.recipes, max(arguments.recipes // 2, 1), arguments.seed)
+            get_search_index()
+            application = get_wsgi_application()
+            urls = view_urls(catalog, random.Random(arguments.seed), arguments.requests)
+            connect_ms = measure_connect(arguments.requests)
+            profiles = {}
+            for name, profile in PROFILES.items():
+                use_profile(profile)
+                profiles[name] = {view_name: measure_view(application, urls_of_view)
+                                  for view_name, urls_of_view in urls.items()}
+            connection.close()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    result = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'recipes': arguments.recipes,
+        'requests': arguments.requests,
+        'connect_ms': connect_ms,
+        'profiles': profiles,
+    }
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
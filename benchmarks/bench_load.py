@@ -0,0 +1,259 @@
+"""
+Load test comparing throughput and latency of the WSGI deployment with sync views and the ASGI deployment with async
+views serving the same database. Every server is started from its command, warmed up with one request per url and
+then hit with the same mix of recipe, ingredient, category and search urls from concurrent keep-alive connections for
+a fixed time; results are printed or written as JSON so that runs on different commits can be compared.
+
+Servers are not dependencies of the project and have to be installed separately; {port} in a command is replaced
+with a free port. The database configured in settings is used as it is; --seed fills it with a synthetic catalog
+and refuses to touch a database that already has recipes.
+
+Run from the project root:
+    python -m benchmarks.bench_load --seed 10000 --duration 30 --concurrency 32 --output load.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shlex
+import socket
+import subprocess
+import threading
+import time
+from urllib.parse import urlencode
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from Recipes.models import Recipe, Ingredient, CATEGORY_CHOICES  # noqa: E402
+from benchmarks.bench_views import current_commit  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+DEFAULT_WSGI_COMMAND = 'gunicorn Vegelastic_recipes.wsgi:application --workers 4 --bind 127.0.0.1:{port}'
+
+DEFAULT_ASGI_COMMAND = 'uvicorn Vegelastic_recipes.asgi:application --workers 4 --port {port} --no-access-log'
+
+STARTUP_TIMEOUT = 30
+
+
+def seed_database(recipe_count, seed):
+    """
+    Fills an empty database with a synthetic catalog
+
+    @param recipe_count: amount of recipes, half as many ingredients are created
+    @param seed: seed of the random generator
+    """
+    if Recipe.objects.exists():
+        raise SystemExit('--seed needs a database without recipes')
+    generate_catalog(recipe_count, max(recipe_count // 2, 1), seed)
+
+
+def pick_urls(generator, count):
+    """
+    Picks urls of every load tested view from the database
+
+    @param generator: random generator
+    @param count: amount of urls of every view
+    @return: shuffled list of urls
+    """
+    recipe_slugs = list(Recipe.objects.values_list('slug', flat=True))
+    ingredient_slugs = list(Ingredient.objects.values_list('slug', flat=True))
+    if not recipe_slugs or not ingredient_slugs:
+        raise SystemExit('the database has no catalog, fill it or use --seed')
+    words = sorted({word for name in Recipe.objects.values_list('name', flat=True)[:1000]
+                    for word in name.split() if len(word) > 3})
+    urls = [
+        *(f'/przepis/{slug}/' for slug in generator.choices(recipe_slugs, k=count)),
+        *(f'/skladnik/{slug}/' for slug in generator.choices(ingredient_slugs, k=count)),
+        *(f'/kategoria/{key}/' for key in generator.choices([key for key, _ in CATEGORY_CHOICES], k=count)),
+        *(f'/szukaj/?{urlencode({"q": word})}' for word in generator.choices(words, k=count)),
+    ]
+    generator.shuffle(urls)
+    return urls
+
+
+def free_port():
+    """
+    @return: a currently unused local port
+    """
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(command, asynchronous):
+    """
+    Starts a server and waits until it answers
+
+    @param command: command with a {port} placeholder
+    @param asynchronous: serve read only pages with async views
+    @return: the server process and its port
+    """
+    port = free_port()
+    environment = dict(os.environ)
+    environment.pop('VEGELASTIC_ASYNC_VIEWS', None)
+    if asynchronous:
+        environment['VEGELASTIC_ASYNC_VIEWS'] = '1'
+    process = subprocess.Popen(shlex.split(command.format(port=port)), env=environment,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'{command!r} exited with {process.returncode}')
+        try:
+            connection_to_server = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection_to_server.request('GET', '/')
+            connection_to_server.getresponse().read()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'{command!r} did not answer within {STARTUP_TIMEOUT} s')
+
+
+def stop_server(process):
+    """
+    Stops a server started by start_server
+    """
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_load(port, urls, concurrency, duration):
+    """
+    Requests urls in a loop from concurrent keep-alive connections, every one starting at another url
+
+    @param port: port of the server
+    @param urls: list of urls
+    @param concurrency: amount of connections
+    @param duration: time of the test in seconds
+    @return: sorted latencies of successful requests in seconds, amount of failed requests and the elapsed time
+    """
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        own_latencies = []
+        own_failures = 0
+        server = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        position = offset
+        while time.monotonic() < deadline:
+            url = urls[position % len(urls)]
+            position += 1
+            start = time.perf_counter()
+            try:
+                server.request('GET', url)
+                response = server.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                own_failures += 1
+                server.close()
+                server = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            if response.status == 200:
+                own_latencies.append(time.perf_counter() - start)
+            else:
+                own_failures += 1
+        server.close()
+        with lock:
+            latencies.extend(own_latencies)
+            failures[0] += own_failures
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(number * len(urls) // concurrency,))
+               for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), failures[0], time.perf_counter() - started
+
+
+def percentile(latencies, fraction):
+    """
+    @param latencies: sorted latencies in seconds
+    @param fraction: percentile as a fraction
+    @return: latency in milliseconds
+    """
+    return 1000 * latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] if latencies else None
+
+
+def load_test(command, asynchronous, urls, arguments):
+    """
+    Starts a deployment, warms it up and measures it
+
+    @return: dictionary with throughput, latency percentiles and failures
+    """
+    process, port = start_server(command, asynchronous)
+    try:
+        warm_up = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        for url in urls:
+            warm_up.request('GET', url)
+            warm_up.getresponse().read()
+        warm_up.close()
+        latencies, failures, elapsed = run_load(port, urls, arguments.concurrency, arguments.duration)
+    finally:
+        stop_server(process)
+    return {
+        'command': command,
+        'requests': len(latencies),
+        'failures': failures,
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': 1000 * latencies[-1] if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi-command', default=DEFAULT_WSGI_COMMAND)
+    parser.add_argument('--asgi-command', default=DEFAULT_ASGI_COMMAND)
+    parser.add_argument('--seed', type=int, metavar='RECIPES',
+                        help='fill an empty database with a synthetic catalog of this many recipes first')
+    parser.add_argument('--urls', type=int, default=200, help='amount of distinct urls of every view')
+    parser.add_argument('--concurrency', type=int, default=16, help='amount of concurrent connections')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load against every deployment')
+    parser.add_argument('--random-seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write JSON results to instead of printing them')
+    arguments = parser.parse_args()
+
+    if arguments.seed:
+        seed_database(arguments.seed, arguments.random_seed)
+    urls = pick_urls(random.Random(arguments.random_seed), arguments.urls)
+    connection.close()
+
+    result = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'recipes': Recipe.objects.count(),
+        'urls': len(urls),
+        'concurrency': arguments.concurrency,
+        'duration_s': arguments.duration,
+        'deployments': {
+            'wsgi': load_test(arguments.wsgi_command, False, urls, arguments),
+            'asgi': load_test(arguments.asgi_command, True, urls, arguments),
+        },
+    }
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
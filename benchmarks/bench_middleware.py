@@ -0,0 +1,178 @@
+"""
+Measures the per request overhead of sessions and authentication: recipe pages are requested through the WSGI handler
+by anonymous visitors, once with the regular middleware and once with the anonymous fast path of Recipes.fast_path,
+and by a signed in user with every session engine of Vegelastic_recipes.sessions; pages are served from the warm page
+cache so that the middleware makes up as much of a request as possible. Results are printed or written as JSON so
+that runs on different commits can be compared.
+
+Run from the project root:
+    python -m benchmarks.bench_middleware --recipes 1000 --requests 500 --rounds 5 --output middleware.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases, override_settings  # noqa: E402
+from django.utils.module_loading import import_module  # noqa: E402
+
+from Recipes.models import User  # noqa: E402
+from Vegelastic_recipes.sessions import SESSION_ENGINES, session_engine  # noqa: E402
+from benchmarks.bench_views import current_commit  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+ANONYMOUS_PROFILES = {
+    'regular': {'ANONYMOUS_FAST_PATH': False},
+    'fast_path': {'ANONYMOUS_FAST_PATH': True},
+}
+
+
+def page_urls(catalog, generator, count):
+    """
+    Picks urls of recipe pages, which are served from the page cache once warm, so that the time of a request is
+    mostly the handler and its middleware
+
+    @return: list of urls
+    """
+    return [f'/przepis/{slug}/' for slug in generator.choices(catalog.recipe_slugs, k=count)]
+
+
+def request(application, url, cookie=None):
+    """
+    Requests a url the way a WSGI server does
+
+    @param cookie: Cookie header value or None
+    @return: status code of the response
+    """
+    path, _, query = url.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET', 'wsgi.input': BytesIO()}
+    if cookie is not None:
+        environ['HTTP_COOKIE'] = cookie
+    setup_testing_defaults(environ)
+    status = []
+    response = application(environ, lambda response_status, headers: status.append(response_status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return int(status[0].split()[0])
+
+
+def measure(profiles, urls, rounds):
+    """
+    Requests every url once per round with every profile, alternating profiles between rounds so that they share
+    warm up and noise alike, after one pass warming the caches
+
+    @param profiles: dictionary mapping profile names to (settings overrides, Cookie header value or None) pairs
+    @param rounds: amount of rounds
+    @return: dictionary mapping profile names to mean and median time of a request in microseconds and mean amount
+    of queries
+    """
+    applications = {}
+    for name, (overrides, cookie) in profiles.items():
+        with override_settings(**overrides):
+            applications[name] = WSGIHandler()
+            for url in urls:
+                request(applications[name], url, cookie)
+    timings = {name: [] for name in profiles}
+    queries = {name: 0 for name in profiles}
+    for _ in range(rounds):
+        for name, (overrides, cookie) in profiles.items():
+            def count_query(execute, sql, params, many, context):
+                queries[name] += 1
+                return execute(sql, params, many, context)
+
+            with override_settings(**overrides), connection.execute_wrapper(count_query):
+                for url in urls:
+                    start = time.perf_counter()
+                    status = request(applications[name], url, cookie)
+                    timings[name].append(time.perf_counter() - start)
+                    if status != 200:
+                        raise RuntimeError(f'{url} returned {status}')
+    results = {}
+    for name, profile_timings in timings.items():
+        profile_timings.sort()
+        results[name] = {
+            'mean_us': 1e6 * sum(profile_timings) / len(profile_timings),
+            'p50_us': 1e6 * profile_timings[len(profile_timings) // 2],
+            'queries': queries[name] / len(profile_timings),
+        }
+    return results
+
+
+def signed_in_cookie(user):
+    """
+    Starts a session of a signed in user with the configured session engine
+
+    @return: Cookie header value carrying the session
+    """
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipes', type=int, default=1000, help='amount of recipes in the synthetic catalog')
+    parser.add_argument('--requests', type=int, default=500, help='amount of requests per profile and round')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write JSON results to instead of printing them')
+    arguments = parser.parse_args()
+
+    settings.ALLOWED_HOSTS = ['*']
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        catalog = generate_catalog(arguments.recipes, max(arguments.recipes // 2, 1), arguments.seed)
+        urls = page_urls(catalog, random.Random(arguments.seed), arguments.requests)
+        user = User.objects.create_user(username='bench', password='bench')
+
+        anonymous = measure({name: (overrides, None) for name, overrides in ANONYMOUS_PROFILES.items()},
+                            urls, arguments.rounds)
+        signed_in_profiles = {}
+        for name in SESSION_ENGINES:
+            overrides = {'SESSION_ENGINE': session_engine(name)}
+            with override_settings(**overrides):
+                signed_in_profiles[name] = (overrides, signed_in_cookie(user))
+        signed_in = measure(signed_in_profiles, urls, arguments.rounds)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    result = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'recipes': arguments.recipes,
+        'requests': arguments.requests,
+        'rounds': arguments.rounds,
+        'anonymous': anonymous,
+        'fast_path_saving_us': anonymous['regular']['mean_us'] - anonymous['fast_path']['mean_us'],
+        'signed_in': signed_in,
+    }
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the pantry index against ranking recipes by ingredient coverage with an aggregate query
+
+Run from the project root:
+    python -m benchmarks.bench_pantry --recipes 100000 --ingredients 5000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.db.models import Count, F, FloatField, Q  # noqa: E402
+from django.db.models.functions import Cast  # noqa: E402
+from django.test.utils import setup_test_environment, setup_databases, teardown_databases  # noqa: E402
+
+from Recipes.models import Ingredient, RecipeIngredient  # noqa: E402
+from Recipes.pantry import get_pantry_index, find_pantry_recipes, DEFAULT_PANTRY_RESULTS  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+PANTRY_COUNT = 20
+
+
+def aggregate_top(owned_ingredient_pks, limit=DEFAULT_PANTRY_RESULTS):
+    """
+    Ranks recipes by coverage in the database: counts owned and required ingredients of every recipe
+    """
+    return list(RecipeIngredient.objects.values('recipe_id').annotate(
+        covered=Count('ingredient_id', filter=Q(ingredient_id__in=owned_ingredient_pks), distinct=True),
+        required=Count('ingredient_id', distinct=True),
+    ).filter(covered__gt=0).annotate(
+        coverage=Cast(F('covered'), FloatField()) / F('required'),
+    ).order_by('-coverage', '-covered', 'recipe_id')[:limit])
+
+
+def measure(function, pantries, repeat):
+    """
+    Runs every pantry repeat times
+
+    @return: mean and 95th percentile time of a single query
+    """
+    timings = []
+    for _ in range(repeat):
+        for pantry in pantries:
+            start = time.perf_counter()
+            function(pantry)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'mean_ms': 1000 * sum(timings) / len(timings),
+        'p95_ms': 1000 * timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=5000)
+    parser.add_argument('--pantry-size', type=int, default=10, help='amount of owned ingredients in a query')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        catalog = generate_catalog(arguments.recipes, arguments.ingredients, arguments.seed, images_per_recipe=0)
+        generator = random.Random(arguments.seed)
+        slug_pantries = [generator.sample(catalog.ingredient_slugs, arguments.pantry_size)
+                         for _ in range(PANTRY_COUNT)]
+        pks = dict(Ingredient.objects.values_list('slug', 'pk'))
+        pk_pantries = [[pks[slug] for slug in pantry] for pantry in slug_pantries]
+
+        start = time.perf_counter()
+        get_pantry_index()
+        build_seconds = time.perf_counter() - start
+        result = {
+            'recipes': arguments.recipes,
+            'ingredients': arguments.ingredients,
+            'recipe_ingredients': RecipeIngredient.objects.count(),
+            'pantry_size': arguments.pantry_size,
+            'index_build_s': build_seconds,
+            'aggregate_query': measure(aggregate_top, pk_pantries, arguments.repeat),
+            'index_top': measure(get_pantry_index().top, pk_pantries, arguments.repeat),
+            'index_with_cards': measure(find_pantry_recipes, slug_pantries, arguments.repeat),
+        }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures rendering of recipe ingredient amounts with and without the precomputed scaling tables
+
+Run from the project root:
+    python -m benchmarks.bench_scaling
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from Recipes.scaling import render_ingredient_amount, scale_ingredient, get_servings_multipliers  # noqa: E402
+
+AMOUNTS = (0.25, 0.33, 0.5, 0.67, 0.75, 1, 1.5, 2, 3, 5, 100, 250)
+
+
+def make_recipe(generator, ingredient_count):
+    """
+    Builds (amount, measure, names) rows of a random recipe
+    """
+    return [(generator.choice(AMOUNTS), generator.randint(1, 7), (f'a{number}', f'b{number}', f'c{number}',
+                                                                    f'd{number}'))
+            for number in range(ingredient_count)]
+
+
+def render_directly(recipe, servings_multiplier):
+    return [render_ingredient_amount(amount, measure, names, servings_multiplier)
+            for amount, measure, names in recipe]
+
+
+def render_from_tables(recipe, servings_multiplier):
+    servings_multipliers = get_servings_multipliers()
+    return [scale_ingredient(amount, measure, names, servings_multipliers)[servings_multiplier]
+            for amount, measure, names in recipe]
+
+
+def measure(function, recipes, repeat):
+    """
+    @return: mean time of rendering a single recipe for a single multiplier in microseconds
+    """
+    multipliers = get_servings_multipliers()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for recipe in recipes:
+            for servings_multiplier in multipliers:
+                function(recipe, servings_multiplier)
+    elapsed = time.perf_counter() - start
+    return 1e6 * elapsed / (repeat * len(recipes) * len(multipliers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=200)
+    parser.add_argument('--ingredients', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    generator = random.Random(arguments.seed)
+    recipes = [make_recipe(generator, arguments.ingredients) for _ in range(arguments.recipes)]
+    scale_ingredient.cache_clear()
+    result = {
+        'ingredients_per_recipe': arguments.ingredients,
+        'direct_us': measure(render_directly, recipes, arguments.repeat),
+        'cold_tables_us': measure(render_from_tables, recipes, 1),
+        'warm_tables_us': measure(render_from_tables, recipes, arguments.repeat),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
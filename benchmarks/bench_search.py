@@ -0,0 +1,117 @@
+"""
+Compares the search index against the former name__icontains scans
+
+Run from the project root:
+    python -m benchmarks.bench_search --recipes 100000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.test.utils import setup_test_environment, setup_databases, teardown_databases  # noqa: E402
+from django.utils.text import slugify  # noqa: E402
+
+from Recipes.models import Recipe, Ingredient  # noqa: E402
+from Recipes.search import get_search_index, search_catalog  # noqa: E402
+from benchmarks.catalog import make_vocabulary  # noqa: E402
+
+QUERY_COUNT = 20
+
+
+def populate(recipe_count, ingredient_count, seed):
+    """
+    Fills the test database with random recipes and searchable ingredients
+
+    @return: phrases to search for
+    """
+    generator = random.Random(seed)
+    words = make_vocabulary(generator, 5000)
+    recipes = []
+    for number in range(recipe_count):
+        name = f'{" ".join(generator.sample(words, 3))} {number}'
+        recipes.append(Recipe(name=name, slug=slugify(name), has_servings=True, servings=2, prep_time=30,
+                              meal_description=' '.join(generator.choices(words, k=8)),
+                              prep_instructions=' '.join(generator.choices(words, k=20))))
+    Recipe.objects.bulk_create(recipes, batch_size=5000)
+    ingredients = []
+    for number in range(ingredient_count):
+        name = f'{generator.choice(words)} {number}'
+        ingredients.append(Ingredient(name=name, slug=slugify(name), name_one=name, name_two=name, name_five=name,
+                                      name_half=name, is_searchable=True))
+    Ingredient.objects.bulk_create(ingredients, batch_size=5000)
+    return [generator.choice(words) for _ in range(QUERY_COUNT)]
+
+
+RESULTS_PAGE = 24
+
+
+def icontains_search(searched):
+    """
+    Search as done before the index: substring scans over recipe and ingredient names loading every match
+    """
+    recipes = list(Recipe.objects.filter(name__icontains=searched))
+    ingredients = [ingredient for ingredient in Ingredient.objects.filter(name__icontains=searched)
+                   if ingredient.is_searchable]
+    return len(recipes) + len(ingredients)
+
+
+def measure(function, queries, repeat):
+    """
+    Runs every query repeat times
+
+    @return: mean and 95th percentile time of a single query
+    """
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            function(query)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'mean_ms': 1000 * sum(timings) / len(timings),
+        'p95_ms': 1000 * timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        queries = populate(arguments.recipes, arguments.ingredients, arguments.seed)
+        start = time.perf_counter()
+        get_search_index()
+        build_seconds = time.perf_counter() - start
+        result = {
+            'recipes': arguments.recipes,
+            'ingredients': arguments.ingredients,
+            'index_build_s': build_seconds,
+            'icontains': measure(icontains_search, queries, arguments.repeat),
+            'icontains_hits': sum(icontains_search(query) for query in queries) / len(queries),
+            'index_lookup': measure(get_search_index().search, queries, arguments.repeat),
+            'index_hits': sum(len(get_search_index().search(query)) for query in queries) / len(queries),
+            'index_catalog': measure(search_catalog, queries, arguments.repeat),
+            f'index_catalog_top_{RESULTS_PAGE}': measure(
+                lambda query: search_catalog(query, page_size=RESULTS_PAGE), queries, arguments.repeat),
+        }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
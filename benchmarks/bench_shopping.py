@@ -0,0 +1,93 @@
+"""
+Times combining ingredients of weekly plans of recipes into a shopping list: the whole list, summing of fetched rows
+alone and, for comparison, summing loaded RecipeIngredient objects with their ingredients
+
+Run from the project root:
+    python -m benchmarks.bench_shopping --recipes 10000 --plan-size 30
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.test.utils import setup_test_environment, setup_databases, teardown_databases  # noqa: E402
+
+from Recipes.models import RecipeIngredient  # noqa: E402
+from Recipes.shopping import build_shopping_list, sum_amounts, MEASURE_GROUPS, SHOPPING_LIST_FIELDS  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+PLAN_COUNT = 20
+
+
+def sum_objects(plan):
+    """
+    Sums amounts walking RecipeIngredient objects loaded with their recipes and ingredients
+    """
+    totals = defaultdict(float)
+    for recipe_ingredient in RecipeIngredient.objects.filter(recipe__slug__in=list(plan)).select_related(
+            'recipe', 'ingredient'):
+        group, factor = MEASURE_GROUPS[recipe_ingredient.measure]
+        totals[(recipe_ingredient.ingredient.pk, group)] += (recipe_ingredient.amount * factor
+                                                              * plan[recipe_ingredient.recipe.slug])
+    return totals
+
+
+def measure(function, plans, repeat):
+    """
+    Runs every plan repeat times
+
+    @return: mean and 95th percentile time of a single plan
+    """
+    timings = []
+    for _ in range(repeat):
+        for plan in plans:
+            start = time.perf_counter()
+            function(plan)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'mean_ms': 1000 * sum(timings) / len(timings),
+        'p95_ms': 1000 * timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--plan-size', type=int, default=30, help='amount of recipes in a plan')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        catalog = generate_catalog(arguments.recipes, arguments.ingredients, arguments.seed, images_per_recipe=0)
+        generator = random.Random(arguments.seed)
+        plans = [{slug: generator.randint(1, 4)
+                  for slug in generator.sample(catalog.recipe_slugs, arguments.plan_size)} for _ in range(PLAN_COUNT)]
+        rows = {id(plan): list(RecipeIngredient.objects.filter(recipe__slug__in=list(plan)).values_list(
+            *SHOPPING_LIST_FIELDS)) for plan in plans}
+        result = {
+            'recipes': arguments.recipes,
+            'ingredients': arguments.ingredients,
+            'plan_size': arguments.plan_size,
+            'shopping_list': measure(build_shopping_list, plans, arguments.repeat),
+            'sum_rows': measure(lambda plan: sum_amounts(rows[id(plan)], plan), plans, arguments.repeat),
+            'sum_objects': measure(sum_objects, plans, arguments.repeat),
+        }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
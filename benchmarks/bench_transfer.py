@@ -0,0 +1,73 @@
+"""
+Measures exporting a synthetic catalog to JSON Lines and importing it into an empty database
+
+Run from the project root:
+    python -m benchmarks.bench_transfer --recipes 125000 --ingredients 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from io import StringIO
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.test.utils import setup_test_environment, setup_databases, teardown_databases  # noqa: E402
+
+from Recipes.models import RecipeIngredient  # noqa: E402
+from Recipes.transfer import export_catalog, import_catalog, TRANSFER_BATCH_SIZE  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=125000)
+    parser.add_argument('--ingredients', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=TRANSFER_BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        generate_catalog(arguments.recipes, arguments.ingredients, arguments.seed)
+        links = RecipeIngredient.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.jsonl')
+            start = time.perf_counter()
+            with open(path, 'w', encoding='utf-8') as output:
+                records = export_catalog(output, arguments.batch_size)
+            export_seconds = time.perf_counter() - start
+            size = os.path.getsize(path)
+
+            call_command('flush', interactive=False, verbosity=0)
+            start = time.perf_counter()
+            with open(path, encoding='utf-8') as lines:
+                import_catalog(lines, arguments.batch_size, os.path.join(directory, 'checkpoint'), rebuild=False)
+            import_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            call_command('rebuild_recipe_cards', stdout=StringIO())
+            rebuild_seconds = time.perf_counter() - start
+        result = {
+            'recipes': arguments.recipes,
+            'ingredients': arguments.ingredients,
+            'recipe_ingredients': links,
+            'records': records,
+            'file_mb': size / 2 ** 20,
+            'export_s': export_seconds,
+            'import_s': import_seconds,
+            'rebuild_s': rebuild_seconds,
+            'imported_links_per_s': RecipeIngredient.objects.count() / import_seconds,
+        }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Times the recipe, ingredient, category and search views and counts their queries on synthetic catalogs of several
+sizes; results are printed or written as JSON so that runs on different commits can be compared
+
+Run from the project root:
+    python -m benchmarks.bench_views --sizes 100 1000 10000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Vegelastic_recipes.settings')
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (setup_test_environment, setup_databases, teardown_databases,  # noqa: E402
+                               CaptureQueriesContext)
+
+from Recipes.search import get_search_index  # noqa: E402
+from benchmarks.catalog import generate_catalog  # noqa: E402
+
+
+def view_urls(catalog, generator, count):
+    """
+    Picks urls of every benchmarked view
+
+    @return: dictionary mapping view names to lists of urls
+    """
+    return {
+        'RecipeDetailsView': [f'/przepis/{slug}/' for slug in generator.choices(catalog.recipe_slugs, k=count)],
+        'IngredientDetailsView': [f'/skladnik/{slug}/'
+                                  for slug in generator.choices(catalog.ingredient_slugs, k=count)],
+        'RecipeCategoryView': [f'/kategoria/{key}/' for key in generator.choices(catalog.category_keys, k=count)],
+        'SearchResultsView': [f'/szukaj/?q={word}' for word in generator.choices(catalog.words, k=count)],
+    }
+
+
+def measure_view(client, urls, clear_cache):
+    """
+    Requests every url once
+
+    @param clear_cache: drop cached pages before every request
+    @return: mean and 95th percentile time and mean amount of queries of a single request
+    """
+    timings = []
+    queries = []
+    for url in urls:
+        if clear_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+        queries.append(len(captured))
+    timings.sort()
+    return {
+        'mean_ms': 1000 * sum(timings) / len(timings),
+        'p95_ms': 1000 * timings[max(int(len(timings) * 0.95) - 1, 0)],
+        'queries': sum(queries) / len(queries),
+    }
+
+
+def benchmark_size(recipe_count, ingredient_count, arguments):
+    """
+    Builds a catalog of a size and measures every view against it
+
+    @return: dictionary with the catalog size and measurements of every view
+    """
+    call_command('flush', interactive=False, verbosity=0)
+    cache.clear()
+    start = time.perf_counter()
+    catalog = generate_catalog(recipe_count, ingredient_count, arguments.seed)
+    generate_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    get_search_index()
+    index_seconds = time.perf_counter() - start
+
+    client = Client()
+    urls = view_urls(catalog, random.Random(arguments.seed), arguments.requests)
+    views = {}
+    for view_name, urls_of_view in urls.items():
+        views[view_name] = {
+            'cold': measure_view(client, urls_of_view, clear_cache=True),
+            'warm': measure_view(client, urls_of_view, clear_cache=False),
+        }
+    return {
+        'recipes': recipe_count,
+        'ingredients': ingredient_count,
+        'generate_s': generate_seconds,
+        'search_index_build_s': index_seconds,
+        'views': views,
+    }
+
+
+def current_commit():
+    """
+    @return: hash of the checked out commit or None outside of a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='amounts of recipes in benchmarked catalogs')
+    parser.add_argument('--ingredients-ratio', type=float, default=0.5,
+                        help='amount of ingredients in the catalog per recipe in it')
+    parser.add_argument('--requests', type=int, default=50, help='amount of requests per view')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write JSON results to instead of printing them')
+    arguments = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        sizes = [benchmark_size(size, max(int(size * arguments.ingredients_ratio), 1), arguments)
+                 for size in arguments.sizes]
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    result = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'seed': arguments.seed,
+        'requests': arguments.requests,
+        'sizes': sizes,
+    }
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
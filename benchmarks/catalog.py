@@ -0,0 +1,96 @@
+"""
+Seeded generator of a synthetic recipe catalog for benchmarks
+"""
+import random
+from collections import namedtuple
+
+from django.utils.text import slugify
+
+from Recipes import search
+from Recipes.cards import rebuild_recipe_cards
+from Recipes.models import (Recipe, Ingredient, RecipeCategory, RecipeIngredient, RecipeImage, IngredientImage,
+                            CATEGORY_CHOICES, MEASURE_CHOICES)
+
+SYLLABLES = ('ow', 'sian', 'ka', 'pla', 'cki', 'zu', 'pa', 'krem', 'sa', 'łat', 'go', 'lasz', 'cia', 'sto',
+             'dy', 'nio', 'wa', 'cze', 'ko', 'la', 'jabł', 'ko', 'we', 'so', 'cze', 'wi', 'ca', 'to', 'fu', 'mi')
+
+AMOUNTS = (0.25, 0.33, 0.5, 0.67, 0.75, 1, 1.5, 2, 3, 5, 100, 250)
+
+VOCABULARY_SIZE = 5000
+
+BATCH_SIZE = 5000
+
+Catalog = namedtuple('Catalog', ('recipe_slugs', 'ingredient_slugs', 'category_keys', 'words'))
+
+
+def make_vocabulary(generator, size):
+    """
+    Builds a vocabulary of random Polish sounding words
+    """
+    vocabulary = set()
+    while len(vocabulary) < size:
+        vocabulary.add(''.join(generator.choices(SYLLABLES, k=generator.randint(2, 4))))
+    return sorted(vocabulary)
+
+
+def generate_catalog(recipe_count, ingredient_count, seed=0, ingredients_per_recipe=8, images_per_recipe=2):
+    """
+    Fills the database with recipes, ingredients, categories, links between them and picture rows; the same seed
+    always gives the same catalog. Signals are bypassed by bulk inserts, so recipe cards are rebuilt and the search
+    index is dropped at the end
+
+    @param recipe_count: amount of recipes
+    @param ingredient_count: amount of ingredients, every tenth of them searchable
+    @param seed: seed of the random generator
+    @param ingredients_per_recipe: amount of ingredients linked with every recipe
+    @param images_per_recipe: amount of pictures of every recipe
+    @return: Catalog with slugs, category keys and vocabulary to build requests from
+    """
+    generator = random.Random(seed)
+    words = make_vocabulary(generator, VOCABULARY_SIZE)
+
+    recipes = []
+    for number in range(recipe_count):
+        name = f'{" ".join(generator.sample(words, 3))} {number}'
+        recipes.append(Recipe(name=name, slug=slugify(name), has_servings=True, servings=generator.randint(1, 4),
+                              prep_time=generator.randint(5, 120),
+                              meal_description=' '.join(generator.choices(words, k=8)),
+                              prep_instructions=' '.join(generator.choices(words, k=40))))
+    recipes = Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+
+    ingredients = []
+    for number in range(ingredient_count):
+        name = f'{generator.choice(words)} {number}'
+        ingredients.append(Ingredient(name=name, slug=slugify(name), name_one=name, name_two=name, name_five=name,
+                                      name_half=name, is_searchable=number % 10 == 0,
+                                      ingredient_description=' '.join(generator.choices(words, k=20))))
+    ingredients = Ingredient.objects.bulk_create(ingredients, batch_size=BATCH_SIZE)
+
+    categories = RecipeCategory.objects.bulk_create([RecipeCategory(name=key) for key, _ in CATEGORY_CHOICES])
+    memberships = [RecipeCategory.recipe.through(recipecategory_id=category.pk, recipe_id=recipe.pk)
+                   for recipe in recipes
+                   for category in generator.sample(categories, generator.randint(1, 2))]
+    RecipeCategory.recipe.through.objects.bulk_create(memberships, batch_size=BATCH_SIZE)
+
+    measures = [key for key, _ in MEASURE_CHOICES]
+    links = [RecipeIngredient(recipe_id=recipe.pk, ingredient_id=ingredient.pk, measure=generator.choice(measures),
+                              amount=generator.choice(AMOUNTS))
+             for recipe in recipes
+             for ingredient in generator.sample(ingredients, min(ingredients_per_recipe, len(ingredients)))]
+    RecipeIngredient.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+    RecipeImage.objects.bulk_create([RecipeImage(recipe_id=recipe.pk, image=f'recipe/bench-{recipe.pk}-{number}.jpg')
+                                     for recipe in recipes for number in range(images_per_recipe)],
+                                    batch_size=BATCH_SIZE)
+    IngredientImage.objects.bulk_create([IngredientImage(ingredient_id=ingredient.pk,
+                                                         image=f'ingredient/bench-{ingredient.pk}.jpg')
+                                         for ingredient in ingredients], batch_size=BATCH_SIZE)
+
+    rebuild_recipe_cards()
+    search.reset_search_index()
+    return Catalog(
+        recipe_slugs=[recipe.slug for recipe in recipes],
+        ingredient_slugs=[ingredient.slug for ingredient in ingredients],
+        category_keys=[key for key, _ in CATEGORY_CHOICES],
+        words=words,
+    )
@@ -1,8 +1,242 @@
-$(document).ready(function(){
-    $('nav #top-menu li').hover(function(e){
-        //$('#drop' , this).css('display','block');
-        $(this).children('ul').delay(50).slideDown(500);
-    }, function(){
-        $(this).children('ul').delay(50).slideUp(500);
+// Slides submenus of the top menu down while the pointer is over their item and back up when it leaves
+(function () {
+    var SLIDE_DELAY = 50;
+    var SLIDE_DURATION = 500;
+
+    function slide(menu, open) {
+        clearTimeout(menu.slideTimeout);
+        menu.slideTimeout = setTimeout(function () {
+            var height = menu.offsetHeight;
+            if (menu.slideAnimation) {
+                menu.slideAnimation.cancel();
+            }
+            menu.style.display = 'block';
+            var fullHeight = menu.scrollHeight;
+            var targetHeight = open ? fullHeight : 0;
+            function finish() {
+                menu.slideAnimation = null;
+                menu.style.overflow = '';
+                menu.style.display = open ? 'block' : '';
+            }
+            if (!menu.animate || height === targetHeight) {
+                finish();
+                return;
+            }
+            menu.style.overflow = 'hidden';
+            menu.slideAnimation = menu.animate(
+                [{height: height + 'px'}, {height: targetHeight + 'px'}],
+                {duration: SLIDE_DURATION * Math.abs(targetHeight - height) / fullHeight, easing: 'ease'}
+            );
+            menu.slideAnimation.onfinish = finish;
+        }, SLIDE_DELAY);
+    }
+
+    document.querySelectorAll('nav #top-menu li').forEach(function (item) {
+        var menus = Array.prototype.filter.call(item.children, function (child) {
+            return child.tagName === 'UL';
+        });
+        if (!menus.length) {
+            return;
+        }
+        item.addEventListener('mouseenter', function () {
+            menus.forEach(function (menu) {
+                slide(menu, true);
+            });
+        });
+        item.addEventListener('mouseleave', function () {
+            menus.forEach(function (menu) {
+                slide(menu, false);
+            });
+        });
     });
-});
+})();
+
+// Suggests names of recipes and ingredients while typing in the search form
+(function () {
+    var input = document.querySelector('#search-form input[data-suggestions-url]');
+    if (!input || !window.fetch) {
+        return;
+    }
+    var list = document.getElementById(input.getAttribute('list'));
+    var requested = null;
+    input.addEventListener('input', function () {
+        var query = input.value;
+        requested = query;
+        if (!query.trim()) {
+            list.textContent = '';
+            return;
+        }
+        fetch(input.dataset.suggestionsUrl + '?q=' + encodeURIComponent(query))
+            .then(function (response) {
+                return response.ok ? response.json() : {suggestions: []};
+            })
+            .then(function (data) {
+                if (query !== requested) {
+                    return;
+                }
+                list.textContent = '';
+                data.suggestions.forEach(function (suggestion) {
+                    var option = document.createElement('option');
+                    option.value = suggestion.name;
+                    list.appendChild(option);
+                });
+            })
+            .catch(function () {});
+    });
+})();
+
+// Recalculates recipe ingredients for another amount of servings without reloading the page;
+// mirrors Recipes/scaling.py and keeps the url in step with the shown amount, the form keeps working as a fallback
+// when the script does not run
+(function () {
+    var recipe = document.querySelector('section.recipe[data-scaling-url]');
+    if (!recipe) {
+        return;
+    }
+    var form = recipe.querySelector('.recalculate form');
+    var servingsMultiplier = parseInt(recipe.dataset.servingsMultiplier, 10);
+    var scalingData = null;
+
+    function grammarForm(amount) {
+        if (amount === 1) {
+            return 1;
+        } else if (amount === 2 || amount === 3 || amount === 4) {
+            return 2;
+        } else if (amount >= 5 && amount % 1 === 0) {
+            return 5;
+        }
+        return 0;
+    }
+
+    function closestFraction(value) {
+        var fractions = scalingData.accepted_fractions;
+        var closest = fractions[0];
+        for (var i = 1; i < fractions.length; i++) {
+            if (Math.abs(fractions[i] - value) < Math.abs(closest - value)) {
+                closest = fractions[i];
+            }
+        }
+        return closest;
+    }
+
+    function renderAmount(ingredient) {
+        var measure = ingredient.measure;
+        var amount = ingredient.amount * servingsMultiplier;
+        var words = [];
+        if (measure !== 4 && measure !== 6) {
+            var fractionalPart = amount % 1;
+            var fraction = closestFraction(fractionalPart);
+            var fractionDisplay = fraction !== 0 ? scalingData.fractions_display[String(fraction)] : null;
+            if (amount >= 1) {
+                words.push(String(Math.trunc(amount - fractionalPart)));
+                if (fractionDisplay) {
+                    words.push('i', fractionDisplay);
+                }
+            } else if (fractionDisplay) {
+                words.push(fractionDisplay);
+            }
+        }
+        var grammar = scalingData.measure_grammar[measure];
+        var names = ingredient.names;
+        var ingredientName = names[3];
+        if (measure === 7) {
+            ingredientName = {1: names[0], 2: names[1], 5: names[2], 0: names[3]}[grammarForm(amount)];
+        } else if (measure === 4) {
+            words.push(grammar[1]);
+        } else if (measure === 6) {
+            words.push(grammar[0]);
+            ingredientName = names[0];
+        } else {
+            words.push(grammar[grammarForm(amount)]);
+        }
+        return {text: words.join(' '), ingredientName: ingredientName};
+    }
+
+    function render() {
+        var portions = scalingData.servings * servingsMultiplier;
+        recipe.querySelector('.dynamic-portions').textContent = portions;
+        recipe.querySelector('.portions-grammar-name').textContent =
+            scalingData.portion_grammar[grammarForm(portions)];
+        var list = recipe.querySelector('.recipe-ingredients');
+        list.textContent = '';
+        scalingData.ingredients.forEach(function (ingredient) {
+            var rendered = renderAmount(ingredient);
+            var item = document.createElement('li');
+            var paragraph = document.createElement('p');
+            var icon = document.createElement('i');
+            icon.className = 'fas fa-seedling';
+            paragraph.appendChild(icon);
+            paragraph.appendChild(document.createTextNode(' ' + rendered.text + ' '));
+            if (ingredient.slug) {
+                var link = document.createElement('a');
+                link.href = '/skladnik/' + ingredient.slug + '/';
+                link.textContent = rendered.ingredientName;
+                paragraph.appendChild(link);
+            } else {
+                paragraph.appendChild(document.createTextNode(rendered.ingredientName));
+            }
+            item.appendChild(paragraph);
+            list.appendChild(item);
+        });
+        var multipliers = scalingData.servings_multipliers;
+        form.querySelector('button[data-modify-servings="more"]').value =
+            Math.min(servingsMultiplier + 1, multipliers[multipliers.length - 1]);
+        form.querySelector('button[data-modify-servings="less"]').value =
+            Math.max(servingsMultiplier - 1, multipliers[0]);
+        if (window.history.replaceState) {
+            var url = new URL(window.location.href);
+            if (servingsMultiplier === 1) {
+                url.searchParams.delete('porcje');
+            } else {
+                url.searchParams.set('porcje', servingsMultiplier);
+            }
+            window.history.replaceState(null, '', url);
+        }
+    }
+
+    function recalculate(modifier) {
+        var multipliers = scalingData.servings_multipliers;
+        if (modifier === 'more' && servingsMultiplier < multipliers[multipliers.length - 1]) {
+            servingsMultiplier += 1;
+        } else if (modifier === 'less' && servingsMultiplier > multipliers[0]) {
+            servingsMultiplier -= 1;
+        } else {
+            return;
+        }
+        render();
+    }
+
+    if (!form || !window.fetch) {
+        return;
+    }
+    form.addEventListener('click', function (event) {
+        var button = event.target.closest('button[data-modify-servings]');
+        if (!button) {
+            return;
+        }
+        event.preventDefault();
+        if (scalingData) {
+            recalculate(button.dataset.modifyServings);
+            return;
+        }
+        fetch(recipe.dataset.scalingUrl)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                scalingData = data;
+                recalculate(button.dataset.modifyServings);
+            })
+            .catch(function () {
+                var servings = document.createElement('input');
+                servings.type = 'hidden';
+                servings.name = button.name;
+                servings.value = button.value;
+                form.appendChild(servings);
+                form.submit();
+            });
+    });
+})();
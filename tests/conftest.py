@@ -1,11 +1,43 @@
 from Recipes.models import Recipe, Ingredient, RecipeCategory, User
+from Recipes import autocomplete, pantry, search, slugs
 
 from django.contrib.auth.models import Permission
-from django.test import Client
+from django.core.cache import cache
+from django.test import Client, override_settings
 
 import pytest
 
 
+@pytest.fixture(scope='session', autouse=True)
+def plain_static_files(django_test_environment):
+    """
+    Links static files by their source names so that templates render without running collectstatic first
+    """
+    with override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def reset_in_memory_indexes():
+    """
+    Drops process wide indexes, cached slugs and cached pages so that every test builds them from its own database state
+    """
+    search.reset_search_index()
+    autocomplete.reset_autocomplete_index()
+    pantry.reset_pantry_index()
+    slugs.reset_slug_cache()
+    cache.clear()
+    yield
+    search.reset_search_index()
+    autocomplete.reset_autocomplete_index()
+    pantry.reset_pantry_index()
+    slugs.reset_slug_cache()
+    cache.clear()
+
+
 @pytest.fixture
 def client():
     """
@@ -1,7 +1,33 @@
+import gzip
+import json
+import logging
+import time
+from io import StringIO
+
 import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command, CommandError
+from django.db import IntegrityError, transaction
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.template.base import Template
+from django.test import AsyncClient, Client, AsyncRequestFactory, RequestFactory
+from django.utils import timezone
+from django.utils.http import http_date
 
-from Recipes.models import Recipe, Ingredient, RecipeCategory
-from Recipes.views import CATEGORIES_PL
+from Recipes import async_views, autocomplete, page_cache, pantry, search
+from Recipes.static_assets import STATIC_MAX_AGE
+from Recipes.static_site import render_page
+from Recipes.models import (Recipe, Ingredient, RecipeCategory, RecipeIngredient, RecipeImage, RecipeCard,
+                            IngredientRecipe, IngredientImage, CategoryRecipe)
+from Recipes.views import CATEGORIES_PL, RECIPE_DETAILS_QUERIES, StaticFileView
+from Recipes.scaling import render_ingredient_amount, scale_ingredient, find_closest_fraction
+from Recipes.process_index import ProcessIndex
+from Recipes.profiling import profiled_template_render
+from Recipes.slugs import assign_unique_slugs, reset_slug_cache
+from Vegelastic_recipes.database import persistent_databases
+from Vegelastic_recipes.sessions import session_engine
 
 
 def test_index(client):
@@ -69,9 +95,231 @@ def test_recipe(get_recipe, client):
     assert response_get.status_code == 200
     assert response_get.context['recipe'] == test_recipe
 
-    response_post = client.post(f'/przepis/{test_recipe.slug}/')
-    assert response_post.status_code == 200
-    assert response_post.context['recipe'] == test_recipe
+    response_post = client.post(f'/przepis/{test_recipe.slug}/', {'modify_servings': 'more'})
+    assert response_post.status_code == 302
+    assert client.get(response_post['Location']).context['servings_multiplier'] == 2
+
+
+@pytest.mark.django_db
+def test_recipe_query_count(get_recipe, client, django_assert_num_queries):
+    """
+    Checks that recipe page is rendered in a fixed number of queries regardless of the amount of ingredients
+
+    @param get_recipe: test recipe from get_recipe pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    """
+    for number in range(5):
+        ingredient = Ingredient.objects.create(name=f'test ingredient {number}', name_one='jeden', name_two='dwa',
+                                               name_five='pięć', name_half='pół')
+        RecipeIngredient.objects.create(recipe=get_recipe, ingredient=ingredient, measure=number % 7 + 1, amount=1.5)
+    RecipeImage.objects.create(recipe=get_recipe, image='recipe/owsianka.jpg')
+
+    with django_assert_num_queries(RECIPE_DETAILS_QUERIES):
+        response_get = client.get(f'/przepis/{get_recipe.slug}/')
+    assert response_get.status_code == 200
+    assert len(response_get.context['recipe_ingredients_data']) == 5
+    assert response_get.context['recipe_image'].image == 'recipe/owsianka.jpg'
+
+    with django_assert_num_queries(RECIPE_DETAILS_QUERIES):
+        response_get = client.get(f'/przepis/{get_recipe.slug}/?porcje=2')
+    assert response_get.status_code == 200
+
+
+@pytest.mark.django_db
+def test_servings_url(get_recipe, get_user, client, settings):
+    """
+    Checks that the servings multiplier is read from the url, that other urls of the same page and links from
+    browsers with the legacy cookie are redirected to the canonical one, and that only anonymous pages are public
+
+    @param get_recipe: test recipe from get_recipe pytest fixture
+    @param get_user: test user from get_user pytest fixture
+    @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    """
+    url = f'/przepis/{get_recipe.slug}/'
+    response = client.get(f'{url}?porcje=3')
+    assert response.context['servings_multiplier'] == 3
+    assert (response.context['more_servings_multiplier'], response.context['less_servings_multiplier']) == (4, 2)
+    assert response['Cache-Control'] == f'public, max-age=0, s-maxage={settings.RECIPE_SHARED_MAX_AGE}'
+    assert not response.cookies
+    client.cookies['csrftoken'] = 'x' * 32
+    assert 'Cookie' not in client.get(f'{url}?porcje=3').get('Vary', '')
+    assert client.get(f'{url}?porcje=3', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+    redirects = (('?porcje=1', url), ('?porcje=9', url), ('?porcje=x', url), ('?porcje=03', f'{url}?porcje=3'))
+    for query, location in redirects:
+        response = client.get(f'{url}{query}')
+        assert response.status_code == 302 and response['Location'] == location
+
+    client.cookies['servings_multiplier'] = '4'
+    response = client.get(url)
+    assert response['Location'] == f'{url}?porcje=4' and 'no-cache' in response['Cache-Control']
+    assert response.cookies['servings_multiplier'].value == ''
+    assert client.get(url).status_code == 200
+
+    client.force_login(get_user)
+    response = client.get(url)
+    assert 'public' not in response['Cache-Control'] and 'no-cache' in response['Cache-Control']
+    assert 'private' in response['Cache-Control'] and 'Cookie' in response['Vary']
+    settings.RECIPE_SHARED_MAX_AGE = None
+    client.logout()
+    assert 'public' not in client.get(url)['Cache-Control']
+
+
+@pytest.mark.django_db
+def test_anonymous_fast_path(get_recipe, get_user, client, settings):
+    """
+    Checks that anonymous reads go without a session and a user looked up from it, while signed in users, writes and
+    other pages keep the regular middleware with any session engine
+
+    @param get_recipe: test recipe from get_recipe pytest fixture
+    @param get_user: test user from get_user pytest fixture
+    @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    """
+    url = f'/przepis/{get_recipe.slug}/'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert not hasattr(response.wsgi_request, 'session') and not response.wsgi_request.user.is_authenticated
+    assert hasattr(client.get('/spizarnia/').wsgi_request, 'session')
+    assert hasattr(client.post('/szukaj/', {'searched': 'test'}).wsgi_request, 'session')
+
+    settings.ANONYMOUS_FAST_PATH = False
+    assert hasattr(client.get(url).wsgi_request, 'session')
+
+    settings.ANONYMOUS_FAST_PATH = True
+    settings.SESSION_ENGINE = session_engine('signed_cookies')
+    signed_client = Client()
+    signed_client.force_login(get_user)
+    response = signed_client.get(url)
+    assert response.wsgi_request.user == get_user and get_user.username in response.content.decode()
+    with pytest.raises(ImproperlyConfigured):
+        session_engine('files')
+
+
+def test_scaling():
+    """
+    Checks that ingredient amounts are recalculated with correct fractions and grammar for every multiplier
+    """
+    names = ('cebula', 'cebule', 'cebul', 'cebuli')
+    assert find_closest_fraction(0.29000000000000004) == 0.33
+    assert find_closest_fraction(0.9) == 0.75
+
+    tablespoons = render_ingredient_amount(0.5, 2, names, 3)
+    assert (tablespoons.decimal, tablespoons.fraction, tablespoons.measure_name) == ('1', '1/2', 'łyżki')
+
+    scaling = scale_ingredient(1.0, 7, names, (1, 2, 3, 4, 5))
+    assert [scaling[multiplier].ingredient_name for multiplier in (1, 2, 5)] == ['cebula', 'cebule', 'cebul']
+    assert not scaling[1].requires_measure_name
+
+    pinch = render_ingredient_amount(1.0, 4, names, 2)
+    assert not pinch.requires_display
+    assert (pinch.measure_name, pinch.ingredient_name) == ('szczypta', 'cebuli')
+
+
+@pytest.mark.django_db
+def test_recipe_page_cache(get_recipe, get_ingredient, client, django_assert_num_queries):
+    """
+    Checks that recipe pages are served from the cache per servings multiplier and dropped when the recipe or its
+    ingredients change
+
+    @param get_recipe: test recipe from get_recipe pytest fixture
+    @param get_ingredient: test ingredient from get_ingredient pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    """
+    RecipeIngredient.objects.create(recipe=get_recipe, ingredient=get_ingredient, measure=2, amount=1)
+    url = f'/przepis/{get_recipe.slug}/'
+
+    client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert 'łyżka' in response.content.decode()
+    assert client.get('/statystyki/cache/').json() == {'hits': 1, 'misses': 1}
+
+    response = client.get(f'{url}?porcje=2')
+    assert 'łyżki' in response.content.decode()
+
+    get_ingredient.name_half = 'zmieniony składnik'
+    get_ingredient.save()
+    with django_assert_num_queries(RECIPE_DETAILS_QUERIES):
+        response = client.get(url)
+    assert 'zmieniony składnik' in response.content.decode()
+
+    get_recipe.name = 'renamed recipe'
+    get_recipe.save()
+    assert client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_recipe_validators_after_slug_cache_miss(get_recipe, client, django_assert_num_queries):
+    """
+    Checks that a process which missed a change of a recipe takes its validators from the database, not from a page
+    cached before the change, and renders the page again
+
+    @param get_recipe: test recipe from get_recipe pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    """
+    url = f'/przepis/{get_recipe.slug}/'
+    etag = client.get(url)['ETag']
+    Recipe.objects.filter(pk=get_recipe.pk).update(meal_description='nowy opis',
+                                                   updated_on=timezone.now() + timezone.timedelta(minutes=1))
+    reset_slug_cache()
+    with django_assert_num_queries(1 + RECIPE_DETAILS_QUERIES):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response['ETag'] != etag
+    assert 'nowy opis' in response.content.decode()
+    reset_slug_cache()
+    with django_assert_num_queries(1):
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+
+def test_recipe_page_cache_expiry(settings, monkeypatch):
+    """
+    Checks that a cached recipe page expires after RECIPE_PAGE_CACHE_TIMEOUT, so that processes which never saw the
+    recipe change stop serving it
+
+    @param settings: settings fixture from pytest-django
+    @param monkeypatch: monkeypatch pytest fixture
+    """
+    settings.CACHES = {'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'}}
+    settings.RECIPE_PAGE_CACHE_ALIAS = 'pages'
+    settings.RECIPE_PAGE_CACHE_TIMEOUT = 60
+    page_cache.set_recipe_page('owsianka', 1, {'recipe_ingredients': ''})
+    assert page_cache.get_recipe_page('owsianka', 1) == {'recipe_ingredients': ''}
+
+    stored_at = time.time()
+    monkeypatch.setattr(time, 'time', lambda: stored_at + 61)
+    assert page_cache.get_recipe_page('owsianka', 1) is None
+
+
+@pytest.mark.django_db
+def test_recipe_scaling_data(get_recipe, client):
+    """
+    Checks that the recipe scaling endpoint returns base amounts and grammar tables as JSON
+
+    @param get_recipe: test recipe from get_recipe pytest fixture
+    @param client: client from client pytest fixture
+    """
+    ingredient = Ingredient.objects.create(name='cebula', name_one='cebula', name_two='cebule', name_five='cebul',
+                                           name_half='cebuli', is_searchable=True)
+    RecipeIngredient.objects.create(recipe=get_recipe, ingredient=ingredient, measure=7, amount=2)
+
+    response = client.get(f'/przepis/{get_recipe.slug}/skalowanie/')
+    assert response.status_code == 200
+    scaling_data = response.json()
+    assert scaling_data['servings'] == 1
+    assert scaling_data['servings_multipliers'] == [1, 2, 3, 4, 5]
+    assert scaling_data['measure_grammar']['2']['5'] == 'łyżek'
+    assert scaling_data['fractions_display']['0.5'] == '1/2'
+    assert scaling_data['ingredients'] == [{
+        'amount': 2.0,
+        'measure': 7,
+        'names': ['cebula', 'cebule', 'cebul', 'cebuli'],
+        'slug': 'cebula',
+    }]
 
 
 @pytest.mark.django_db
@@ -89,15 +337,237 @@ def test_ingredient(get_ingredient, client):
     assert response.context['ingredient'] == test_ingredient
 
 
-def test_categories(client):
+@pytest.mark.django_db
+def test_ingredient_recipes(get_ingredient, client, settings, django_assert_num_queries):
     """
-    Checks that categories page loads successfully
+    Checks that ingredient page lists recipes using it from the reverse index with the same amount of queries on every
+    page and that the index follows changed recipes, pictures and ingredient links
 
+    @param get_ingredient: test ingredient from get_ingredient pytest fixture
     @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    @param django_assert_num_queries: query counter from pytest-django
     """
-    response = client.get('/kategorie/')
+    settings.LISTING_PAGE_SIZE = 2
+    recipes = []
+    for number in range(5):
+        recipe = Recipe.objects.create(name=f'test recipe {number}', has_servings=True, servings=1, prep_time=10)
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=get_ingredient, measure=5, amount=100)
+        recipes.append(recipe)
+    RecipeIngredient.objects.create(recipe=recipes[0], ingredient=get_ingredient, measure=1, amount=1)
+
+    with django_assert_num_queries(3):
+        response = client.get(f'/skladnik/{get_ingredient.slug}/')
+    page = response.context['ingredient_recipes']
+    assert [entry.name for entry in page] == ['test recipe 0', 'test recipe 1']
+    with django_assert_num_queries(3):
+        response = client.get(f'/skladnik/{get_ingredient.slug}/?{page.next_query}')
+    assert [entry.name for entry in response.context['ingredient_recipes']] == ['test recipe 2', 'test recipe 3']
+
+    recipes[0].name = 'zupa'
+    recipes[0].save()
+    RecipeImage.objects.create(recipe=recipes[0], image='recipe/zupa.jpg')
+    RecipeIngredient.objects.filter(recipe=recipes[1]).delete()
+    recipes[2].delete()
+    entries = list(IngredientRecipe.objects.filter(ingredient=get_ingredient).order_by('name'))
+    assert [(entry.name, entry.slug, entry.lead_image) for entry in entries] == [
+        ('test recipe 3', 'test-recipe-3', ''),
+        ('test recipe 4', 'test-recipe-4', ''),
+        ('zupa', 'zupa', 'recipe/zupa.jpg'),
+    ]
+
+    assert client.get('/skladnik/missing/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_pantry(client, django_capture_on_commit_callbacks):
+    """
+    Checks that recipes are ranked by how many of their ingredients are covered by owned ingredients and that the
+    pantry index follows changed ingredient links and deleted recipes once their transaction commits and is rebuilt
+    after changes made by other processes
+
+    @param client: client from client pytest fixture
+    @param django_capture_on_commit_callbacks: runner of on commit callbacks from pytest-django
+    """
+    oats, milk, banana = [Ingredient.objects.create(name=name, name_one=name, name_two=name, name_five=name,
+                                                    name_half=name) for name in ('owies', 'mleko', 'banan')]
+    porridge = Recipe.objects.create(name='owsianka', has_servings=True, servings=1, prep_time=10)
+    smoothie = Recipe.objects.create(name='koktajl', has_servings=True, servings=1, prep_time=5)
+    banana_bread = Recipe.objects.create(name='chlebek bananowy', has_servings=True, servings=1, prep_time=60)
+    for recipe, ingredients in ((porridge, (oats, milk)), (smoothie, (oats, milk, banana)), (banana_bread, (banana,))):
+        for ingredient in ingredients:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, measure=3, amount=1)
+
+    response = client.get('/spizarnia/', {'skladnik': ['owies', 'mleko']})
+    assert response.status_code == 200
+    assert [(pantry_recipe['recipe'].pk, pantry_recipe['covered'], pantry_recipe['required'])
+            for pantry_recipe in response.context['pantry_recipes']] == [(porridge.pk, 2, 2), (smoothie.pk, 2, 3)]
+    assert response.context['pantry_recipes'][1]['missing'] == ['banan']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RecipeIngredient.objects.create(recipe=porridge, ingredient=banana, measure=7, amount=1)
+        smoothie.delete()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            RecipeIngredient.objects.create(recipe=banana_bread, ingredient=oats, measure=7, amount=1)
+            raise IntegrityError
+    assert pantry.get_pantry_index().recipe_ingredients(porridge.pk) == {oats.pk, milk.pk, banana.pk}
+    assert pantry.get_pantry_index().recipe_ingredients(banana_bread.pk) == {banana.pk}
+    response = client.get('/spizarnia/wyniki/', {'skladnik': ['owies', 'banan'], 'limit': 1})
+    assert response.json() == {
+        'ingredients': ['banan', 'owies'],
+        'recipes': [{'slug': 'chlebek-bananowy', 'name': 'chlebek bananowy', 'lead_image': '', 'covered': 1,
+                     'required': 1, 'missing': []}],
+    }
+    response = client.get('/spizarnia/wyniki/', {'skladnik': ['owies', 'banan']})
+    assert [recipe['slug'] for recipe in response.json()['recipes']] == ['chlebek-bananowy', 'owsianka']
+    assert response.json()['recipes'][1]['missing'] == ['mleko']
+
+    RecipeIngredient.objects.bulk_create([RecipeIngredient(recipe=banana_bread, ingredient=milk, measure=7, amount=1)])
+    ProcessIndex('pantry', pantry.build_pantry_index).update(lambda index: None)
+    assert pantry.get_pantry_index().recipe_ingredients(banana_bread.pk) == {banana.pk, milk.pk}
+
+
+@pytest.mark.django_db
+def test_catalog_transfer(get_category, tmp_path):
+    """
+    Checks that the exported catalog imports back into an empty database unchanged, that importing it again changes
+    nothing and that an import continues from its checkpoint
+
+    @param get_category: test category from get_category pytest fixture
+    @param tmp_path: temporary directory for exported files
+    """
+    oats = Ingredient.objects.create(name='płatki owsiane', name_one='płatek', name_two='płatki', name_five='płatków',
+                                     name_half='płatków', is_searchable=True)
+    IngredientImage.objects.create(ingredient=oats, image='ingredient/oat-flakes.jpg')
+    milk = Ingredient.objects.create(name='mleko', name_one='mleko', name_two='mleka', name_five='mleka',
+                                     name_half='mleka')
+    porridge = Recipe.objects.create(name='owsianka', has_servings=True, servings=2, prep_time=10)
+    RecipeIngredient.objects.create(recipe=porridge, ingredient=oats, measure=3, amount=1)
+    RecipeIngredient.objects.create(recipe=porridge, ingredient=milk, measure=3, amount=2)
+    RecipeIngredient.objects.create(recipe=porridge, ingredient=oats, measure=2, amount=0.5)
+    RecipeImage.objects.create(recipe=porridge, image='recipe/owsianka.jpg')
+    get_category.recipe.add(porridge)
+    Recipe.objects.create(name='herbata', has_servings=False)
+
+    exported = StringIO()
+    call_command('export_catalog', stdout=exported, batch_size=1)
+    lines = exported.getvalue().splitlines()
+    assert [json.loads(line)['type'] for line in lines] == ['ingredient', 'ingredient', 'recipe', 'recipe']
+    catalog_path = tmp_path / 'catalog.jsonl'
+    catalog_path.write_text(exported.getvalue(), encoding='utf-8')
+
+    autocomplete.get_autocomplete_index()
+    Recipe.objects.all().delete()
+    Ingredient.objects.all().delete()
+    call_command('import_catalog', str(catalog_path), stdout=StringIO())
+    assert 'owsianka' in [name for _, name, _ in autocomplete.get_autocomplete_index().suggest('owsianka')]
+    reexported = StringIO()
+    call_command('export_catalog', stdout=reexported)
+    assert reexported.getvalue() == exported.getvalue()
+    assert RecipeCard.objects.get(slug='owsianka').lead_image == 'recipe/owsianka.jpg'
+    assert IngredientRecipe.objects.filter(slug='owsianka').count() == 2
+
+    call_command('import_catalog', str(catalog_path), stdout=StringIO())
+    reexported = StringIO()
+    call_command('export_catalog', stdout=reexported)
+    assert reexported.getvalue() == exported.getvalue()
+
+    checkpoint_path = tmp_path / 'catalog.jsonl.checkpoint'
+    checkpoint_path.write_text(json.dumps({'line': 3}))
+    output = StringIO()
+    call_command('import_catalog', str(catalog_path), stdout=output)
+    assert 'Imported 0 ingredients and 1 recipes' in output.getvalue()
+    assert not checkpoint_path.exists()
+
+    broken_path = tmp_path / 'broken.jsonl'
+    broken_path.write_text(json.dumps({'type': 'recipe', 'name': 'zupa', 'has_servings': False,
+                                       'ingredients': [{'ingredient': 'sól', 'measure': 6, 'amount': 1}]}))
+    with pytest.raises(CommandError, match='line 1: unknown ingredient'):
+        call_command('import_catalog', str(broken_path), stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_export_static_site(get_category, client, settings, tmp_path):
+    """
+    Checks that the catalog is exported as static pages, that a repeated export renders changed recipes and
+    ingredients only, that pages of deleted recipes are removed and that listings are exported without links to their
+    further pages
+
+    @param get_category: test category from get_category pytest fixture
+    @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    @param tmp_path: temporary directory from tmp_path pytest fixture
+    """
+    oats = Ingredient.objects.create(name='płatki owsiane', name_one='płatek', name_two='płatki', name_five='płatków',
+                                     name_half='płatków', is_searchable=True)
+    Ingredient.objects.create(name='mleko', name_one='mleko', name_two='mleka', name_five='mleka', name_half='mleka')
+    porridge = Recipe.objects.create(name='owsianka', has_servings=True, servings=2, prep_time=10)
+    RecipeIngredient.objects.create(recipe=porridge, ingredient=oats, measure=2, amount=1)
+    get_category.recipe.add(porridge)
+
+    output = StringIO()
+    call_command('export_static_site', str(tmp_path), workers=0, stdout=output)
+    assert 'Exported 13 pages' in output.getvalue()
+    assert sorted(path.name for path in (tmp_path / 'przepis' / 'owsianka').iterdir()) == [
+        'index.html', 'porcje-2.html', 'porcje-3.html', 'porcje-4.html', 'porcje-5.html']
+    assert 'łyżka' in (tmp_path / 'przepis' / 'owsianka' / 'index.html').read_text(encoding='utf-8')
+    assert 'łyżki' in (tmp_path / 'przepis' / 'owsianka' / 'porcje-2.html').read_text(encoding='utf-8')
+    assert 'owsianka' in (tmp_path / 'skladnik' / oats.slug / 'index.html').read_text(encoding='utf-8')
+    assert 'owsianka' in (tmp_path / 'kategoria' / str(get_category.name) / 'index.html').read_text(encoding='utf-8')
+    assert (tmp_path / 'kategorie' / 'index.html').exists() and not (tmp_path / 'skladnik' / 'mleko').exists()
+    assert 'csrfmiddlewaretoken' not in (tmp_path / 'przepis' / 'owsianka' / 'index.html').read_text(encoding='utf-8')
+
+    output = StringIO()
+    call_command('export_static_site', str(tmp_path), workers=0, stdout=output)
+    assert 'Exported 7 pages' in output.getvalue()
+
+    porridge.delete()
+    output = StringIO()
+    call_command('export_static_site', str(tmp_path), workers=0, stdout=output)
+    assert 'removed pages of 1 deleted recipes' in output.getvalue()
+    assert not (tmp_path / 'przepis' / 'owsianka').exists()
+    call_command('export_static_site', str(tmp_path), workers=0, full=True, stdout=output)
+    assert 'Exported 8 pages' in output.getvalue()
+
+    settings.LISTING_PAGE_SIZE = 1
+    for name in ('owsianka', 'jaglanka'):
+        get_category.recipe.add(Recipe.objects.create(name=name, has_servings=True, servings=2, prep_time=10))
+    assert 'Następna strona' in client.get(f'/kategoria/{get_category.name}/').content.decode()
+    assert 'Następna strona' not in render_page(f'/kategoria/{get_category.name}/').decode()
+
+
+@pytest.mark.django_db
+def test_categories(get_category, client, django_assert_num_queries):
+    """
+    Checks that categories page loads successfully and counts recipes in every category once in a single query,
+    also when several category rows share a name
+
+    @param get_category: test category from get_category pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    """
+    duplicate_category = RecipeCategory.objects.create(name=get_category.name)
+    for number in range(3):
+        recipe = Recipe.objects.create(name=f'test recipe {number}', has_servings=True, servings=1, prep_time=10)
+        get_category.recipe.add(recipe)
+    duplicate_category.recipe.add(recipe)
+    RecipeCategory.objects.create(name=5).recipe.add(recipe)
+
+    with django_assert_num_queries(1):
+        response = client.get('/kategorie/')
     assert response.status_code == 200
     assert response.context['categories'] == CATEGORIES_PL
+    assert response.context['category_counts'] == [(key, name, {get_category.name: 3, 5: 1}.get(key, 0))
+                                                  for key, name in CATEGORIES_PL.items()]
+
+    response = client.get(f'/kategoria/{get_category.name}/')
+    assert len(response.context['recipe_cards']) == 3
+    assert CategoryRecipe.objects.filter(category=get_category.name).count() == 3
+
+    duplicate_category.delete()
+    get_category.recipe.remove(recipe)
+    assert [(entry.category, entry.card_id) for entry in CategoryRecipe.objects.filter(card_id=recipe.pk)] == [
+        (5, recipe.pk)]
 
 
 @pytest.mark.django_db
@@ -115,6 +585,478 @@ def test_category(get_category, client):
     assert response.context['category_name'] == CATEGORIES_PL[1]
 
 
+@pytest.mark.django_db
+def test_category_lead_images(get_category, client, django_assert_num_queries):
+    """
+    Checks that category page lists cards of its recipes from newest with their first pictures in a single query
+
+    @param get_category: test category from get_category pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    """
+    lead_images = {}
+    for number in range(4):
+        recipe = Recipe.objects.create(name=f'test recipe {number}', has_servings=True, servings=1, prep_time=10)
+        get_category.recipe.add(recipe)
+        lead_images[recipe.pk] = RecipeImage.objects.create(recipe=recipe, image=f'recipe/lead-{number}.jpg')
+        RecipeImage.objects.create(recipe=recipe, image=f'recipe/other-{number}.jpg')
+
+    with django_assert_num_queries(1):
+        response = client.get(f'/kategoria/{get_category.name}/')
+    assert response.status_code == 200
+    recipe_cards = list(response.context['recipe_cards'])
+    assert [recipe_card.pk for recipe_card in recipe_cards] == sorted(lead_images, reverse=True)
+    for recipe_card in recipe_cards:
+        assert recipe_card.lead_image == lead_images[recipe_card.pk].image.name
+        assert recipe_card.category_ids == [get_category.name]
+
+    get_category.recipe.remove(recipe_cards[0].pk)
+    Recipe.objects.get(pk=recipe_cards[1].pk).delete()
+    response = client.get(f'/kategoria/{get_category.name}/')
+    assert len(response.context['recipe_cards']) == 2
+
+    RecipeCard.objects.all().delete()
+    call_command('rebuild_recipe_cards', stdout=StringIO())
+    assert RecipeCard.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_keyset_pagination(get_category, client, settings):
+    """
+    Checks that category and search listings are cut into pages walked forwards and backwards with cursors
+
+    @param get_category: test category from get_category pytest fixture
+    @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    """
+    settings.LISTING_PAGE_SIZE = 2
+    recipe_pks = []
+    for number in range(5):
+        recipe = Recipe.objects.create(name=f'placki {number}', has_servings=True, servings=1, prep_time=10)
+        get_category.recipe.add(recipe)
+        recipe_pks.append(recipe.pk)
+
+    for first_url in (f'/kategoria/{get_category.name}/', '/szukaj/?q=placki'):
+        pages = []
+        response = client.get(first_url)
+        assert response.context['page'].previous_query is None
+        while True:
+            page = response.context['page']
+            pages.append([item.pk if hasattr(item, 'pk') else item[1].pk for item in page])
+            if page.next_query is None:
+                break
+            response = client.get(f'{first_url.split("?")[0]}?{page.next_query}')
+        assert [len(items) for items in pages] == [2, 2, 1]
+        assert sorted(pk for items in pages for pk in items) == recipe_pks
+
+        response = client.get(f'{first_url.split("?")[0]}?{page.previous_query}')
+        assert [item.pk if hasattr(item, 'pk') else item[1].pk for item in response.context['page']] == pages[1]
+
+    response = client.get(f'/kategoria/{get_category.name}/?po=zepsuty')
+    assert [recipe_card.pk for recipe_card in response.context['page']] == sorted(recipe_pks, reverse=True)[:2]
+
+
+@pytest.mark.django_db
+def test_thumbnails(get_category, client, settings, tmp_path, django_capture_on_commit_callbacks):
+    """
+    Checks that uploaded pictures get WebP and JPEG thumbnails, that listings point to them, that missing ones are
+    generated on first request or by the backfill command and that pictures which cannot be decoded answer with 404
+
+    @param get_category: test category from get_category pytest fixture
+    @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    @param tmp_path: temporary media directory
+    @param django_capture_on_commit_callbacks: runner of on commit callbacks from pytest-django
+    """
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.THUMBNAIL_WORKERS = 0
+    (tmp_path / 'recipe').mkdir()
+    (tmp_path / 'recipe' / 'soy-milk.jpg').write_bytes(
+        (settings.BASE_DIR / 'media' / 'ingredient' / 'soy-milk.jpg').read_bytes())
+    recipe = Recipe.objects.create(name='test recipe', has_servings=True, servings=1, prep_time=10)
+    get_category.recipe.add(recipe)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RecipeImage.objects.create(recipe=recipe, image='recipe/soy-milk.jpg')
+    original_size = (tmp_path / 'recipe' / 'soy-milk.jpg').stat().st_size
+    for width in (320, 640):
+        for extension in ('webp', 'jpg'):
+            thumbnail = tmp_path / 'thumbnails' / str(width) / f'recipe/soy-milk.jpg.{extension}'
+            assert thumbnail.stat().st_size < original_size / (10 if width == 320 else 4)
+
+    response = client.get(f'/kategoria/{get_category.name}/')
+    content = response.content.decode()
+    assert '/thumbnails/320/recipe/soy-milk.jpg.webp 320w' in content
+    assert 'src="/thumbnails/320/recipe/soy-milk.jpg.jpg"' in content
+
+    (tmp_path / 'thumbnails' / '640' / 'recipe' / 'soy-milk.jpg.webp').unlink()
+    response = client.get('/thumbnails/640/recipe/soy-milk.jpg.webp')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'image/webp'
+    assert (tmp_path / 'thumbnails' / '640' / 'recipe' / 'soy-milk.jpg.webp').exists()
+    assert client.get('/thumbnails/100/recipe/soy-milk.jpg.webp').status_code == 404
+    assert client.get('/thumbnails/320/recipe/../recipe/soy-milk.jpg.webp').status_code == 404
+    (tmp_path / 'recipe' / 'broken.jpg').write_bytes(b'not a picture')
+    assert client.get('/thumbnails/320/recipe/broken.jpg.webp').status_code == 404
+
+    (tmp_path / 'thumbnails' / '320' / 'recipe' / 'soy-milk.jpg.jpg').unlink()
+    output = StringIO()
+    call_command('generate_thumbnails', stdout=output)
+    assert 'Generated 1 thumbnails' in output.getvalue()
+
+
+@pytest.mark.django_db
+def test_request_profiling(get_ingredient, client, settings, caplog):
+    """
+    Checks that the profiling middleware reports queries, duplicates and timings in a Server-Timing header and logs
+    slow requests with their queries, puts back the original template rendering after a request and profiles requests
+    handled asynchronously
+
+    @param get_ingredient: test ingredient from get_ingredient pytest fixture
+    @param client: client from client pytest fixture
+    @param settings: settings fixture from pytest-django
+    @param caplog: log capturing fixture from pytest
+    """
+    response = client.get(f'/skladnik/{get_ingredient.slug}/')
+    assert 'Server-Timing' not in response
+
+    settings.REQUEST_PROFILING = True
+    settings.REQUEST_PROFILING_SLOW_MS = 0
+    profiled_client = Client()
+    with caplog.at_level(logging.INFO, logger='Recipes.profiling'):
+        response = profiled_client.get(f'/skladnik/{get_ingredient.slug}/')
+    server_timing = response['Server-Timing']
+    for metric in ('sql;dur=', 'tpl;dur=', 'view;dur=', 'total;dur='):
+        assert metric in server_timing
+
+    metrics, slow_request = [json.loads(record.getMessage()) for record in caplog.records]
+    assert metrics['path'] == f'/skladnik/{get_ingredient.slug}/'
+    assert metrics['queries'] > 0
+    assert f'"{metrics["queries"]} queries' in server_timing
+    assert len(slow_request['query_list']) == metrics['queries']
+    assert Template.render is not profiled_template_render
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='Recipes.profiling'):
+        response = async_to_sync(AsyncClient().get)(f'/skladnik/{get_ingredient.slug}/')
+    async_metrics = json.loads(caplog.records[0].getMessage())
+    assert async_metrics['queries'] == metrics['queries']
+    assert f'"{metrics["queries"]} queries' in response['Server-Timing']
+    assert Template.render is not profiled_template_render
+
+
+@pytest.mark.django_db
+def test_unique_slugs(get_ingredient, client, django_assert_num_queries):
+    """
+    Checks that colliding slugs get numbers, that warm recipe pages resolve their slug without queries and that
+    unchanged recipes are answered with 304
+
+    @param get_ingredient: test ingredient from get_ingredient pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: pytest-django fixture counting database queries
+    """
+    first = Recipe.objects.create(name='Owsianka', has_servings=True, servings=1, prep_time=10)
+    second = Recipe.objects.create(name='owsianka', has_servings=True, servings=1, prep_time=10)
+    assert (first.slug, second.slug) == ('owsianka', 'owsianka-2')
+    second.prep_time = 15
+    second.save()
+    assert second.slug == 'owsianka-2'
+
+    new_ingredients = [Ingredient(name='Tofu'), Ingredient(name='tofu'), Ingredient(name='test-ingredient')]
+    assign_unique_slugs(Ingredient, new_ingredients)
+    assert [ingredient.slug for ingredient in new_ingredients] == ['tofu', 'tofu-2', 'test-ingredient-2']
+
+    assert client.get('/przepis/owsianka/').context['recipe'].pk == first.pk
+    assert client.get('/przepis/owsianka-2/').context['recipe'].pk == second.pk
+    with django_assert_num_queries(0):
+        response = client.get('/przepis/owsianka-2/')
+    assert response.status_code == 200
+
+    Recipe.objects.filter(pk=second.pk).update(updated_on=timezone.now() - timezone.timedelta(hours=1))
+    second.name = 'owsianka na mleku'
+    second.save(update_fields=['name'])
+    Recipe.objects.filter(pk=second.pk).update(updated_on=timezone.now() - timezone.timedelta(hours=1))
+    assert client.get('/przepis/owsianka-2/').status_code == 404
+    url = '/przepis/owsianka-na-mleku/'
+    last_modified = client.get(url)['Last-Modified']
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+    assert not response.cookies
+
+    RecipeIngredient.objects.create(recipe=second, ingredient=get_ingredient, measure=1, amount=1)
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 200
+    assert response['Last-Modified'] != last_modified
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp() + 60)).status_code == 304
+
+    with django_assert_num_queries(3):
+        client.get(f'/skladnik/{get_ingredient.slug}/')
+    with django_assert_num_queries(3):
+        client.get(f'/skladnik/{get_ingredient.slug}/')
+    get_ingredient.name = 'renamed ingredient'
+    get_ingredient.save()
+    assert client.get('/skladnik/test-ingredient/').status_code == 404
+    assert client.get('/skladnik/renamed-ingredient/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_conditional_get(get_ingredient, get_category, client, django_assert_num_queries):
+    """
+    Checks that recipe, ingredient and category pages are answered with 304 while the data they show is unchanged
+    and rendered again once it changes
+
+    @param get_ingredient: test ingredient from get_ingredient pytest fixture
+    @param get_category: test category from get_category pytest fixture
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: pytest-django fixture counting database queries
+    """
+    recipe = Recipe.objects.create(name='Owsianka', has_servings=True, servings=1, prep_time=10)
+    RecipeIngredient.objects.create(recipe=recipe, ingredient=get_ingredient, measure=1, amount=1)
+    image = RecipeImage.objects.create(recipe=recipe, image='recipe/owsianka.jpg')
+    get_category.recipe.add(recipe)
+
+    def revalidate(url, queries, cache_directive='no-cache'):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert cache_directive in response['Cache-Control']
+        with django_assert_num_queries(queries):
+            assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+        return response['ETag']
+
+    recipe_url = f'/przepis/{recipe.slug}/'
+    recipe_etag = revalidate(recipe_url, 0, 'public')
+    image.image = 'recipe/owsianka-2.jpg'
+    image.save()
+    assert client.get(recipe_url, HTTP_IF_NONE_MATCH=recipe_etag).status_code == 200
+
+    ingredient_url = f'/skladnik/{get_ingredient.slug}/'
+    ingredient_etag = revalidate(ingredient_url, 0)
+    recipe.name = 'Owsianka z jabłkiem'
+    recipe.save()
+    assert client.get(ingredient_url, HTTP_IF_NONE_MATCH=ingredient_etag).status_code == 200
+    ingredient_etag = revalidate(ingredient_url, 0)
+    IngredientImage.objects.create(ingredient=get_ingredient, image='ingredient/test.jpg')
+    assert client.get(ingredient_url, HTTP_IF_NONE_MATCH=ingredient_etag).status_code == 200
+
+    category_url = f'/kategoria/{get_category.name}/'
+    category_etag = revalidate(category_url, 1)
+    get_category.recipe.remove(recipe)
+    assert client.get(category_url, HTTP_IF_NONE_MATCH=category_etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_async_views(get_ingredient, get_category, django_assert_num_queries):
+    """
+    Checks that async variants of read only views render the same data as sync ones in the same amount of queries
+
+    @param get_ingredient: test ingredient from get_ingredient pytest fixture
+    @param get_category: test category from get_category pytest fixture
+    @param django_assert_num_queries: pytest-django fixture counting database queries
+    """
+    get_ingredient.is_searchable = True
+    get_ingredient.save()
+    recipe = Recipe.objects.create(name='Owsianka', has_servings=True, servings=2, prep_time=10)
+    RecipeIngredient.objects.create(recipe=recipe, ingredient=get_ingredient, measure=1, amount=1)
+    RecipeImage.objects.create(recipe=recipe, image='recipe/owsianka.jpg')
+    get_category.recipe.add(recipe)
+    factory = AsyncRequestFactory()
+
+    def get(view_class, path, **kwargs):
+        request = factory.get(path)
+
+        async def auser():
+            return AnonymousUser()
+
+        request.auser = auser
+        return async_to_sync(view_class.as_view())(request, **kwargs)
+
+    with django_assert_num_queries(RECIPE_DETAILS_QUERIES):
+        response = get(async_views.AsyncRecipeDetailsView, f'/przepis/{recipe.slug}/', slug=recipe.slug)
+    assert response.status_code == 200
+    assert 'Owsianka' in response.content.decode()
+    assert f'/skladnik/{get_ingredient.slug}/' in response.content.decode()
+    assert 'public' in response['Cache-Control'] and not response.cookies
+    with django_assert_num_queries(0):
+        assert get(async_views.AsyncRecipeDetailsView, f'/przepis/{recipe.slug}/', slug=recipe.slug).status_code == 200
+    with pytest.raises(Http404):
+        get(async_views.AsyncRecipeDetailsView, '/przepis/brak/', slug='brak')
+
+    response = get(async_views.AsyncIngredientDetailsView, f'/skladnik/{get_ingredient.slug}/',
+                   slug=get_ingredient.slug)
+    assert response.status_code == 200 and 'Owsianka' in response.content.decode()
+    response = get(async_views.AsyncRecipeCategoryView, f'/kategoria/{get_category.name}/', pk=get_category.name)
+    assert response.status_code == 200 and 'Owsianka' in response.content.decode()
+    response = get(async_views.AsyncSearchResultsView, '/szukaj/?q=owsianka')
+    assert response.status_code == 200 and f'/przepis/{recipe.slug}/' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_static_assets(client, settings, tmp_path):
+    """
+    Checks that collected static files get hashed names and compressed variants, that pages link the hashed names and
+    that only those are served with far future caching
+
+    @param client: client from client pytest fixture
+    @param settings: settings from pytest-django settings fixture
+    @param tmp_path: directory from pytest tmp_path fixture
+    """
+    settings.STATIC_ROOT = str(tmp_path)
+    settings.STORAGES = {**settings.STORAGES,
+                         'staticfiles': {'BACKEND': 'Recipes.static_assets.CompressedManifestStaticFilesStorage'}}
+    call_command('collectstatic', interactive=False, verbosity=0)
+
+    manifest = json.loads((tmp_path / 'staticfiles.json').read_text())['paths']
+    hashed_script = manifest['js/app.js']
+    assert hashed_script != 'js/app.js'
+    script = (tmp_path / hashed_script).read_bytes()
+    assert b'jQuery' not in script and b'$(' not in script
+    assert gzip.decompress((tmp_path / f'{hashed_script}.gz').read_bytes()) == script
+
+    page = client.get('/').content.decode()
+    assert f'/static/{manifest["css/styles.css"]}"' in page
+    assert f'/static/{hashed_script}"' in page
+    assert 'jquery' not in page
+
+    view = StaticFileView.as_view()
+    response = view(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), path=hashed_script)
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Content-Type'].startswith('text/javascript')
+    assert f'max-age={STATIC_MAX_AGE}' in response['Cache-Control'] and 'immutable' in response['Cache-Control']
+    assert b''.join(response.streaming_content) == (tmp_path / f'{hashed_script}.gz').read_bytes()
+
+    response = view(RequestFactory().get('/'), path='js/app.js')
+    assert not response.has_header('Content-Encoding')
+    assert 'no-cache' in response['Cache-Control']
+    assert b''.join(response.streaming_content) == (tmp_path / 'js/app.js').read_bytes()
+
+    for path in ['js/missing.js', '../tests.py', 'js/']:
+        with pytest.raises(Http404):
+            view(RequestFactory().get('/'), path=path)
+
+
+def test_persistent_databases():
+    """
+    Checks database configurations of the production settings profile with and without pooling
+    """
+    sqlite = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'db.sqlite3'}}
+    postgresql = {'default': {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'vegelastic',
+                              'OPTIONS': {'sslmode': 'require'}}}
+
+    configured = persistent_databases(sqlite, max_age=600)['default']
+    assert configured['CONN_MAX_AGE'] == 600 and configured['CONN_HEALTH_CHECKS'] is True
+    assert 'CONN_MAX_AGE' not in sqlite['default']
+
+    configured = persistent_databases(postgresql, max_age=None, pooling='psycopg', pool_size=8)['default']
+    assert configured['CONN_MAX_AGE'] == 0
+    assert configured['OPTIONS'] == {'sslmode': 'require', 'pool': {'min_size': 1, 'max_size': 8}}
+    assert postgresql['default']['OPTIONS'] == {'sslmode': 'require'}
+
+    configured = persistent_databases(postgresql, max_age=60, pooling='pgbouncer')['default']
+    assert configured['CONN_MAX_AGE'] == 60 and configured['DISABLE_SERVER_SIDE_CURSORS'] is True
+    assert 'pool' not in configured['OPTIONS']
+
+    with pytest.raises(ImproperlyConfigured):
+        persistent_databases(sqlite, max_age=600, pooling='psycopg')
+    with pytest.raises(ImproperlyConfigured):
+        persistent_databases(postgresql, max_age=600, pooling='pgpool')
+
+
+@pytest.mark.django_db
+def test_shopping_list(client, django_assert_num_queries):
+    """
+    Checks that ingredients of several recipes are summed up with their servings multipliers, spoon and glass
+    measures converted to the biggest fitting one, and rendered with Polish grammar
+
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    """
+    sugar = Ingredient.objects.create(name='cukier', name_one='cukier', name_two='cukru', name_five='cukru',
+                                      name_half='cukru', is_searchable=True)
+    onion = Ingredient.objects.create(name='cebula', name_one='cebula', name_two='cebule', name_five='cebul',
+                                      name_half='cebuli')
+    porridge = Recipe.objects.create(name='owsianka', has_servings=True, servings=1, prep_time=10)
+    soup = Recipe.objects.create(name='zupa', has_servings=True, servings=2, prep_time=30)
+    RecipeIngredient.objects.create(recipe=porridge, ingredient=sugar, measure=1, amount=1.5)
+    RecipeIngredient.objects.create(recipe=porridge, ingredient=onion, measure=7, amount=1)
+    RecipeIngredient.objects.create(recipe=soup, ingredient=sugar, measure=2, amount=1)
+    RecipeIngredient.objects.create(recipe=soup, ingredient=sugar, measure=5, amount=10)
+    RecipeIngredient.objects.create(recipe=soup, ingredient=onion, measure=7, amount=1)
+
+    with django_assert_num_queries(2):
+        response = client.get('/lista-zakupow/', {'przepis': [f'{soup.slug}:2', porridge.slug, 'brak',
+                                                              f'{soup.slug}:x']})
+    assert response.status_code == 200
+    assert response.context['plan_recipes'] == [(porridge.slug, 'owsianka', 1), (soup.slug, 'zupa', 3)]
+    rendered = [(item['decimal'], item['fraction'], item['measure_name'], item['ingredient_name'])
+                for item in response.context['shopping_list']]
+    assert rendered == [
+        ('4', None, None, 'cebule'),
+        ('3', '1/2', 'łyżki', 'cukru'),
+        ('30', None, 'gramów', 'cukru'),
+    ]
+    assert f'href="/skladnik/{sugar.slug}/"' in response.content.decode()
+    assert f'href="/skladnik/{onion.slug}/"' not in response.content.decode()
+
+    response = client.get('/lista-zakupow/')
+    assert response.context['shopping_list'] == []
+
+
+@pytest.mark.django_db
+def test_autocomplete(client, django_assert_num_queries, django_capture_on_commit_callbacks):
+    """
+    Checks that suggestions match the beginning of any word of recipe names and of every grammatical form of
+    searchable ingredients regardless of diacritics, and that the index follows saved and deleted objects once their
+    transaction commits and is rebuilt after changes made by other processes
+
+    @param client: client from client pytest fixture
+    @param django_assert_num_queries: query counter from pytest-django
+    @param django_capture_on_commit_callbacks: runner of on commit callbacks from pytest-django
+    """
+    recipe = Recipe.objects.create(name='Owsianka czekoladowa', has_servings=True, servings=1, prep_time=10)
+    onion = Ingredient.objects.create(name='cebula', name_one='cebula', name_two='cebule', name_five='cebul',
+                                      name_half='cebuli', is_searchable=True)
+    Ingredient.objects.create(name='cebulka', is_searchable=False)
+
+    def suggest(query, **parameters):
+        response = client.get('/szukaj/podpowiedzi/', {'q': query, **parameters})
+        assert response.status_code == 200
+        return [(suggestion['kind'], suggestion['name'], suggestion['url'])
+                for suggestion in response.json()['suggestions']]
+
+    assert suggest('ceb') == [('ingredient', 'cebula', f'/skladnik/{onion.slug}/')]
+    with django_assert_num_queries(0):
+        assert suggest('CZEKOLADO') == [('recipe', 'Owsianka czekoladowa', f'/przepis/{recipe.slug}/')]
+    assert suggest('owsianka  czek') == suggest('czekoladowa')
+    assert suggest('owsianka ') and not suggest('czekoladowa ')
+    assert suggest('') == [] and suggest('xyz') == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name='żurawina', name_one='żurawina', name_two='żurawiny', name_five='żurawin',
+                                  name_half='żurawiny', is_searchable=True)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Recipe.objects.create(name='Zupa fantomowa', has_servings=True, servings=2, prep_time=30)
+            raise IntegrityError
+    assert [name for kind, name, url in suggest('zurawin')] == ['żurawina']
+    assert suggest('fanto') == []
+    recipe.name = 'Placki z cebulą'
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.save()
+    assert suggest('owsi') == []
+    assert [name for kind, name, url in suggest('CEBULA')] == ['cebula', 'Placki z cebulą']
+    assert len(suggest('ceb', limit='1')) == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        onion.delete()
+        recipe.delete()
+    assert suggest('ceb') == []
+
+    Recipe.objects.bulk_create([Recipe(name='Zupa z innego procesu', slug='zupa-z-innego-procesu', has_servings=True,
+                                       servings=2, prep_time=30)])
+    assert suggest('zupa') == []
+    ProcessIndex('autocomplete', autocomplete.build_autocomplete_index).update(lambda index: None)
+    assert suggest('zupa') == [('recipe', 'Zupa z innego procesu', '/przepis/zupa-z-innego-procesu/')]
+
+
 @pytest.mark.django_db
 def test_add_recipe(client, get_user):
     """
@@ -156,3 +1098,53 @@ def test_searchbar(client):
     response_post = client.post('/szukaj/', {'searched': searched})
     assert response_post.status_code == 200
     assert response_post.context['searched'] == 'placki'
+
+
+@pytest.mark.django_db
+def test_search_index(client, django_capture_on_commit_callbacks):
+    """
+    Checks that search finds recipes and searchable ingredients regardless of diacritics and inflection, that the
+    index follows saved and deleted objects once their transaction commits and that it is rebuilt after changes made by
+    other processes
+
+    @param client: client from client pytest fixture
+    @param django_capture_on_commit_callbacks: runner of on commit callbacks from pytest-django
+    """
+    recipe = Recipe.objects.create(name='Owsianka czekoladowa', has_servings=True, servings=1, prep_time=10,
+                                   prep_instructions='Zagotuj mleko sojowe z płatkami owsianymi.')
+    Ingredient.objects.create(name='mleko sojowe', name_one='mleko sojowe', name_two='mleka sojowego',
+                              name_five='mleka sojowego', name_half='mleka sojowego', is_searchable=True)
+    Ingredient.objects.create(name='sól', is_searchable=False)
+
+    response = client.post('/szukaj/', {'searched': 'OWSIANKI'})
+    assert [result['recipe'].pk for result in response.context['search_results']] == [recipe.pk]
+
+    response = client.post('/szukaj/', {'searched': 'mleka'})
+    results = response.context['search_results']
+    assert results[0]['ingredient'].name == 'mleko sojowe'
+    assert results[1]['recipe'].pk == recipe.pk
+
+    response = client.post('/szukaj/', {'searched': 'sol'})
+    assert response.context['search_results'] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        new_recipe = Recipe.objects.create(name='Placki z jabłkami', has_servings=True, servings=2, prep_time=30)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Recipe.objects.create(name='Zupa fantomowa', has_servings=True, servings=2, prep_time=30)
+            raise IntegrityError
+    response = client.post('/szukaj/', {'searched': 'jablka'})
+    assert [result['recipe'].pk for result in response.context['search_results']] == [new_recipe.pk]
+    assert search.get_search_index().search('fantomowa') == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        new_recipe.delete()
+    response = client.post('/szukaj/', {'searched': 'placki'})
+    assert response.context['search_results'] == []
+
+    other_process_index = ProcessIndex('search', search.build_search_index)
+    hidden = Recipe.objects.bulk_create([Recipe(name='Zupa z innego procesu', slug='zupa-z-innego-procesu',
+                                                has_servings=True, servings=2, prep_time=30)])[0]
+    assert search.get_search_index().search('procesu') == []
+    other_process_index.update(lambda index: None)
+    assert [document_key for document_key, score in search.get_search_index().search('procesu')] == [
+        ('recipe', hidden.pk)]